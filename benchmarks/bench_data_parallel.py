@@ -0,0 +1,69 @@
+# benchmarks/bench_data_parallel.py
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from harness import BenchmarkSuite, PhaseTimer, add_common_arguments, finish
+from ai.neural_networks import ConvolutionalNN
+from ai.training import ModelTrainer
+
+
+def make_data(num_examples: int, image_size: int, num_classes: int):
+    rng = np.random.default_rng(0)
+    images = rng.random((num_examples, image_size, image_size, 3), dtype=np.float32)
+    labels = rng.integers(0, num_classes, size=num_examples)
+    return images, labels
+
+
+def build_trainer(data, image_size: int, num_classes: int, learning_rate: float) -> ModelTrainer:
+    network = ConvolutionalNN(input_shape=(image_size, image_size, 3), num_classes=num_classes)
+    network.compile_model(learning_rate=learning_rate)
+    return ModelTrainer(network.model, data, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local multi-process data-parallel training throughput.")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8], help="Worker processes to sweep.")
+    parser.add_argument('--batch-size', type=int, default=32, help="Batch size per worker.")
+    parser.add_argument('--examples', type=int, default=8192, help="Training examples.")
+    parser.add_argument('--epochs', type=int, default=2, help="Epochs per case.")
+    parser.add_argument('--image-size', type=int, default=32, help="Input height and width.")
+    parser.add_argument('--num-classes', type=int, default=10, help="Model output classes.")
+    parser.add_argument('--learning-rate', type=float, default=0.001, help="Single-worker learning rate.")
+    add_common_arguments(parser)
+    args = parser.parse_args()
+
+    data = make_data(args.examples, args.image_size, args.num_classes)
+    suite = BenchmarkSuite('data_parallel', repeat=args.repeat, warmup=args.warmup)
+
+    # Reference: plain model.fit in this process
+    def in_process(timer: PhaseTimer):
+        trainer = build_trainer(data, args.image_size, args.num_classes, args.learning_rate)
+        with timer.phase('train'):
+            start = time.perf_counter()
+            trainer.model.fit(*data, batch_size=args.batch_size, epochs=args.epochs, verbose=0)
+            elapsed = time.perf_counter() - start
+        timer.gauge('train_samples_per_second', args.examples * args.epochs / elapsed)
+
+    suite.run_case('fit_in_process', {'batch': args.batch_size}, in_process)
+
+    for workers in args.workers:
+        def run(timer: PhaseTimer):
+            trainer = build_trainer(data, args.image_size, args.num_classes, args.learning_rate)
+            trainer.train_data_parallel(workers, epochs=args.epochs, batch_size=args.batch_size,
+                                        checkpoint_path=None)
+            stats = trainer.parallel_stats
+            timer.add('startup', stats['startup_seconds'])
+            timer.add('train', stats['train_seconds'])
+            timer.gauge('train_samples_per_second', stats['samples_per_second'])
+
+        suite.run_case('data_parallel', {'workers': workers, 'batch': args.batch_size}, run)
+
+    return finish(suite, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
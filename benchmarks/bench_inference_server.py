@@ -0,0 +1,107 @@
+# benchmarks/bench_inference_server.py
+
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from harness import BenchmarkSuite, PhaseTimer, add_common_arguments, finish
+from ai.batching_server import BatchingInferenceServer
+from ai.inference import ModelInference
+from ai.neural_networks import ConvolutionalNN
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def build_inference(image_size: int, num_classes: int) -> ModelInference:
+    """Save an untrained ConvolutionalNN and load it back the way the service does."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.keras')
+        ConvolutionalNN(input_shape=(image_size, image_size, 3), num_classes=num_classes).model.save(path)
+        inference = ModelInference(path)
+    inference.warm_up()
+    return inference
+
+
+async def run_load(inference, clients, requests, max_batch_size, max_wait, samples, timer: PhaseTimer):
+    """Send ``requests`` single-sample requests from ``clients`` concurrent callers."""
+    latencies = []
+    remaining = itertools.count()
+
+    async with BatchingInferenceServer(inference.predict_batch, max_batch_size=max_batch_size,
+                                       max_wait=max_wait) as server:
+        async def client():
+            while (i := next(remaining)) < requests:
+                start = time.perf_counter()
+                await server.predict(samples[i % len(samples)])
+                latencies.append(time.perf_counter() - start)
+
+        with timer.phase('load'):
+            load_start = time.perf_counter()
+            await asyncio.gather(*(client() for _ in range(clients)))
+            load_seconds = time.perf_counter() - load_start
+        stats = server.stats()
+
+    timer.gauge('load_requests_per_second', len(latencies) / load_seconds)
+    timer.gauge('p50_latency_ms', statistics.median(latencies) * 1000)
+    timer.gauge('p99_latency_ms', percentile(latencies, 0.99) * 1000)
+    timer.gauge('mean_batch_size', stats['mean_batch_size'])
+    return {'requests': len(latencies)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the micro-batching inference server.")
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 16, 64],
+                        help="Concurrent single-sample callers to sweep.")
+    parser.add_argument('--max-batch-sizes', type=int, nargs='+', default=[1, 16, 64],
+                        help="Server batch size limits to sweep (1 disables batching).")
+    parser.add_argument('--max-waits-ms', type=float, nargs='+', default=[2.0],
+                        help="Server batch wait limits in milliseconds.")
+    parser.add_argument('--requests', type=int, default=2000, help="Requests per case.")
+    parser.add_argument('--image-size', type=int, default=32, help="Input height and width.")
+    parser.add_argument('--num-classes', type=int, default=10, help="Model output classes.")
+    add_common_arguments(parser)
+    args = parser.parse_args()
+
+    inference = build_inference(args.image_size, args.num_classes)
+    samples = np.random.default_rng(0).random((256, args.image_size, args.image_size, 3), dtype=np.float32)
+    suite = BenchmarkSuite('inference_server', repeat=args.repeat, warmup=args.warmup)
+
+    # Offline reference: the same samples scored in full batches
+    def offline(timer: PhaseTimer):
+        batch_size = max(args.max_batch_sizes)
+        with timer.phase('predict'):
+            for start in range(0, args.requests, batch_size):
+                count = min(batch_size, args.requests - start)
+                inference.predict_batch(np.take(samples, range(start, start + count), axis=0, mode='wrap'))
+        return {'requests': args.requests}
+
+    suite.run_case('offline_batches', {'batch_size': max(args.max_batch_sizes)}, offline)
+
+    for clients, max_batch_size, max_wait_ms in itertools.product(
+        args.clients, args.max_batch_sizes, args.max_waits_ms
+    ):
+        def run(timer: PhaseTimer):
+            return asyncio.run(run_load(inference, clients, args.requests, max_batch_size,
+                                        max_wait_ms / 1000, samples, timer))
+
+        suite.run_case(
+            'online_requests',
+            {'clients': clients, 'max_batch_size': max_batch_size, 'max_wait_ms': max_wait_ms},
+            run
+        )
+
+    return finish(suite, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
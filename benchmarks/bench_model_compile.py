@@ -0,0 +1,90 @@
+# benchmarks/bench_model_compile.py
+
+import argparse
+import itertools
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from harness import BenchmarkSuite, PhaseTimer, add_common_arguments, finish
+from ai.neural_networks import ConvolutionalNN, FeedforwardNN, TransferLearningModel
+
+MODELS = ('feedforward', 'cnn', 'transfer')
+
+# name -> (jit_compile, mixed_precision, steps_per_execution)
+OPTIONS = {
+    'baseline': (False, False, 1),
+    'xla': (True, False, 1),
+    'bf16': (False, True, 1),
+    'spe': (False, False, 8),
+    'all': (True, True, 8),
+}
+
+
+def build_model(name: str, image_size: int, num_classes: int, mixed_precision: bool):
+    if name == 'feedforward':
+        return FeedforwardNN(input_shape=(image_size * image_size * 3,), num_classes=num_classes,
+                             mixed_precision=mixed_precision)
+    if name == 'cnn':
+        return ConvolutionalNN(input_shape=(image_size, image_size, 3), num_classes=num_classes,
+                               mixed_precision=mixed_precision)
+    # Random base weights: same compute as ImageNet weights without the download
+    return TransferLearningModel('VGG16', num_classes, input_shape=(image_size, image_size, 3),
+                                 mixed_precision=mixed_precision, weights=None)
+
+
+def make_dataset(name: str, image_size: int, num_classes: int, batch_size: int, steps: int):
+    rng = np.random.default_rng(0)
+    shape = (image_size * image_size * 3,) if name == 'feedforward' else (image_size, image_size, 3)
+    images = rng.random((batch_size,) + shape, dtype=np.float32)
+    labels = rng.integers(0, num_classes, size=batch_size)
+    # One cached batch repeated, so the input pipeline stays out of the measurement
+    return tf.data.Dataset.from_tensors((images, labels)).repeat(steps)
+
+
+def run_training(name, option, image_size, num_classes, batch_size, steps, timer: PhaseTimer):
+    jit_compile, mixed_precision, steps_per_execution = OPTIONS[option]
+    steps -= steps % steps_per_execution
+    dataset = make_dataset(name, image_size, num_classes, batch_size, steps)
+    with timer.phase('build'):
+        network = build_model(name, image_size, num_classes, mixed_precision)
+        network.compile_model(jit_compile=jit_compile, steps_per_execution=steps_per_execution)
+        # Tracing and XLA compilation happen on the first steps
+        network.model.fit(dataset.take(steps_per_execution), epochs=1, verbose=0)
+    with timer.phase('train'):
+        start = time.perf_counter()
+        network.model.fit(dataset, epochs=1, verbose=0)
+        elapsed = time.perf_counter() - start
+    # Rates over the train phase only; total_seconds also covers building and compilation
+    timer.gauge('step_ms', elapsed / steps * 1000)
+    timer.gauge('train_samples_per_second', steps * batch_size / elapsed)
+    timer.gauge('mixed_precision', float(network.mixed_precision))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Training step time with XLA, mixed precision and steps_per_execution.")
+    parser.add_argument('--models', nargs='+', choices=MODELS, default=list(MODELS), help="Models to benchmark.")
+    parser.add_argument('--options', nargs='+', choices=list(OPTIONS), default=list(OPTIONS),
+                        help="Compile option sets to compare.")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[32], help="Batch sizes to sweep.")
+    parser.add_argument('--steps', type=int, default=64, help="Timed training steps per case.")
+    parser.add_argument('--image-size', type=int, default=32, help="Input height and width.")
+    parser.add_argument('--num-classes', type=int, default=10, help="Model output classes.")
+    add_common_arguments(parser)
+    args = parser.parse_args()
+
+    suite = BenchmarkSuite('model_compile', repeat=args.repeat, warmup=args.warmup)
+    for model, option, batch_size in itertools.product(args.models, args.options, args.batch_sizes):
+        def run(timer: PhaseTimer):
+            tf.keras.backend.clear_session()
+            return run_training(model, option, args.image_size, args.num_classes, batch_size, args.steps, timer)
+
+        suite.run_case('train_step', {'model': model, 'option': option, 'batch': batch_size}, run)
+
+    return finish(suite, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+# benchmarks/bench_quantum.py
+
+import argparse
+import itertools
+import logging
+import sys
+
+import numpy as np
+from harness import BenchmarkSuite, PhaseTimer, add_common_arguments, finish
+from quantum.quantum_circuits import QuantumCircuitDesigner
+from quantum.quantum_algorithms import GroverSearch, VariationalQuantumEigensolver
+from quantum.quantum_utils import QuantumMetrics, QuantumParallelProcessor, QuantumState
+
+CASES = ('simulate', 'grover', 'vqe', 'metrics', 'parallel')
+
+
+def build_layered_circuit(num_qubits: int, depth: int, rng: np.random.Generator) -> QuantumCircuitDesigner:
+    """Build a measured circuit of ``depth`` rotation + linear entanglement layers."""
+    designer = QuantumCircuitDesigner(num_qubits)
+    for _ in range(depth):
+        for qubit in range(num_qubits):
+            designer.add_parametric_gates('ry', qubit, [rng.uniform(0, 2 * np.pi)])
+        designer.add_entanglement_layer('linear')
+    designer.circuit.measure(designer.quantum_register, designer.classical_register)
+    return designer
+
+
+def random_density_matrix(num_qubits: int, rng: np.random.Generator) -> np.ndarray:
+    dim = 2 ** num_qubits
+    a = rng.normal(size=(dim, dim)) + 1j * rng.normal(size=(dim, dim))
+    rho = a @ a.conj().T
+    return rho / np.trace(rho)
+
+
+def random_hermitian(num_qubits: int, rng: np.random.Generator) -> np.ndarray:
+    dim = 2 ** num_qubits
+    a = rng.normal(size=(dim, dim)) + 1j * rng.normal(size=(dim, dim))
+    return (a + a.conj().T) / 2
+
+
+def bench_simulate(suite, qubits, depths, shots, rng):
+    for num_qubits, depth in itertools.product(qubits, depths):
+        designer = build_layered_circuit(num_qubits, depth, rng)
+
+        def run(timer: PhaseTimer):
+            timings = {}
+            designer.simulate(shots=shots, timings=timings)
+            timer.update(timings)
+            return {'gates': designer.circuit.size()}
+
+        suite.run_case('circuit_simulate', {'qubits': num_qubits, 'depth': depth, 'shots': shots}, run)
+
+
+def bench_grover(suite, qubits):
+    for num_qubits in qubits:
+        def run(timer: PhaseTimer):
+            with timer.phase('build'):
+                search = GroverSearch(num_qubits, '1' * num_qubits)
+            with timer.phase('run'):
+                search.run()
+            return {'gates': search.circuit_designer.circuit.size()}
+
+        suite.run_case('grover_run', {'qubits': num_qubits}, run)
+
+
+def bench_vqe(suite, qubits, batch_sizes, rng):
+    for num_qubits, batch in itertools.product(qubits, batch_sizes):
+        vqe = VariationalQuantumEigensolver(num_qubits, random_hermitian(num_qubits, rng))
+        params = rng.random((batch, num_qubits * 3))
+
+        def run(timer: PhaseTimer):
+            for p in params:
+                vqe.compute_expectation_value(p)
+            return {'evaluations': batch}
+
+        suite.run_case('vqe_expectation', {'qubits': num_qubits, 'batch': batch}, run)
+
+
+def bench_metrics(suite, qubits, batch_sizes, rng):
+    for num_qubits, batch in itertools.product(qubits, batch_sizes):
+        states = [QuantumState(statevector=None, density_matrix=random_density_matrix(num_qubits, rng))
+                  for _ in range(batch)]
+        generator = random_hermitian(num_qubits, rng)
+
+        def run(timer: PhaseTimer):
+            with timer.phase('entropy'):
+                for state in states:
+                    QuantumMetrics.calculate_entanglement_entropy(state.density_matrix)
+            with timer.phase('fisher'):
+                for state in states:
+                    QuantumMetrics.calculate_quantum_fisher_information(state, 0.0, generator)
+            return {'evaluations': 2 * batch}
+
+        suite.run_case('quantum_metrics', {'qubits': num_qubits, 'batch': batch}, run)
+
+
+def bench_parallel(suite, qubits, depths, batch_sizes, max_workers, rng):
+    for num_qubits, depth, batch in itertools.product(qubits, depths, batch_sizes):
+        circuits = []
+        for _ in range(batch):
+            designer = build_layered_circuit(num_qubits, depth, rng)
+            circuits.append(designer.circuit.bind_parameters(dict(designer.parameters)))
+        processor = QuantumParallelProcessor(max_workers=max_workers)
+
+        def run(timer: PhaseTimer):
+            processor.parallel_circuit_execution(circuits)
+            return {'circuits': batch, 'gates': sum(c.size() for c in circuits)}
+
+        suite.run_case(
+            'parallel_execution',
+            {'qubits': num_qubits, 'depth': depth, 'batch': batch, 'workers': max_workers},
+            run
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the quantum simulation stack.")
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=list(CASES),
+                        help="Benchmark groups to run (default: all).")
+    parser.add_argument('--qubits', type=int, nargs='+', default=[2, 4, 6],
+                        help="Qubit counts to sweep.")
+    parser.add_argument('--depths', type=int, nargs='+', default=[1, 4, 16],
+                        help="Circuit depths (layers) to sweep.")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32],
+                        help="Batch sizes to sweep.")
+    parser.add_argument('--shots', type=int, default=1000, help="Shots per simulation.")
+    parser.add_argument('--max-workers', type=int, default=None,
+                        help="Worker processes for QuantumParallelProcessor.")
+    parser.add_argument('--seed', type=int, default=1234, help="Seed for random circuit parameters.")
+    add_common_arguments(parser)
+    args = parser.parse_args()
+
+    # quantum_utils configures INFO logging, which floods the timings with transpiler output
+    logging.getLogger('qiskit').setLevel(logging.WARNING)
+
+    rng = np.random.default_rng(args.seed)
+    suite = BenchmarkSuite('quantum', repeat=args.repeat, warmup=args.warmup)
+
+    if 'simulate' in args.cases:
+        bench_simulate(suite, args.qubits, args.depths, args.shots, rng)
+    if 'grover' in args.cases:
+        bench_grover(suite, args.qubits)
+    if 'vqe' in args.cases:
+        bench_vqe(suite, args.qubits, args.batch_sizes, rng)
+    if 'metrics' in args.cases:
+        bench_metrics(suite, args.qubits, args.batch_sizes, rng)
+    if 'parallel' in args.cases:
+        bench_parallel(suite, args.qubits, args.depths, args.batch_sizes, args.max_workers, rng)
+
+    return finish(suite, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
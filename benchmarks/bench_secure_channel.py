@@ -0,0 +1,112 @@
+# benchmarks/bench_secure_channel.py
+
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from Crypto.PublicKey import RSA
+
+from harness import BenchmarkSuite, PhaseTimer, add_common_arguments, finish
+from communication.secure_channel import SecureChannelClient, SecureChannelServer
+from communication.secure_transmission import SecureTransmission
+
+TRANSPORTS = ('tcp', 'unix')
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+async def run_load(server_identity, client_identity, transport, connections, concurrency,
+                   messages, payload_size, timer: PhaseTimer):
+    """Drive ``messages`` echo requests through ``connections`` clients with ``concurrency`` workers each."""
+    server = SecureChannelServer(lambda payload: payload, server_identity, max_concurrency=concurrency)
+    socket_dir = tempfile.mkdtemp()
+    path = os.path.join(socket_dir, 'channel.sock')
+    clients = []
+    try:
+        with timer.phase('connect'):
+            if transport == 'unix':
+                await server.start(path=path)
+                target = {'path': path}
+            else:
+                await server.start()
+                host, port = server.address[:2]
+                target = {'host': host, 'port': port}
+            for _ in range(connections):
+                clients.append(await SecureChannelClient(client_identity).connect(**target))
+
+        payload = os.urandom(payload_size)
+        latencies = []
+        remaining = itertools.count()
+
+        async def worker(client):
+            while next(remaining) < messages:
+                start = time.perf_counter()
+                await client.request(payload)
+                latencies.append(time.perf_counter() - start)
+
+        with timer.phase('load'):
+            load_start = time.perf_counter()
+            await asyncio.gather(*(worker(client) for client in clients for _ in range(concurrency)))
+            load_seconds = time.perf_counter() - load_start
+    finally:
+        for client in clients:
+            await client.close()
+        await server.close()
+        if os.path.exists(path):
+            os.remove(path)
+        os.rmdir(socket_dir)
+
+    timer.gauge('load_messages_per_second', len(latencies) / load_seconds)
+    timer.gauge('p50_latency_ms', statistics.median(latencies) * 1000)
+    timer.gauge('p99_latency_ms', percentile(latencies, 0.99) * 1000)
+    return {'messages': len(latencies), 'bytes': len(latencies) * payload_size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the asyncio secure channel.")
+    parser.add_argument('--transports', nargs='+', choices=TRANSPORTS, default=list(TRANSPORTS),
+                        help="Socket types to test.")
+    parser.add_argument('--connections', type=int, nargs='+', default=[1, 4],
+                        help="Client connections to sweep.")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64],
+                        help="In-flight requests per connection to sweep.")
+    parser.add_argument('--payload-sizes', type=int, nargs='+', default=[64, 4096],
+                        help="Request payload sizes in bytes.")
+    parser.add_argument('--messages', type=int, default=5000, help="Requests per case.")
+    add_common_arguments(parser)
+    args = parser.parse_args()
+
+    # RSA identities are created once, outside any timed case; handshakes still run
+    # for every connection
+    server_identity, client_identity = SecureTransmission(), SecureTransmission()
+    server_identity.rsa_key = RSA.generate(2048)
+    client_identity.rsa_key = RSA.generate(2048)
+    suite = BenchmarkSuite('secure_channel', repeat=args.repeat, warmup=args.warmup)
+
+    for transport, connections, concurrency, payload_size in itertools.product(
+        args.transports, args.connections, args.concurrency, args.payload_sizes
+    ):
+        def run(timer: PhaseTimer):
+            return asyncio.run(run_load(server_identity, client_identity, transport, connections,
+                                        concurrency, args.messages, payload_size, timer))
+
+        suite.run_case(
+            'channel_echo',
+            {'transport': transport, 'connections': connections,
+             'concurrency': concurrency, 'payload': payload_size},
+            run
+        )
+
+    return finish(suite, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
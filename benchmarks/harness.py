@@ -0,0 +1,238 @@
+# benchmarks/harness.py
+
+import json
+import platform
+import statistics
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from resource_usage import peak_rss_mb
+
+
+class PhaseTimer:
+    """Accumulate wall-clock time per named phase, plus point measurements."""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def update(self, timings: Dict[str, float]) -> None:
+        for name, seconds in timings.items():
+            self.add(name, seconds)
+
+    def gauge(self, name: str, value: float) -> None:
+        """Record a measurement (e.g. a latency percentile) reported as-is, not as a rate."""
+        self.gauges[name] = value
+
+
+@dataclass
+class BenchmarkResult:
+    """Timing and memory figures for one benchmark case."""
+    name: str
+    params: Dict[str, Any]
+    total_seconds: Optional[float] = None
+    phases: Dict[str, float] = field(default_factory=dict)
+    metrics: Dict[str, float] = field(default_factory=dict)
+    # ru_maxrss is a process-wide high-water mark: the first figure includes every
+    # earlier case, the second is how much this case raised it
+    process_peak_rss_mb: Optional[float] = None
+    peak_rss_growth_mb: Optional[float] = None
+    status: str = 'ok'
+    error: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        """Stable identifier used to match a case against the baseline."""
+        params = ','.join(f"{k}={self.params[k]}" for k in sorted(self.params))
+        return f"{self.name}[{params}]"
+
+
+@dataclass
+class Regression:
+    key: str
+    metric: str
+    baseline: Optional[float]
+    current: Optional[float]
+    error: Optional[str] = None
+
+    @property
+    def ratio(self) -> float:
+        if self.error is not None:
+            return float('inf')
+        return self.current / self.baseline if self.baseline else float('inf')
+
+    def describe(self) -> str:
+        if self.error is not None:
+            return f"REGRESSION {self.key}: failed, baseline was ok ({self.error})"
+        return (f"REGRESSION {self.key} {self.metric}: {self.baseline:.6f} -> {self.current:.6f} "
+                f"({self.ratio:.2f}x)")
+
+
+class BenchmarkSuite:
+    """Run benchmark cases and persist or compare their results as JSON."""
+
+    def __init__(self, name: str, repeat: int = 3, warmup: int = 1):
+        self.name = name
+        self.repeat = repeat
+        self.warmup = warmup
+        self.results: List[BenchmarkResult] = []
+
+    def run_case(
+        self,
+        name: str,
+        params: Dict[str, Any],
+        func: Callable[[PhaseTimer], Optional[Dict[str, float]]]
+    ) -> BenchmarkResult:
+        """
+        Run ``func`` ``warmup + repeat`` times and record median timings.
+        :param name: Case name.
+        :param params: Sweep parameters for this case.
+        :param func: Callable receiving a PhaseTimer; it may return work
+                     counters (e.g. ``{'gates': 120}``) that are turned into
+                     per-second rates.
+        :return: The recorded BenchmarkResult.
+        """
+        result = BenchmarkResult(name=name, params=dict(params))
+        rss_before = peak_rss_mb()
+        totals, phase_runs, gauge_runs, counters = [], [], [], {}
+        try:
+            for run in range(self.warmup + self.repeat):
+                timer = PhaseTimer()
+                start = time.perf_counter()
+                counters = func(timer) or {}
+                elapsed = time.perf_counter() - start
+                if run >= self.warmup:
+                    totals.append(elapsed)
+                    phase_runs.append(timer.phases)
+                    gauge_runs.append(timer.gauges)
+        except Exception as e:
+            result.status = 'error'
+            result.error = f"{type(e).__name__}: {e}"
+        else:
+            result.total_seconds = statistics.median(totals)
+            for phase in phase_runs[0]:
+                result.phases[phase] = statistics.median(run[phase] for run in phase_runs)
+            for gauge in gauge_runs[0]:
+                result.metrics[gauge] = statistics.median(run[gauge] for run in gauge_runs)
+            for counter, amount in counters.items():
+                result.metrics[counter] = amount
+                if result.total_seconds > 0:
+                    result.metrics[f"{counter}_per_second"] = amount / result.total_seconds
+        result.process_peak_rss_mb = peak_rss_mb()
+        if rss_before is not None:
+            result.peak_rss_growth_mb = result.process_peak_rss_mb - rss_before
+        self.results.append(result)
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'suite': self.name,
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': self.repeat,
+            'results': [dict(asdict(r), key=r.key) for r in self.results],
+        }
+
+    def write_json(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def compare(
+        self,
+        baseline_path: str,
+        tolerance: float = 0.2,
+        metrics: tuple = ('total_seconds',)
+    ) -> List[Regression]:
+        """
+        Compare the current results with a stored baseline.
+        :param baseline_path: JSON file previously written by ``write_json``.
+        :param tolerance: Allowed relative slowdown before a case regresses.
+        :param metrics: Result fields to compare; larger values are worse.
+        :return: List of regressions, empty if none. A case that fails where the
+                 baseline succeeded is a regression.
+        """
+        with open(baseline_path, 'r') as f:
+            baseline = {r['key']: r for r in json.load(f)['results']}
+
+        regressions = []
+        for result in self.results:
+            reference = baseline.get(result.key)
+            if reference is None or reference['status'] != 'ok':
+                continue
+            if result.status != 'ok':
+                regressions.append(Regression(result.key, 'status', None, None, error=result.error))
+                continue
+            for metric in metrics:
+                before, after = reference.get(metric), getattr(result, metric)
+                if before is None or after is None:
+                    continue
+                if after > before * (1 + tolerance):
+                    regressions.append(Regression(result.key, metric, before, after))
+        return regressions
+
+
+def format_results(results: List[BenchmarkResult]) -> str:
+    """Render results as a plain-text table."""
+    lines = []
+    for r in results:
+        if r.status != 'ok':
+            lines.append(f"{r.key:<60} ERROR {r.error}")
+            continue
+        phases = ' '.join(f"{k}={v * 1e3:.2f}ms" for k, v in r.phases.items())
+        rates = ' '.join(
+            f"{k}={v:,.0f}" for k, v in r.metrics.items() if k.endswith('_per_second')
+        )
+        lines.append(
+            f"{r.key:<60} {r.total_seconds * 1e3:10.2f}ms "
+            f"peak_rss={r.process_peak_rss_mb or 0:.0f}MiB(+{r.peak_rss_growth_mb or 0:.0f}) "
+            f"{phases} {rates}".rstrip()
+        )
+    return '\n'.join(lines)
+
+
+def add_common_arguments(parser) -> None:
+    """Add the output/baseline options shared by every benchmark script."""
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per case (median is reported).")
+    parser.add_argument('--warmup', type=int, default=1, help="Untimed warm-up runs per case.")
+    parser.add_argument('--output', type=str, default=None, help="Write results as JSON to this path.")
+    parser.add_argument('--baseline', type=str, default=None, help="Baseline JSON to compare against.")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Allowed relative slowdown against the baseline (default: 0.2).")
+
+
+def finish(suite: BenchmarkSuite, args) -> int:
+    """
+    Print and persist results, compare with the baseline and return an exit code:
+    non-zero on a regression or if any case failed.
+    """
+    print(format_results(suite.results))
+    if args.output:
+        suite.write_json(args.output)
+        print(f"Results written to {args.output}")
+    failed = [r for r in suite.results if r.status != 'ok']
+    if args.baseline:
+        regressions = suite.compare(args.baseline, tolerance=args.tolerance)
+        for r in regressions:
+            print(r.describe())
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline}")
+    if failed:
+        print(f"{len(failed)} case(s) failed")
+        return 1
+    return 0
@@ -0,0 +1,204 @@
+# src/ai/batching_server.py
+
+import asyncio
+import bisect
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+class Histogram:
+    """Counts of observed values in buckets with the given inclusive upper bounds."""
+
+    def __init__(self, bounds):
+        """
+        :param bounds: Sorted bucket upper bounds; larger values go to an overflow bucket
+        """
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0
+        self.count = 0
+
+    def record(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def snapshot(self):
+        """
+        :return: Dictionary mapping bucket labels ('<=N', '>N') to counts
+        """
+        labels = [f'<={bound}' for bound in self.bounds] + [f'>{self.bounds[-1]}']
+        return dict(zip(labels, self.counts))
+
+def _power_of_two_bounds(limit):
+    bounds = [1]
+    while bounds[-1] < limit:
+        bounds.append(bounds[-1] * 2)
+    return bounds
+
+class BatchingInferenceServer:
+    """
+    Asyncio front-end that groups single-sample requests into batches.
+
+    Requests are queued and collected into a batch until ``max_batch_size``
+    samples are waiting or ``max_wait`` seconds have passed since the first
+    one arrived. Each batch runs on a dedicated executor so the event loop
+    keeps accepting requests, and every caller's future is resolved with its
+    own prediction. Queue depth and batch size are recorded as histograms.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=64, max_wait=0.005, max_queue_size=0,
+                 max_inflight_batches=1, executor=None):
+        """
+        :param predict_batch: Callable mapping a stacked batch to per-sample predictions,
+                              e.g. ``ModelInference.predict_batch``
+        :param max_batch_size: Maximum number of samples per batch
+        :param max_wait: Longest time in seconds a request waits for its batch to fill
+        :param max_queue_size: Maximum number of queued requests (0 for unbounded);
+                               ``predict`` waits for space when the queue is full
+        :param max_inflight_batches: Number of batches running at the same time
+        :param executor: Executor for batches (a dedicated thread pool is created if None)
+        """
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue_size = max_queue_size
+        self.max_inflight_batches = max_inflight_batches
+        self.batch_sizes = Histogram(_power_of_two_bounds(max_batch_size))
+        self.queue_depths = Histogram(_power_of_two_bounds(max(max_queue_size, 1024)))
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._queue = None
+        self._slots = None
+        self._batcher = None
+        self._batches = set()
+
+    @property
+    def queue_depth(self):
+        """Number of requests waiting to be batched."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self):
+        """
+        :return: Dictionary with the current queue depth and both histograms
+        """
+        return {
+            'queue_depth': self.queue_depth,
+            'batches': self.batch_sizes.count,
+            'mean_batch_size': self.batch_sizes.mean,
+            'batch_size': self.batch_sizes.snapshot(),
+            'queue_depth_at_dispatch': self.queue_depths.snapshot(),
+        }
+
+    async def start(self):
+        if self._batcher is not None:
+            return self
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_inflight_batches,
+                                                thread_name_prefix='inference-batch')
+        self._queue = asyncio.Queue(self.max_queue_size)
+        self._slots = asyncio.Semaphore(self.max_inflight_batches)
+        self._batcher = asyncio.create_task(self._batch_loop())
+        return self
+
+    async def close(self):
+        """Stop batching, finish running batches and fail requests still queued."""
+        if self._batcher is None:
+            return
+        self._batcher.cancel()
+        try:
+            await self._batcher
+        except asyncio.CancelledError:
+            pass
+        self._batcher = None
+        if self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Inference server closed."))
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def predict(self, sample):
+        """
+        Queue one sample and wait for its prediction.
+        :param sample: Numpy array of a single input, without batch dimension
+        :return: The sample's prediction
+        """
+        if self._batcher is None:
+            raise RuntimeError("Inference server is not running.")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((sample, future))
+        return await future
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            batch = []
+            try:
+                batch.append(await self._queue.get())
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    if not self._queue.empty():
+                        batch.append(self._queue.get_nowait())
+                        continue
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                self._slots.release()
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(RuntimeError("Inference server closed."))
+                raise
+            self.batch_sizes.record(len(batch))
+            self.queue_depths.record(self._queue.qsize())
+            task = asyncio.create_task(self._run_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, batch):
+        try:
+            # Callers that gave up are skipped
+            batch = [(np.asarray(sample), future) for sample, future in batch if not future.done()]
+            if not batch:
+                return
+            # Samples that cannot be stacked with the first one fail alone
+            shape = batch[0][0].shape
+            for sample, future in batch:
+                if sample.shape != shape:
+                    future.set_exception(ValueError(
+                        f"Sample shape {sample.shape} does not match the batch shape {shape}."
+                    ))
+            batch = [(sample, future) for sample, future in batch if sample.shape == shape]
+            try:
+                samples = np.stack([sample for sample, _ in batch])
+                predictions = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, self.predict_batch, samples
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            for (_, future), prediction in zip(batch, predictions):
+                if not future.done():
+                    future.set_result(prediction)
+        finally:
+            self._slots.release()
@@ -0,0 +1,268 @@
+# src/ai/distributed_training.py
+
+import importlib
+import json
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+import numpy as np
+import tensorflow as tf
+
+_WEIGHTS_FILE = 'weights.npz'
+_RESULT_FILE = 'result.json'
+
+class ArraySource:
+    """In-memory (images, labels) arrays that data-parallel workers shard by index."""
+
+    def __init__(self, images, labels, training=False, seed=None):
+        """
+        :param images: Numpy array of inputs
+        :param labels: Numpy array of sparse labels
+        :param training: Shuffle every epoch
+        :param seed: Shuffle seed
+        """
+        self.images = images
+        self.labels = labels
+        self.training = training
+        self.seed = seed
+
+    @property
+    def num_examples(self):
+        return len(self.labels)
+
+    def dataset(self, batch_size, num_shards=1, shard_index=0):
+        dataset = tf.data.Dataset.from_tensor_slices((self.images[shard_index::num_shards],
+                                                      self.labels[shard_index::num_shards]))
+        if self.training:
+            dataset = dataset.shuffle(self.num_examples // num_shards + 1, seed=self.seed,
+                                      reshuffle_each_iteration=True)
+        return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+class DirectorySource:
+    """A TFDataLoader directory that data-parallel workers shard by file."""
+
+    def __init__(self, loader, directory, training=False):
+        """
+        :param loader: TFDataLoader (pickled into each worker)
+        :param directory: Directory with one subdirectory of images per class
+        :param training: Shuffle and augment
+        """
+        self.loader = loader
+        self.directory = directory
+        self.training = training
+        self.num_examples = len(loader._list_files(directory)[0])
+
+    def dataset(self, batch_size, num_shards=1, shard_index=0):
+        self.loader.batch_size = batch_size
+        return self.loader.build_dataset(self.directory, self.training, num_shards, shard_index)
+
+def _free_ports(count):
+    """Reserve ``count`` distinct free localhost ports (released just before the workers bind them)."""
+    sockets = [socket.socket() for _ in range(count)]
+    try:
+        for sock in sockets:
+            sock.bind(('localhost', 0))
+        return [sock.getsockname()[1] for sock in sockets]
+    finally:
+        for sock in sockets:
+            sock.close()
+
+def _distributed(strategy, source, global_batch_size):
+    def dataset_fn(context):
+        dataset = source.dataset(context.get_per_replica_batch_size(global_batch_size),
+                                 context.num_input_pipelines, context.input_pipeline_id)
+        # Every worker must run the same number of steps, so shards never run dry
+        return dataset.repeat()
+    return iter(strategy.distribute_datasets_from_function(dataset_fn))
+
+def _layer_modules(model):
+    """Modules defining the model's layer classes, so workers can register custom layers."""
+    modules = set()
+    pending = [model]
+    while pending:
+        layer = pending.pop()
+        modules.add(type(layer).__module__)
+        pending.extend(getattr(layer, 'layers', []))
+    return sorted(modules)
+
+def _worker_main(task_index, cluster, job, result_dir):
+    """Entry point of one worker process: train a replica in lockstep with the others."""
+    for module in job['modules']:
+        importlib.import_module(module)
+    os.environ['TF_CONFIG'] = json.dumps({'cluster': {'worker': cluster},
+                                          'task': {'type': 'worker', 'index': task_index}})
+    tf.config.threading.set_intra_op_parallelism_threads(job['threads'])
+    tf.config.threading.set_inter_op_parallelism_threads(2)
+    strategy = tf.distribute.MultiWorkerMirroredStrategy()
+    global_batch_size = job['batch_size'] * strategy.num_replicas_in_sync
+
+    with strategy.scope():
+        model = tf.keras.models.model_from_json(job['model_json'])
+        model.set_weights(job['weights'])
+        optimizer = tf.keras.optimizers.deserialize(job['optimizer'])
+        optimizer.build(model.trainable_variables)
+        loss_fn = tf.keras.losses.deserialize(job['loss'])
+    if isinstance(loss_fn, tf.keras.losses.Loss):
+        loss_fn.reduction = 'none'
+    # Keras callbacks read the optimizer from the model
+    model.optimizer = optimizer
+
+    def replica_step(images, labels, training):
+        with tf.GradientTape() as tape:
+            predictions = model(images, training=training)
+            per_example = loss_fn(labels, predictions)
+            loss = tf.nn.compute_average_loss(per_example, global_batch_size=global_batch_size)
+            if training and model.losses:
+                loss += tf.nn.scale_regularization_loss(tf.add_n(model.losses))
+        if training:
+            gradients = tape.gradient(loss, model.trainable_variables)
+            optimizer.apply_gradients(zip(gradients, model.trainable_variables))
+        correct = tf.cast(tf.equal(tf.argmax(predictions, axis=-1, output_type=tf.int64),
+                                   tf.cast(tf.reshape(labels, [-1]), tf.int64)), tf.float32)
+        return loss, tf.reduce_sum(correct)
+
+    @tf.function
+    def train_step(iterator):
+        images, labels = next(iterator)
+        loss, correct = strategy.run(replica_step, args=(images, labels, True))
+        return strategy.reduce('SUM', loss, axis=None), strategy.reduce('SUM', correct, axis=None)
+
+    @tf.function
+    def val_step(iterator):
+        images, labels = next(iterator)
+        loss, correct = strategy.run(replica_step, args=(images, labels, False))
+        return strategy.reduce('SUM', loss, axis=None), strategy.reduce('SUM', correct, axis=None)
+
+    train_source, val_source = job['train_source'], job['val_source']
+    train_steps = train_source.num_examples // global_batch_size
+    val_steps = val_source.num_examples // global_batch_size if val_source is not None else 0
+    if train_steps == 0:
+        raise ValueError(f"{train_source.num_examples} training examples are fewer than one "
+                         f"global batch of {global_batch_size}.")
+    train_iterator = _distributed(strategy, train_source, global_batch_size)
+    val_iterator = _distributed(strategy, val_source, global_batch_size) if val_steps else None
+
+    # Every worker sees the same all-reduced logs, so callbacks decide the same way everywhere
+    callbacks = tf.keras.callbacks.CallbackList([
+        tf.keras.callbacks.EarlyStopping(monitor='val_loss' if val_steps else 'loss', patience=5,
+                                         restore_best_weights=True),
+        tf.keras.callbacks.ReduceLROnPlateau(monitor='val_loss' if val_steps else 'loss', factor=0.2,
+                                             patience=3, min_lr=1e-6),
+    ], model=model)
+    history = {}
+    start = time.perf_counter()
+    callbacks.on_train_begin()
+    for epoch in range(job['epochs']):
+        logs = {}
+        for name, step, iterator, steps in (('', train_step, train_iterator, train_steps),
+                                            ('val_', val_step, val_iterator, val_steps)):
+            if not steps:
+                continue
+            total_loss = total_correct = 0.0
+            for _ in range(steps):
+                loss, correct = step(iterator)
+                total_loss += float(loss)
+                total_correct += float(correct)
+            logs[f'{name}loss'] = total_loss / steps
+            logs[f'{name}accuracy'] = total_correct / (steps * global_batch_size)
+        callbacks.on_epoch_end(epoch, logs)
+        logs['learning_rate'] = float(np.asarray(optimizer.learning_rate))
+        for key, value in logs.items():
+            history.setdefault(key, []).append(value)
+        if model.stop_training:
+            break
+    callbacks.on_train_end()
+    train_seconds = time.perf_counter() - start
+
+    if task_index == 0:
+        np.savez(os.path.join(result_dir, _WEIGHTS_FILE), *model.get_weights())
+        with open(os.path.join(result_dir, _RESULT_FILE), 'w') as f:
+            json.dump({'history': history, 'train_seconds': train_seconds,
+                       'samples': len(history['loss']) * train_steps * global_batch_size}, f)
+
+def _check_workers(processes, deadline):
+    while True:
+        codes = [process.exitcode for process in processes]
+        if any(code not in (None, 0) for code in codes):
+            raise RuntimeError(f"Data-parallel worker failed (exit codes {codes}).")
+        if all(code == 0 for code in codes):
+            return
+        if deadline is not None and time.monotonic() > deadline:
+            raise RuntimeError("Data-parallel training timed out.")
+        processes[codes.index(None)].join(0.1)
+
+def train_data_parallel(model, train_source, val_source, num_workers, epochs=50, batch_size=32, timeout=None):
+    """
+    Train a compiled Keras model in ``num_workers`` local worker processes.
+    Each worker rebuilds the model from its config and weights, reads its
+    shard of the data, and all-reduces gradients every step. The compiled
+    optimizer's learning rate is scaled by ``num_workers`` to match the
+    larger global batch.
+    :param model: Compiled Keras model
+    :param train_source: ArraySource or DirectorySource
+    :param val_source: ArraySource, DirectorySource or None
+    :param num_workers: Number of worker processes
+    :param epochs: Maximum number of epochs
+    :param batch_size: Batch size per worker
+    :param timeout: Seconds to wait for the workers before failing
+    :return: Tuple of (History, trained weights, stats dictionary)
+    :raises ValueError: If the model is not compiled with sparse categorical cross-entropy
+    :raises RuntimeError: If a worker fails or times out
+    """
+    if model.optimizer is None:
+        raise ValueError("Compile the model before data-parallel training.")
+    loss_fn = tf.keras.losses.get(model.loss)
+    # The workers report argmax accuracy against integer labels
+    if not (isinstance(loss_fn, tf.keras.losses.SparseCategoricalCrossentropy)
+            or getattr(loss_fn, '__name__', None) == 'sparse_categorical_crossentropy'):
+        raise ValueError("Data-parallel training requires the sparse categorical cross-entropy loss.")
+    optimizer = tf.keras.optimizers.serialize(model.optimizer)
+    base_learning_rate = float(np.asarray(model.optimizer.learning_rate))
+    optimizer['config']['learning_rate'] = base_learning_rate * num_workers
+    job = {
+        'model_json': model.to_json(),
+        'modules': _layer_modules(model),
+        'weights': model.get_weights(),
+        'optimizer': optimizer,
+        'loss': tf.keras.losses.serialize(loss_fn),
+        'train_source': train_source,
+        'val_source': val_source,
+        'epochs': epochs,
+        'batch_size': batch_size,
+        'threads': max(1, (os.cpu_count() or 1) // num_workers),
+    }
+    cluster = [f'localhost:{port}' for port in _free_ports(num_workers)]
+    # TensorFlow is not fork-safe
+    context = multiprocessing.get_context('spawn')
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as result_dir:
+        processes = [context.Process(target=_worker_main, args=(i, cluster, job, result_dir), daemon=True)
+                     for i in range(num_workers)]
+        for process in processes:
+            process.start()
+        try:
+            _check_workers(processes, None if timeout is None else time.monotonic() + timeout)
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+        with open(os.path.join(result_dir, _RESULT_FILE)) as f:
+            result = json.load(f)
+        with np.load(os.path.join(result_dir, _WEIGHTS_FILE)) as arrays:
+            weights = [arrays[f'arr_{i}'] for i in range(len(arrays.files))]
+
+    history = tf.keras.callbacks.History()
+    history.history = result['history']
+    history.params = {'epochs': epochs, 'workers': num_workers}
+    stats = {
+        'workers': num_workers,
+        'global_batch_size': batch_size * num_workers,
+        'learning_rate': base_learning_rate * num_workers,
+        'train_seconds': result['train_seconds'],
+        'startup_seconds': time.perf_counter() - start - result['train_seconds'],
+        'samples_per_second': result['samples'] / result['train_seconds'],
+    }
+    return history, weights, stats
@@ -0,0 +1,137 @@
+# src/ai/feature_cache.py
+
+import hashlib
+import json
+import os
+import numpy as np
+import tensorflow as tf
+
+def model_fingerprint(model):
+    """
+    Digest of a model's architecture and weights.
+    :param model: Keras model
+    :return: Hex digest
+    """
+    digest = hashlib.sha256(model.to_json().encode())
+    for weight in model.weights:
+        digest.update(np.ascontiguousarray(weight.numpy()).tobytes())
+    return digest.hexdigest()
+
+def array_fingerprint(*arrays):
+    """
+    Digest of in-memory arrays (shape, dtype and contents).
+    :return: Hex digest
+    """
+    digest = hashlib.sha256()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f'{array.shape}{array.dtype}'.encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+def _batches(data, batch_size):
+    """Yield (images, labels) numpy batches from an (images, labels) tuple of arrays or a batched dataset."""
+    if isinstance(data, tf.data.Dataset):
+        for images, labels in data:
+            yield images.numpy(), labels.numpy()
+    else:
+        images, labels = data
+        for start in range(0, len(images), batch_size):
+            yield images[start:start + batch_size], labels[start:start + batch_size]
+
+class FeatureCache:
+    """
+    On-disk cache of a frozen base model's outputs ("bottleneck features").
+
+    Features are written as a raw float32 file and read back memory-mapped,
+    so datasets larger than memory can be cached. Each entry is named after
+    the fingerprints of its data and of the base model; when either changes,
+    the features are extracted again and the stale entry is deleted.
+    """
+
+    def __init__(self, cache_dir):
+        """
+        :param cache_dir: Directory for cached features (created if missing)
+        """
+        self.cache_dir = cache_dir
+        self.extractions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def load_or_extract(self, base_model, data, name, data_fingerprint=None, batch_size=64):
+        """
+        Return cached features for the data, running the base model over it on a miss.
+        :param base_model: Frozen Keras model producing the features
+        :param data: (images, labels) tuple of arrays, or a dataset of (images, labels) batches
+        :param name: Entry name, e.g. 'train' or 'val'
+        :param data_fingerprint: Identifies the data; required for datasets
+                                 (e.g. TFDataLoader.fingerprint), computed for arrays
+        :param batch_size: Batch size for the base model when data are arrays
+        :return: Tuple of (read-only memory-mapped features, labels)
+        """
+        if data_fingerprint is None:
+            if isinstance(data, tf.data.Dataset):
+                raise ValueError("Caching features of a dataset needs a data_fingerprint.")
+            data_fingerprint = array_fingerprint(*data)
+        key = hashlib.sha256(f'{data_fingerprint}\0{model_fingerprint(base_model)}'.encode()).hexdigest()[:16]
+        prefix = os.path.join(self.cache_dir, f'{name}-{key}')
+        if not os.path.exists(prefix + '.json'):
+            self._remove_entries(name)
+            self._extract(base_model, data, prefix, batch_size)
+        return self._load(prefix)
+
+    def _extract(self, base_model, data, prefix, batch_size):
+        forward = tf.function(lambda images: tf.cast(base_model(images, training=False), tf.float32))
+        labels, count, shape = [], 0, None
+        with open(prefix + '.features.tmp', 'wb') as f:
+            for images, batch_labels in _batches(data, batch_size):
+                features = forward(tf.convert_to_tensor(images, dtype=tf.float32)).numpy()
+                shape = features.shape[1:]
+                f.write(features.tobytes())
+                labels.append(np.asarray(batch_labels))
+                count += len(features)
+        os.replace(prefix + '.features.tmp', prefix + '.features')
+        np.save(prefix + '.labels.npy', np.concatenate(labels) if labels else np.empty(0))
+        # The metadata file is written last and marks the entry as complete
+        with open(prefix + '.json', 'w') as f:
+            json.dump({'count': count, 'shape': list(shape or ()), 'dtype': 'float32'}, f)
+        self.extractions += 1
+
+    def _load(self, prefix):
+        with open(prefix + '.json') as f:
+            meta = json.load(f)
+        labels = np.load(prefix + '.labels.npy')
+        if meta['count'] == 0:
+            return np.empty([0] + meta['shape'], dtype=meta['dtype']), labels
+        features = np.memmap(prefix + '.features', dtype=meta['dtype'], mode='r',
+                             shape=tuple([meta['count']] + meta['shape']))
+        return features, labels
+
+    def _remove_entries(self, name):
+        for filename in os.listdir(self.cache_dir):
+            if filename.startswith(f'{name}-'):
+                os.remove(os.path.join(self.cache_dir, filename))
+
+class FeatureBatches(tf.keras.utils.PyDataset):
+    """Shuffled batches read from memory-mapped features, so only one batch is in memory at a time."""
+
+    def __init__(self, features, labels, batch_size=32, shuffle=True, seed=None, **kwargs):
+        super().__init__(**kwargs)
+        self.features = features
+        self.labels = labels
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self._rng = np.random.default_rng(seed)
+        self._order = np.arange(len(labels))
+        self.on_epoch_end()
+
+    def __len__(self):
+        return -(-len(self.labels) // self.batch_size)
+
+    def __getitem__(self, index):
+        # Sorted indices turn random access into mostly sequential reads
+        indices = np.sort(self._order[index * self.batch_size:(index + 1) * self.batch_size])
+        return np.asarray(self.features[indices]), self.labels[indices]
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            self._rng.shuffle(self._order)
@@ -5,10 +5,65 @@ import tensorflow as tf
 from tensorflow.keras.models import load_model
 import matplotlib.pyplot as plt
 import os
+from .prediction_cache import file_digest
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+def list_images(image_dir):
+    """
+    Sorted filenames of the images in a directory.
+    :param image_dir: Directory containing images
+    :return: List of filenames
+    """
+    with os.scandir(image_dir) as entries:
+        return sorted(entry.name for entry in entries
+                      if entry.is_file() and entry.name.endswith(IMAGE_EXTENSIONS))
+
+def load_image(path, img_size=(224, 224)):
+    """
+    Read, decode and resize one image, scaled to [0, 1].
+    Resizes nearest-neighbour like ``load_img``'s default (pixel choice can differ at edges).
+    :param path: Scalar string tensor with the image path
+    :param img_size: Size to which the image will be resized
+    :return: Float32 tensor of shape (height, width, 3)
+    """
+    image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+    image = tf.image.resize(image, img_size, method='nearest')
+    return tf.cast(image, tf.float32) / 255.0
+
+def image_dataset(image_dir, filenames, img_size=(224, 224), batch_size=64):
+    """
+    Batched tf.data pipeline of (filename, image) pairs with parallel decoding and prefetch.
+    :param image_dir: Directory containing images
+    :param filenames: Filenames within image_dir, in output order
+    :param img_size: Size to which images will be resized
+    :param batch_size: Number of images per batch
+    :return: tf.data.Dataset
+    """
+    paths = [os.path.join(image_dir, filename) for filename in filenames]
+    dataset = tf.data.Dataset.from_tensor_slices((filenames, paths))
+    dataset = dataset.map(lambda name, path: (name, load_image(path, img_size)),
+                          num_parallel_calls=tf.data.AUTOTUNE, deterministic=True)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
 
 class ModelInference:
-    def __init__(self, model_path):
+    def __init__(self, model_path, model_version=None):
+        """
+        :param model_path: Path of the saved model
+        :param model_version: Identifies the model in prediction caches
+                              (defaults to the digest of the model file)
+        """
+        self.model_path = model_path
         self.model = load_model(model_path)
+        self._model_version = model_version
+        self._compiled_predict = None
+
+    @property
+    def model_version(self):
+        """Model identifier for prediction caches; the model file is only hashed on first use."""
+        if self._model_version is None:
+            self._model_version = file_digest(self.model_path).hex()
+        return self._model_version
 
     def predict(self, input_data):
         """
@@ -19,6 +74,16 @@ class ModelInference:
         predictions = self.model.predict(input_data)
         return np.argmax(predictions, axis=1)
 
+    def predict_batch(self, batch):
+        """
+        Predict classes for one batch through the traced model call, without
+        ``model.predict``'s per-call setup. The whole batch goes through the
+        model at once, so callers control the batch size.
+        :param batch: Numpy array of shape (batch_size, height, width, channels)
+        :return: Predicted class indices
+        """
+        return self._predict_step()(tf.convert_to_tensor(batch, dtype=tf.float32)).numpy()
+
     def evaluate(self, test_data, test_labels):
         """
         Evaluate the model on test data.
@@ -46,27 +111,94 @@ class ModelInference:
             plt.axis('off')
         plt.show()
 
-    def batch_predict(self, image_dir, img_size=(224, 224)):
+    def batch_predict(self, image_dir, img_size=(224, 224), batch_size=64, cache=None):
         """
         Predict classes for a batch of images in a directory.
         :param image_dir: Directory containing images
         :param img_size: Size to which images will be resized
+        :param batch_size: Number of images per model call
+        :param cache: Optional PredictionCache; only new or changed files are scored
         :return: Dictionary of image filenames and their predicted classes
         """
-        from tensorflow.keras.preprocessing.image import load_img, img_to_array
+        return dict(self.iter_batch_predict(image_dir, img_size, batch_size, cache))
+
+    def iter_batch_predict(self, image_dir, img_size=(224, 224), batch_size=64, cache=None):
+        """
+        Stream predictions for the images in a directory, in filename order.
+        Files are read, decoded and resized in parallel by a tf.data pipeline and
+        prefetched while the previous batch is on the model, so memory use is
+        bounded by a few batches regardless of the directory size.
+        With a cache, only files without a cached prediction are scored and
+        new predictions are stored as they come; cached and new predictions
+        are interleaved so the output stays in filename order.
+        :param image_dir: Directory containing images
+        :param img_size: Size to which images will be resized
+        :param batch_size: Number of images per model call
+        :param cache: Optional PredictionCache; only new or changed files are scored
+        :return: Generator of (filename, predicted class as int) pairs
+        """
+        filenames = list_images(image_dir)
+        if cache is None:
+            yield from self._score(image_dir, filenames, img_size, batch_size)
+            return
+
+        version = self.cache_version(img_size)
+        cached, missing = cache.lookup(image_dir, filenames, version)
+        digests = dict(missing)
+        # Missing files are scored in filename order, so the next scored file is
+        # always the next filename without a cached prediction
+        scored = self._score(image_dir, list(digests), img_size, batch_size)
+        try:
+            for filename in filenames:
+                if filename in cached:
+                    yield filename, cached[filename]
+                else:
+                    filename, pred = next(scored)
+                    cache.put(digests[filename], version, pred)
+                    yield filename, pred
+        finally:
+            cache.flush()
+
+    def cache_version(self, img_size=(224, 224)):
+        """Prediction cache key for this model with the given preprocessing."""
+        return f'{self.model_version}:{img_size[0]}x{img_size[1]}'
+
+    def _score(self, image_dir, filenames, img_size, batch_size):
+        if not filenames:
+            return
+        dataset = image_dataset(image_dir, filenames, img_size, batch_size)
+        predict_step = self._predict_step()
+        for names, images in dataset:
+            classes = predict_step(images).numpy()
+            for name, pred in zip(names.numpy(), classes):
+                yield name.decode(), int(pred)
+
+    def warm_up(self, batch_size=1):
+        """
+        Trace and run the prediction step on a dummy batch, so the first real
+        request doesn't pay for tracing and kernel initialisation.
+        :param batch_size: Size of the dummy batch
+        """
+        dummy = tf.zeros((batch_size,) + tuple(self.model.input_shape[1:]))
+        self._predict_step()(dummy).numpy()
 
-        predictions = {}
-        for filename in os.listdir(image_dir):
-            if filename.endswith(('.png', '.jpg', '.jpeg')):
-                img_path = os.path.join(image_dir, filename)
-                img = load_img(img_path, target_size=img_size)
-                img_array = img_to_array(img) / 255.0  # Normalize
-                img_array = np.expand_dims(img_array, axis=0)  # Add batch dimension
+    def _predict_step(self):
+        """Traced ``model(x, training=False)`` + argmax, skipping the per-call overhead of ``model.predict``."""
+        if self._compiled_predict is None:
+            model = self.model
+            input_shape = getattr(model, 'input_shape', None)
+            if isinstance(input_shape, tuple) and None not in input_shape[1:]:
+                # One trace for every batch size
+                signature = {'input_signature': [tf.TensorSpec((None,) + tuple(input_shape[1:]), tf.float32)]}
+            else:
+                signature = {'reduce_retracing': True}
 
-                pred = self.predict(img_array)
-                predictions[filename] = pred[0]
+            @tf.function(**signature)
+            def predict_step(images):
+                return tf.argmax(model(images, training=False), axis=1)
 
-        return predictions
+            self._compiled_predict = predict_step
+        return self._compiled_predict
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,118 @@
+# src/ai/model_registry.py
+
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import tensorflow as tf
+from .inference import ModelInference
+
+def model_memory(model):
+    """
+    Approximate memory held by a model's weights.
+    :param model: Keras model
+    :return: Size in bytes
+    """
+    return sum(int(np.prod(w.shape)) * tf.as_dtype(w.dtype).size for w in model.weights)
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded, warmed-up models.
+
+    Each model file is loaded once and shared by every caller. Models are
+    warmed up with a dummy batch before they are handed out, and the least
+    recently used ones are evicted when the total weight size exceeds
+    ``memory_budget``. Concurrent requests for the same model wait for a
+    single load; loads of different models run in parallel.
+    """
+
+    def __init__(self, memory_budget=2 << 30, warmup_batch_size=1, factory=ModelInference):
+        """
+        :param memory_budget: Maximum total weight size of cached models, in bytes
+        :param warmup_batch_size: Dummy batch size for warm-up (0 disables warm-up)
+        :param factory: Callable (model_path, model_version) -> ModelInference
+        """
+        self.memory_budget = memory_budget
+        self.warmup_batch_size = warmup_batch_size
+        self.factory = factory
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._load_locks = {}
+        self._lock = threading.Lock()
+
+    @property
+    def memory_used(self):
+        """Total weight size of the cached models, in bytes."""
+        with self._lock:
+            return sum(size for _, size in self._entries.values())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, model_path):
+        with self._lock:
+            return os.path.abspath(model_path) in self._entries
+
+    def get(self, model_path, model_version=None):
+        """
+        Return the shared ModelInference for a model, loading and warming it up on first use.
+        :param model_path: Path of the saved model
+        :param model_version: Passed to ModelInference on load
+        :return: ModelInference
+        """
+        key = os.path.abspath(model_path)
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        with load_lock:
+            with self._lock:
+                entry = self._lookup(key)
+                if entry is not None:
+                    return entry
+            inference = self.factory(model_path, model_version)
+            if self.warmup_batch_size:
+                inference.warm_up(self.warmup_batch_size)
+            with self._lock:
+                self.loads += 1
+                self._entries[key] = (inference, model_memory(inference.model))
+                self._evict()
+                self._load_locks.pop(key, None)
+            return inference
+
+    def evict(self, model_path):
+        """
+        Drop a model from the registry; callers still holding it can keep using it.
+        :param model_path: Path of the saved model
+        :return: True if the model was cached
+        """
+        with self._lock:
+            return self._entries.pop(os.path.abspath(model_path), None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _lookup(self, key):
+        """Return the cached model and mark it most recently used (lock held)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def _evict(self):
+        """Evict least recently used models until within budget, keeping the newest (lock held)."""
+        total = sum(size for _, size in self._entries.values())
+        while total > self.memory_budget and len(self._entries) > 1:
+            _, (_, size) = self._entries.popitem(last=False)
+            total -= size
+            self.evictions += 1
+
+# Shared registry for services that create a ModelInference per request type
+registry = ModelRegistry()
@@ -1,15 +1,77 @@
 # src/ai/neural_networks.py
 
+import logging
+import platform
+from contextlib import contextmanager
 import tensorflow as tf
-from tensorflow.keras import layers, models, regularizers
+from tensorflow.keras import activations, layers, models, regularizers
 from tensorflow.keras.applications import VGG16, ResNet50
 from tensorflow.keras.utils import plot_model
-
+from .feature_cache import FeatureBatches, FeatureCache
+
+logger = logging.getLogger(__name__)
+
+_CPU_BF16_FLAGS = {'avx512_bf16', 'amx_bf16', 'bf16'}
+
+def bfloat16_supported():
+    """
+    Whether the training device has native bfloat16 arithmetic: GPUs of compute
+    capability 8.0 (Ampere) or newer, otherwise AVX512-BF16/AMX on x86 or BF16 on Arm.
+    Without it, bfloat16 is emulated and slower than float32.
+    """
+    gpus = tf.config.list_physical_devices('GPU')
+    if gpus:
+        capabilities = [tf.config.experimental.get_device_details(gpu).get('compute_capability') for gpu in gpus]
+        return all(capability is not None and capability >= (8, 0) for capability in capabilities)
+    try:
+        with open('/proc/cpuinfo') as f:
+            flags = {word for line in f if line.startswith(('flags', 'Features')) for word in line.split()}
+    except OSError:  # Not Linux
+        return platform.system() == 'Darwin' and platform.machine() == 'arm64'
+    return bool(flags & _CPU_BF16_FLAGS)
+
+@contextmanager
+def precision_policy(mixed_precision=False):
+    """
+    Build layers under the 'mixed_bfloat16' policy (bfloat16 compute, float32
+    weights) when requested and supported, restoring the previous global policy after.
+    :param mixed_precision: Request mixed precision
+    :return: Context manager yielding whether mixed precision is in effect
+    """
+    if mixed_precision and not bfloat16_supported():
+        logger.warning("This device has no native bfloat16 support; building the model in float32.")
+        mixed_precision = False
+    if not mixed_precision:
+        yield False
+        return
+    previous = tf.keras.mixed_precision.global_policy()
+    tf.keras.mixed_precision.set_global_policy('mixed_bfloat16')
+    try:
+        yield True
+    finally:
+        tf.keras.mixed_precision.set_global_policy(previous)
+
+def compile_classifier(model, learning_rate=0.001, jit_compile=False, steps_per_execution=1):
+    """
+    Compile a classifier with Adam and sparse categorical cross-entropy.
+    :param model: Keras model
+    :param learning_rate: Adam learning rate
+    :param jit_compile: Compile the train and predict steps with XLA
+    :param steps_per_execution: Batches run per call into the compiled step
+    """
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate),
+                  loss='sparse_categorical_crossentropy',
+                  metrics=['accuracy'],
+                  jit_compile=jit_compile,
+                  steps_per_execution=steps_per_execution)
+
+@tf.keras.utils.register_keras_serializable(package='QuantumCelestiaNexus')
 class CustomDenseLayer(layers.Layer):
     def __init__(self, units, activation='relu', kernel_regularizer=None, **kwargs):
         super(CustomDenseLayer, self).__init__(**kwargs)
         self.units = units
-        self.activation = activation
+        # Resolved once here rather than on every call
+        self.activation = activations.get(activation)
         self.kernel_regularizer = regularizers.get(kernel_regularizer)
 
     def build(self, input_shape):
@@ -22,32 +84,50 @@ class CustomDenseLayer(layers.Layer):
                                  trainable=True)
 
     def call(self, inputs):
-        z = tf.matmul(inputs, self.w) + self.b
-        return tf.keras.activations.get(self.activation)(z)
+        return self.activation(tf.nn.bias_add(tf.matmul(inputs, self.w), self.b))
+
+    def get_config(self):
+        config = super(CustomDenseLayer, self).get_config()
+        config.update({
+            'units': self.units,
+            'activation': activations.serialize(self.activation),
+            'kernel_regularizer': regularizers.serialize(self.kernel_regularizer),
+        })
+        return config
 
 class FeedforwardNN:
-    def __init__(self, input_shape, num_classes):
-        self.model = self.build_model(input_shape, num_classes)
+    def __init__(self, input_shape, num_classes, mixed_precision=False):
+        """
+        :param input_shape: Shape of one input sample
+        :param num_classes: Number of output classes
+        :param mixed_precision: Compute in bfloat16 on CPUs that support it (outputs stay float32)
+        """
+        with precision_policy(mixed_precision) as self.mixed_precision:
+            self.model = self.build_model(input_shape, num_classes)
 
     def build_model(self, input_shape, num_classes):
         model = models.Sequential()
         model.add(layers.Input(shape=input_shape))
         model.add(CustomDenseLayer(128, activation='relu', kernel_regularizer='l2'))
         model.add(CustomDenseLayer(64, activation='relu'))
-        model.add(layers.Dense(num_classes, activation='softmax'))
+        model.add(layers.Dense(num_classes, activation='softmax', dtype='float32'))
         return model
 
-    def compile_model(self, learning_rate=0.001):
-        self.model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate),
-                           loss='sparse_categorical_crossentropy',
-                           metrics=['accuracy'])
+    def compile_model(self, learning_rate=0.001, jit_compile=False, steps_per_execution=1):
+        compile_classifier(self.model, learning_rate, jit_compile, steps_per_execution)
 
     def visualize_model(self, filename='model.png'):
         plot_model(self.model, to_file=filename, show_shapes=True, show_layer_names=True)
 
 class ConvolutionalNN:
-    def __init__(self, input_shape, num_classes):
-        self.model = self.build_model(input_shape, num_classes)
+    def __init__(self, input_shape, num_classes, mixed_precision=False):
+        """
+        :param input_shape: Shape of one input image
+        :param num_classes: Number of output classes
+        :param mixed_precision: Compute in bfloat16 on CPUs that support it (outputs stay float32)
+        """
+        with precision_policy(mixed_precision) as self.mixed_precision:
+            self.model = self.build_model(input_shape, num_classes)
 
     def build_model(self, input_shape, num_classes):
         model = models.Sequential()
@@ -57,26 +137,34 @@ class ConvolutionalNN:
         model.add(layers.MaxPooling2D((2, 2)))
         model.add(layers.Flatten())
         model.add(layers.Dense(64, activation='relu'))
-        model.add(layers.Dense(num_classes, activation='softmax'))
+        model.add(layers.Dense(num_classes, activation='softmax', dtype='float32'))
         return model
 
-    def compile_model(self, learning_rate=0.001):
-        self.model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate),
-                           loss='sparse_categorical_crossentropy',
-                           metrics=['accuracy'])
+    def compile_model(self, learning_rate=0.001, jit_compile=False, steps_per_execution=1):
+        compile_classifier(self.model, learning_rate, jit_compile, steps_per_execution)
 
     def visualize_model(self, filename='cnn_model.png'):
         plot_model(self.model, to_file=filename, show_shapes=True, show_layer_names=True)
 
 class TransferLearningModel:
-    def __init__(self, base_model_name, num_classes, input_shape=(224, 224, 3)):
-        self.model = self.build_model(base_model_name, num_classes, input_shape)
+    def __init__(self, base_model_name, num_classes, input_shape=(224, 224, 3), mixed_precision=False,
+                 weights='imagenet'):
+        """
+        :param base_model_name: 'VGG16' or 'ResNet50'
+        :param num_classes: Number of output classes
+        :param input_shape: Shape of one input image
+        :param mixed_precision: Compute in bfloat16 on CPUs that support it (outputs stay float32)
+        :param weights: Base model weights: 'imagenet', None for random, or a weights file
+        """
+        self.weights = weights
+        with precision_policy(mixed_precision) as self.mixed_precision:
+            self.model = self.build_model(base_model_name, num_classes, input_shape)
 
     def build_model(self, base_model_name, num_classes, input_shape):
         if base_model_name == 'VGG16':
-            base_model = VGG16(weights='imagenet', include_top=False, input_shape=input_shape)
+            base_model = VGG16(weights=self.weights, include_top=False, input_shape=input_shape)
         elif base_model_name == 'ResNet50':
-            base_model = ResNet50(weights='imagenet', include_top=False, input_shape=input_shape)
+            base_model = ResNet50(weights=self.weights, include_top=False, input_shape=input_shape)
         else:
             raise ValueError("Unsupported base model. Choose 'VGG16' or 'ResNet50'.")
 
@@ -84,16 +172,60 @@ class TransferLearningModel:
         model.add(base_model)
         model.add(layers.Flatten())
         model.add(layers.Dense(256, activation='relu'))
-        model.add(layers.Dense(num_classes, activation='softmax'))
+        model.add(layers.Dense(num_classes, activation='softmax', dtype='float32'))
 
         # Freeze the base model
         base_model.trainable = False
         return model
 
-    def compile_model(self, learning_rate=0.001):
-        self.model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate),
-                           loss='sparse_categorical_crossentropy',
-                           metrics=['accuracy'])
+    def compile_model(self, learning_rate=0.001, jit_compile=False, steps_per_execution=1):
+        compile_classifier(self.model, learning_rate, jit_compile, steps_per_execution)
+
+    def build_head(self):
+        """
+        Model from the base model's output to the predictions, sharing the
+        Flatten/Dense layers (and so their weights) with ``self.model``.
+        """
+        base_model = self.model.layers[0]
+        inputs = layers.Input(shape=base_model.output.shape[1:])
+        x = inputs
+        for layer in self.model.layers[1:]:
+            x = layer(x)
+        return models.Model(inputs, x)
+
+    def train_head(self, train_data, val_data=None, cache_dir='feature_cache', epochs=10, batch_size=32,
+                   learning_rate=0.001, train_fingerprint=None, val_fingerprint=None, callbacks=None):
+        """
+        Train only the head on cached base model features. The frozen base runs
+        once over the data; its outputs are stored under cache_dir and reused
+        for every epoch and later runs until the data or the base weights
+        change. Augmentation can't be applied to cached features, so pass
+        un-augmented data.
+        :param train_data: (images, labels) tuple of arrays, or a dataset of (images, labels) batches
+        :param val_data: Optional validation data in the same form
+        :param cache_dir: Directory for cached features
+        :param epochs: Number of epochs
+        :param batch_size: Batch size for feature extraction (array data) and head training
+        :param learning_rate: Adam learning rate for the head
+        :param train_fingerprint: Identifies dataset train_data (e.g. TFDataLoader.fingerprint)
+        :param val_fingerprint: Identifies dataset val_data
+        :param callbacks: Keras callbacks for the head's fit
+        :return: Training history
+        """
+        base_model = self.model.layers[0]
+        if base_model.trainable:
+            raise ValueError("Cached features need a frozen base model.")
+        cache = FeatureCache(cache_dir)
+        features, labels = cache.load_or_extract(base_model, train_data, 'train', train_fingerprint, batch_size)
+        validation = None
+        if val_data is not None:
+            val_features, val_labels = cache.load_or_extract(base_model, val_data, 'val', val_fingerprint, batch_size)
+            validation = FeatureBatches(val_features, val_labels, batch_size, shuffle=False)
+
+        head = self.build_head()
+        compile_classifier(head, learning_rate)
+        return head.fit(FeatureBatches(features, labels, batch_size), validation_data=validation,
+                        epochs=epochs, callbacks=callbacks)
 
     def unfreeze_base_model(self):
         for layer in self.model.layers[0].layers:
@@ -0,0 +1,140 @@
+# src/ai/prediction_cache.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS predictions (
+    digest BLOB NOT NULL,
+    model_version TEXT NOT NULL,
+    prediction INTEGER NOT NULL,
+    PRIMARY KEY (digest, model_version)
+);
+"""
+
+def file_digest(path):
+    """
+    SHA-256 digest of a file's contents.
+    :param path: File path
+    :return: 32-byte digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.digest()
+
+class PredictionCache:
+    """
+    Persistent cache of per-file predictions in a SQLite database.
+
+    Predictions are keyed by the SHA-256 of the file contents and a model
+    version, so renamed or copied files still hit and retrained models miss.
+    Each file's size and mtime are remembered next to its digest, and the
+    file is only re-hashed when either of them changes.
+    """
+
+    def __init__(self, db_path, flush_every=1024):
+        """
+        :param db_path: Path of the SQLite database (created if missing)
+        :param flush_every: Number of buffered predictions that triggers a commit
+        """
+        self.db_path = db_path
+        self.flush_every = flush_every
+        self.hits = 0
+        self.misses = 0
+        self.hashed = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+
+    def digest(self, path):
+        """
+        Content digest of a file, re-hashed only if its size or mtime changed.
+        :param path: File path
+        :return: 32-byte digest
+        """
+        stat = os.stat(path)
+        path = os.path.abspath(path)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT digest FROM files WHERE path = ? AND size = ? AND mtime_ns = ?',
+                (path, stat.st_size, stat.st_mtime_ns)
+            ).fetchone()
+        if row is not None:
+            return row[0]
+        digest = file_digest(path)
+        with self._lock:
+            self.hashed += 1
+            self._conn.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)',
+                               (path, stat.st_size, stat.st_mtime_ns, digest))
+        return digest
+
+    def lookup(self, image_dir, filenames, model_version):
+        """
+        Split files into cached predictions and files that still need scoring.
+        :param image_dir: Directory containing the files
+        :param filenames: Filenames within image_dir
+        :param model_version: Identifies the model and preprocessing
+        :return: Tuple of ({filename: prediction}, [(filename, digest)] to score)
+        """
+        cached, missing = {}, []
+        for filename in filenames:
+            digest = self.digest(os.path.join(image_dir, filename))
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT prediction FROM predictions WHERE digest = ? AND model_version = ?',
+                    (digest, model_version)
+                ).fetchone()
+            if row is None:
+                missing.append((filename, digest))
+            else:
+                cached[filename] = row[0]
+        with self._lock:
+            self.hits += len(cached)
+            self.misses += len(missing)
+            self._conn.commit()
+        return cached, missing
+
+    def put(self, digest, model_version, prediction):
+        """
+        Buffer a prediction; buffered predictions are committed every ``flush_every`` puts.
+        :param digest: Content digest of the scored file
+        :param model_version: Identifies the model and preprocessing
+        :param prediction: Predicted class index
+        """
+        with self._lock:
+            self._pending.append((digest, model_version, int(prediction)))
+            if len(self._pending) >= self.flush_every:
+                self._flush()
+
+    def flush(self):
+        """Commit buffered predictions."""
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _flush(self):
+        if self._pending:
+            self._conn.executemany('INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)', self._pending)
+            self._pending = []
+        self._conn.commit()
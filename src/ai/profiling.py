@@ -0,0 +1,239 @@
+# src/ai/profiling.py
+
+import json
+import time
+from collections import deque
+import numpy as np
+import tensorflow as tf
+
+from resource_usage import peak_rss_mb
+
+def _json_value(value):
+    try:
+        return float(np.asarray(value))
+    except (TypeError, ValueError):
+        return str(value)
+
+def _batch_size(batch):
+    first = batch[0] if isinstance(batch, (tuple, list)) else batch
+    while isinstance(first, (tuple, list, dict)):
+        first = next(iter(first.values())) if isinstance(first, dict) else first[0]
+    return int(first.shape[0]) if getattr(first, 'shape', None) else None
+
+def _iterate(data):
+    """One pass over a batch source; Keras Sequence-style sources are indexed, not iterated (they repeat forever)."""
+    if not isinstance(data, tf.data.Dataset) and hasattr(data, '__getitem__') and hasattr(data, '__len__'):
+        return (data[i] for i in range(len(data)))
+    return iter(data)
+
+class _TimedCallback(tf.keras.callbacks.Callback):
+    """Forwards every hook to another callback and reports the time spent in it."""
+
+    def __init__(self, callback, on_time):
+        super().__init__()
+        self.callback = callback
+        self.on_time = on_time
+
+    def set_model(self, model):
+        super().set_model(model)
+        self.callback.set_model(model)
+
+    def set_params(self, params):
+        super().set_params(params)
+        self.callback.set_params(params)
+
+    def _forward(self, hook, *args, **kwargs):
+        start = time.perf_counter()
+        getattr(self.callback, hook)(*args, **kwargs)
+        self.on_time(time.perf_counter() - start)
+
+    def on_train_begin(self, logs=None):
+        self._forward('on_train_begin', logs)
+
+    def on_train_end(self, logs=None):
+        self._forward('on_train_end', logs)
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._forward('on_epoch_begin', epoch, logs)
+
+    def on_epoch_end(self, epoch, logs=None):
+        self._forward('on_epoch_end', epoch, logs)
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self._forward('on_train_batch_begin', batch, logs)
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._forward('on_train_batch_end', batch, logs)
+
+class TrainingProfiler(tf.keras.callbacks.Callback):
+    """
+    Keras callback that writes per-step and per-epoch training measurements as JSON lines.
+
+    Step records hold the wall time between the batch hooks, samples and
+    samples/sec, the time the step was blocked waiting for its input batch,
+    peak RSS and the batch logs. Epoch records add totals, the input-wait
+    fraction and the time spent in callbacks wrapped with ``timed`` (e.g. the
+    checkpoint). Input wait is only measured for data passed through ``wrap``.
+    A TensorFlow profiler trace can be captured for a range of global steps.
+
+    Put the profiler after the callbacks it times so their epoch-end work is
+    included in the epoch record.
+    """
+
+    def __init__(self, log_path, trace_dir=None, trace_steps=None, batch_size=None):
+        """
+        :param log_path: JSONL output file (appended to)
+        :param trace_dir: Directory for the TensorFlow profiler trace
+        :param trace_steps: (first, last) global steps to trace, inclusive; requires trace_dir
+        :param batch_size: Samples per step for unwrapped data (wrapped data is counted)
+        """
+        super().__init__()
+        if trace_steps is not None and trace_dir is None:
+            raise ValueError("trace_steps needs a trace_dir.")
+        self.log_path = log_path
+        self.trace_dir = trace_dir
+        self.trace_steps = trace_steps
+        self.batch_size = batch_size
+        self.global_step = 0
+        self._file = None
+        self._ready = deque()
+        self._tracing = False
+        self._timed = {}
+        self._reset_epoch(0)
+
+    def wrap(self, data, steps_per_epoch=None):
+        """
+        Wrap training data so the profiler sees when each batch becomes ready.
+        Keras prefetches generators, so a step is blocked on input exactly when
+        its batch is ready after the step began.
+        :param data: Any re-iterable batch source: tf.data dataset, DataLoader iterator, list of batches
+        :param steps_per_epoch: Batches per epoch (defaults to the length of the data)
+        :return: Tuple of (generator for model.fit, steps_per_epoch)
+        """
+        if steps_per_epoch is None:
+            if isinstance(data, tf.data.Dataset):
+                steps_per_epoch = int(data.cardinality())
+            elif hasattr(data, '__len__'):
+                steps_per_epoch = len(data)
+            if steps_per_epoch is None or steps_per_epoch < 0:
+                raise ValueError("The data has no known length; pass steps_per_epoch.")
+
+        def batches():
+            while True:
+                for batch in _iterate(data):
+                    self._ready.append((time.perf_counter(), _batch_size(batch)))
+                    yield batch
+
+        return batches(), steps_per_epoch
+
+    def timed(self, callback, name='checkpoint'):
+        """
+        Wrap another callback so the time spent in it is reported as ``<name>_seconds`` per epoch.
+        :param callback: Keras callback, e.g. ModelCheckpoint
+        :param name: Label in the epoch records
+        :return: Callback to pass to model.fit instead of ``callback``
+        """
+        self._timed[name] = 0.0
+
+        def on_time(seconds):
+            self._timed[name] += seconds
+
+        return _TimedCallback(callback, on_time)
+
+    def on_train_begin(self, logs=None):
+        self._file = open(self.log_path, 'a')
+        self._write({'event': 'train_begin', 'time': time.time(), 'params': dict(self.params or {})})
+
+    def on_train_end(self, logs=None):
+        self._stop_trace()
+        self._write({'event': 'train_end', 'time': time.time(), 'global_step': self.global_step,
+                     'peak_rss_mb': peak_rss_mb()})
+        self._file.close()
+        self._file = None
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._reset_epoch(epoch)
+
+    def on_epoch_end(self, epoch, logs=None):
+        seconds = time.perf_counter() - self._epoch_start
+        record = {
+            'event': 'epoch',
+            'epoch': epoch,
+            'seconds': seconds,
+            'steps': self._epoch_steps,
+            'samples': self._epoch_samples,
+            'samples_per_second': self._epoch_samples / seconds if seconds > 0 else None,
+            'step_seconds': self._epoch_step_seconds,
+            'input_wait_seconds': self._epoch_wait,
+            'input_wait_fraction': self._epoch_wait / self._epoch_step_seconds if self._epoch_step_seconds else None,
+            'peak_rss_mb': peak_rss_mb(),
+        }
+        for name, timed_seconds in self._timed.items():
+            record[f'{name}_seconds'] = timed_seconds
+            self._timed[name] = 0.0
+        record.update({key: _json_value(value) for key, value in (logs or {}).items()})
+        self._write(record)
+        self._file.flush()
+
+    def on_train_batch_begin(self, batch, logs=None):
+        # With steps_per_execution > 1 the global step can skip over the first traced step
+        if (self.trace_steps is not None and not self._tracing
+                and self.trace_steps[0] <= self.global_step <= self.trace_steps[1]):
+            tf.profiler.experimental.start(self.trace_dir)
+            self._tracing = True
+        self._step_start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        # Converting the logs waits for the step to finish
+        values = {key: _json_value(value) for key, value in (logs or {}).items()}
+        now = time.perf_counter()
+        step_seconds = now - self._step_start
+        # With steps_per_execution > 1 one callback covers several batches
+        batches = max(batch + 1 - self._epoch_batches, 1)
+        self._epoch_batches = batch + 1
+        input_wait, samples = None, None
+        if self._ready:
+            input_wait, samples = 0.0, 0
+            for _ in range(min(batches, len(self._ready))):
+                ready, size = self._ready.popleft()
+                input_wait = max(input_wait, ready - self._step_start)
+                samples += size or 0
+        elif self.batch_size:
+            samples = self.batch_size * batches
+        self._epoch_steps += batches
+        self._epoch_samples += samples or 0
+        self._epoch_step_seconds += step_seconds
+        self._epoch_wait += input_wait or 0.0
+        record = {
+            'event': 'step',
+            'epoch': self._epoch,
+            'step': batch,
+            'global_step': self.global_step,
+            'step_seconds': step_seconds,
+            'input_wait_seconds': input_wait,
+            'samples': samples,
+            'samples_per_second': samples / step_seconds if samples and step_seconds > 0 else None,
+            'peak_rss_mb': peak_rss_mb(),
+        }
+        record.update(values)
+        self._write(record)
+        if self._tracing and self.global_step >= self.trace_steps[1]:
+            self._stop_trace()
+        self.global_step += batches
+
+    def _reset_epoch(self, epoch):
+        self._epoch = epoch
+        self._epoch_start = time.perf_counter()
+        self._epoch_batches = 0
+        self._epoch_steps = 0
+        self._epoch_samples = 0
+        self._epoch_step_seconds = 0.0
+        self._epoch_wait = 0.0
+
+    def _stop_trace(self):
+        if self._tracing:
+            tf.profiler.experimental.stop()
+            self._tracing = False
+
+    def _write(self, record):
+        self._file.write(json.dumps(record) + '\n')
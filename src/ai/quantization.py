@@ -0,0 +1,173 @@
+# src/ai/quantization.py
+
+import numpy as np
+import tensorflow as tf
+
+try:
+    from ai_edge_litert.interpreter import Interpreter
+except ImportError:  # LiteRT not installed; use the interpreter bundled with TensorFlow
+    Interpreter = tf.lite.Interpreter
+
+QUANTIZATION_MODES = ('float', 'dynamic', 'int8')
+
+def _keras_model(model):
+    """Accept FeedforwardNN, ConvolutionalNN, TransferLearningModel or a plain Keras model."""
+    return getattr(model, 'model', model)
+
+def _calibration_samples(calibration_data, num_samples):
+    """Yield single-sample float32 batches from an array or a (possibly batched) tf.data dataset."""
+    if isinstance(calibration_data, tf.data.Dataset):
+        count = 0
+        for batch in calibration_data:
+            if isinstance(batch, (tuple, list)):
+                batch = batch[0]  # (inputs, labels)
+            batch = np.asarray(batch, dtype=np.float32)
+            for sample in batch:
+                if count == num_samples:
+                    return
+                count += 1
+                yield [sample[np.newaxis]]
+    else:
+        calibration_data = np.asarray(calibration_data, dtype=np.float32)
+        for sample in calibration_data[:num_samples]:
+            yield [sample[np.newaxis]]
+
+def export_tflite(model, path=None, mode='dynamic', calibration_data=None, num_calibration_samples=200):
+    """
+    Convert a model to TFLite, optionally with post-training quantization.
+    'dynamic' stores weights as int8 and quantizes activations on the fly;
+    'int8' quantizes weights and activations (including inputs and outputs),
+    with activation ranges taken from the calibration data.
+    :param model: FeedforwardNN, ConvolutionalNN, TransferLearningModel or Keras model
+    :param path: File to write the flatbuffer to (not written if None)
+    :param mode: One of 'float', 'dynamic' or 'int8'
+    :param calibration_data: Representative inputs (array or tf.data dataset), required for 'int8'
+    :param num_calibration_samples: Number of calibration samples to use
+    :return: The TFLite flatbuffer
+    """
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Unsupported quantization mode {mode!r}. Choose one of {QUANTIZATION_MODES}.")
+    converter = tf.lite.TFLiteConverter.from_keras_model(_keras_model(model))
+    if mode != 'float':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == 'int8':
+        if calibration_data is None:
+            raise ValueError("Full int8 quantization needs calibration_data.")
+        converter.representative_dataset = lambda: _calibration_samples(calibration_data, num_calibration_samples)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    tflite_model = converter.convert()
+    if path is not None:
+        with open(path, 'wb') as f:
+            f.write(tflite_model)
+    return tflite_model
+
+class TFLiteInference:
+    """
+    Runs an exported TFLite model on CPU, with the same predict/evaluate
+    interface as ModelInference. Quantized inputs and outputs are converted
+    from and to float automatically. An instance is not thread-safe; use one
+    per thread (or a single-worker executor).
+    """
+
+    def __init__(self, model_path=None, model_content=None, num_threads=None, batch_size=32):
+        """
+        :param model_path: Path of a .tflite file
+        :param model_content: TFLite flatbuffer, instead of model_path
+        :param num_threads: Interpreter CPU threads (None for the runtime default)
+        :param batch_size: Maximum number of samples per interpreter call
+        """
+        if (model_path is None) == (model_content is None):
+            raise ValueError("Pass exactly one of model_path or model_content.")
+        self.batch_size = batch_size
+        self.interpreter = Interpreter(model_path=model_path, model_content=model_content,
+                                       num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch = self._input['shape'][0]
+
+    def predict_proba(self, input_data):
+        """
+        Model outputs for the input data, dequantized to float32.
+        :param input_data: Numpy array of shape (num_samples, ...)
+        :return: Numpy array of shape (num_samples, num_classes)
+        """
+        input_data = np.asarray(input_data, dtype=np.float32)
+        outputs = [self._invoke(input_data[start:start + self.batch_size])
+                   for start in range(0, len(input_data), self.batch_size)]
+        return np.concatenate(outputs) if outputs else np.empty((0,) + tuple(self._output['shape'][1:]))
+
+    def predict(self, input_data):
+        """
+        Make predictions on the input data.
+        :param input_data: Numpy array of shape (num_samples, height, width, channels)
+        :return: Predicted class indices
+        """
+        return np.argmax(self.predict_proba(input_data), axis=1)
+
+    # Same entry point as ModelInference, e.g. for BatchingInferenceServer
+    predict_batch = predict
+
+    def evaluate(self, test_data, test_labels):
+        """
+        :param test_data: Numpy array of test images
+        :param test_labels: Numpy array of true labels
+        :return: Dictionary containing accuracy
+        """
+        return {'accuracy': float(np.mean(self.predict(test_data) == np.asarray(test_labels)))}
+
+    def _invoke(self, batch):
+        if len(batch) != self._batch:
+            self.interpreter.resize_tensor_input(self._input['index'], (len(batch),) + batch.shape[1:])
+            self.interpreter.allocate_tensors()
+            self._input = self.interpreter.get_input_details()[0]
+            self._output = self.interpreter.get_output_details()[0]
+            self._batch = len(batch)
+        scale, zero_point = self._input['quantization']
+        if scale:
+            batch = np.clip(np.round(batch / scale + zero_point),
+                            np.iinfo(self._input['dtype']).min, np.iinfo(self._input['dtype']).max)
+        self.interpreter.set_tensor(self._input['index'], batch.astype(self._input['dtype']))
+        self.interpreter.invoke()
+        output = self.interpreter.get_tensor(self._output['index'])
+        scale, zero_point = self._output['quantization']
+        if scale:
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+def quantization_report(model, test_data, test_labels, calibration_data=None,
+                        modes=None, num_threads=None):
+    """
+    Export a model in each quantization mode and compare it with the float Keras model.
+    :param model: FeedforwardNN, ConvolutionalNN, TransferLearningModel or Keras model
+    :param test_data: Numpy array of test images
+    :param test_labels: Numpy array of true labels
+    :param calibration_data: Representative inputs for 'int8', required for that mode; keep them
+                             separate from test_data so the accuracy delta is not flattered
+    :param modes: Quantization modes to export; defaults to 'dynamic', plus 'int8' when
+                  calibration_data is given
+    :param num_threads: Interpreter CPU threads
+    :return: Dictionary per mode with size_bytes, accuracy, accuracy_delta against
+             float and agreement (fraction of predictions equal to float's),
+             plus the float model's accuracy under 'keras'
+    """
+    if modes is None:
+        modes = ('dynamic',) if calibration_data is None else ('dynamic', 'int8')
+    keras_model = _keras_model(model)
+    test_labels = np.asarray(test_labels)
+    float_predictions = np.argmax(keras_model.predict(test_data, verbose=0), axis=1)
+    float_accuracy = float(np.mean(float_predictions == test_labels))
+    report = {'keras': {'accuracy': float_accuracy}}
+    for mode in modes:
+        tflite_model = export_tflite(keras_model, mode=mode, calibration_data=calibration_data)
+        predictions = TFLiteInference(model_content=tflite_model, num_threads=num_threads).predict(test_data)
+        accuracy = float(np.mean(predictions == test_labels))
+        report[mode] = {
+            'size_bytes': len(tflite_model),
+            'accuracy': accuracy,
+            'accuracy_delta': accuracy - float_accuracy,
+            'agreement': float(np.mean(predictions == float_predictions)),
+        }
+    return report
@@ -1,9 +1,14 @@
 # src/ai/training.py
 
+import hashlib
+import os
 import tensorflow as tf
+from tensorflow.keras import layers
 from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping, ReduceLROnPlateau
 from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from .neural_networks import FeedforwardNN, ConvolutionalNN, TransferLearningModel
+from .inference import list_images, load_image
+from .distributed_training import ArraySource, DirectorySource, train_data_parallel
 
 class DataLoader:
     def __init__(self, train_dir, val_dir, img_size=(224, 224), batch_size=32):
@@ -40,22 +45,215 @@ class DataLoader:
         )
         return train_generator, val_generator
 
+class TFDataLoader:
+    """
+    tf.data replacement for DataLoader with the same constructor arguments and
+    ``load_data()`` contract: (train, validation) datasets of batches of
+    images scaled to [0, 1] with sparse labels from the sorted class
+    subdirectories. Files are read and decoded in parallel, augmentation runs
+    on whole batches, and batches are prefetched while the model trains.
+    """
+
+    def __init__(self, train_dir, val_dir, img_size=(224, 224), batch_size=32,
+                 cache=None, shuffle_buffer=256, augment=True, seed=None):
+        """
+        :param train_dir: Directory with one subdirectory of images per class
+        :param val_dir: Validation directory with the same layout
+        :param img_size: Size to which images will be resized
+        :param batch_size: Number of images per batch
+        :param cache: Cache decoded images: None for no cache, True for memory,
+                      or a directory for cache files on local disk
+        :param shuffle_buffer: Shuffle buffer size (in images) when decoded images are cached
+        :param augment: Apply random rotation, shift, zoom and flip to training batches
+        :param seed: Seed for shuffling and augmentation
+        """
+        self.train_dir = train_dir
+        self.val_dir = val_dir
+        self.img_size = tuple(img_size)
+        self.batch_size = batch_size
+        self.cache = cache
+        self.shuffle_buffer = shuffle_buffer
+        self.augment = augment
+        self.seed = seed
+        self.class_indices = {}
+        self.augmentation = self._build_augmentation()
+
+    def _build_augmentation(self):
+        # Same ranges as DataLoader's ImageDataGenerator; its 0.2 degree shear is left out.
+        # Each layer gets its own seed so their random draws are independent.
+        def seed(offset):
+            return None if self.seed is None else self.seed + offset
+
+        return tf.keras.Sequential([
+            layers.RandomRotation(20 / 360, fill_mode='nearest', seed=seed(0)),
+            layers.RandomTranslation(0.2, 0.2, fill_mode='nearest', seed=seed(1)),
+            layers.RandomZoom(0.2, 0.2, fill_mode='nearest', seed=seed(2)),
+            layers.RandomFlip('horizontal', seed=seed(3)),
+        ])
+
+    def __getstate__(self):
+        # Loaders are pickled into data-parallel workers; layers are rebuilt there
+        state = dict(self.__dict__)
+        del state['augmentation']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.augmentation = self._build_augmentation()
+
+    def load_data(self):
+        self.class_indices = {name: i for i, name in enumerate(self._class_names(self.train_dir))}
+        train_dataset = self.build_dataset(self.train_dir, training=True)
+        val_dataset = self.build_dataset(self.val_dir, training=False)
+        return train_dataset, val_dataset
+
+    def load_sources(self):
+        """
+        Picklable (train, validation) sources for ``ModelTrainer.train_data_parallel``;
+        each worker rebuilds its own shard of the datasets.
+        """
+        self.class_indices = {name: i for i, name in enumerate(self._class_names(self.train_dir))}
+        return DirectorySource(self, self.train_dir, training=True), DirectorySource(self, self.val_dir)
+
+    def build_dataset(self, directory, training=False, num_shards=1, shard_index=0):
+        """
+        Batched dataset of (images, labels) for one directory.
+        :param directory: Directory with one subdirectory of images per class
+        :param training: Shuffle and augment
+        :param num_shards: Split the files into this many disjoint shards
+        :param shard_index: Shard to return
+        :return: tf.data.Dataset
+        """
+        paths, labels = self._list_files(directory)
+        # Sharding the file list keeps each worker from reading the others' files
+        paths, labels = paths[shard_index::num_shards], labels[shard_index::num_shards]
+        dataset = tf.data.Dataset.from_tensor_slices((paths, labels))
+        if training:
+            # Shuffling paths is free. Files are listed class by class, so a cached dataset
+            # is shuffled once before caching; the small buffer after it only mixes per epoch.
+            dataset = dataset.shuffle(len(paths), seed=self.seed, reshuffle_each_iteration=not self.cache)
+        dataset = dataset.map(lambda path, label: (load_image(path, self.img_size), label),
+                              num_parallel_calls=tf.data.AUTOTUNE, deterministic=not training)
+        if self.cache:
+            dataset = dataset.cache(self._cache_file(directory, paths))
+            if training:
+                dataset = dataset.shuffle(self.shuffle_buffer, seed=self.seed, reshuffle_each_iteration=True)
+        dataset = dataset.batch(self.batch_size)
+        if training and self.augment:
+            dataset = dataset.map(lambda images, labels: (self.augmentation(images, training=True), labels),
+                                  num_parallel_calls=tf.data.AUTOTUNE, deterministic=False)
+        return dataset.prefetch(tf.data.AUTOTUNE)
+
+    def _class_names(self, directory):
+        return sorted(entry.name for entry in os.scandir(directory) if entry.is_dir())
+
+    def _list_files(self, directory):
+        paths, labels = [], []
+        for class_name in self._class_names(directory):
+            if class_name not in self.class_indices:
+                raise ValueError(f"Class {class_name!r} in {directory} does not exist in {self.train_dir}.")
+            class_dir = os.path.join(directory, class_name)
+            for filename in list_images(class_dir):
+                paths.append(os.path.join(class_dir, filename))
+                labels.append(self.class_indices[class_name])
+        if not paths:
+            raise ValueError(f"No images found in {directory}.")
+        return paths, labels
+
+    def fingerprint(self, directory, paths=None):
+        """
+        Digest of a directory's image list, file sizes and mtimes and the resize
+        target; it changes whenever the decoded dataset would.
+        :param directory: Directory with one subdirectory of images per class
+        :param paths: Image paths, if already listed
+        :return: Hex digest
+        """
+        if paths is None:
+            if not self.class_indices:
+                self.class_indices = {name: i for i, name in enumerate(self._class_names(self.train_dir))}
+            paths, _ = self._list_files(directory)
+        fingerprint = hashlib.sha256(repr(self.img_size).encode())
+        for path in paths:
+            stat = os.stat(path)
+            fingerprint.update(f'{path}\0{stat.st_size}\0{stat.st_mtime_ns}\0'.encode())
+        return fingerprint.hexdigest()
+
+    def _cache_file(self, directory, paths):
+        """Cache file path ('' for memory), named after the file list so changed data gets a new cache."""
+        if self.cache is True:
+            return ''
+        os.makedirs(self.cache, exist_ok=True)
+        name = os.path.basename(os.path.normpath(directory))
+        return os.path.join(self.cache, f'{name}-{self.fingerprint(directory, paths)[:16]}')
+
 class ModelTrainer:
     def __init__(self, model, train_data, val_data):
         self.model = model
         self.train_data = train_data
         self.val_data = val_data
 
-    def train(self, epochs=50, batch_size=32):
+    def train(self, epochs=50, batch_size=32, profiler=None):
+        """
+        :param epochs: Maximum number of epochs
+        :param batch_size: Batch size when the training data are arrays
+        :param profiler: Optional TrainingProfiler; the training data are wrapped so it can
+                         measure input wait, and the checkpoint is timed
+        :return: Training history
+        """
         checkpoint = ModelCheckpoint('best_model.h5', save_best_only=True, monitor='val_loss', mode='min')
         early_stopping = EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True)
         reduce_lr = ReduceLROnPlateau(monitor='val_loss', factor=0.2, patience=3, min_lr=1e-6)
 
-        history = self.model.fit(self.train_data,
+        if profiler is None:
+            history = self.model.fit(self.train_data,
+                                      validation_data=self.val_data,
+                                      epochs=epochs,
+                                      batch_size=batch_size,
+                                      callbacks=[checkpoint, early_stopping, reduce_lr])
+            return history
+
+        train_data = self.train_data
+        if isinstance(train_data, tuple):
+            # Shuffled every epoch, as model.fit does for arrays
+            train_data = (tf.data.Dataset.from_tensor_slices(train_data)
+                          .shuffle(len(train_data[0]), reshuffle_each_iteration=True)
+                          .batch(batch_size))
+        train_data, steps_per_epoch = profiler.wrap(train_data)
+        history = self.model.fit(train_data,
+                                  steps_per_epoch=steps_per_epoch,
                                   validation_data=self.val_data,
                                   epochs=epochs,
-                                  batch_size=batch_size,
-                                  callbacks=[checkpoint, early_stopping, reduce_lr])
+                                  callbacks=[profiler.timed(checkpoint), early_stopping, reduce_lr, profiler])
+        return history
+
+    def train_data_parallel(self, num_workers, epochs=50, batch_size=32, checkpoint_path='best_model.h5',
+                            timeout=None):
+        """
+        Synchronous data-parallel training in ``num_workers`` local processes.
+        Each worker trains a replica on its own shard of the data; gradients are
+        all-reduced every step (MultiWorkerMirroredStrategy over localhost), so
+        the global batch is ``batch_size * num_workers`` and the compiled
+        optimizer's learning rate is scaled by ``num_workers``. The trained
+        weights are loaded back into ``self.model`` and saved to checkpoint_path.
+        :param num_workers: Number of worker processes
+        :param epochs: Maximum number of epochs (early stopping and LR reduction as in train)
+        :param batch_size: Batch size per worker
+        :param checkpoint_path: Where to save the trained model (None to skip)
+        :param timeout: Seconds to wait for the workers before failing
+        :return: Training history
+        :raises RuntimeError: If a worker fails or times out
+        """
+        train_source, val_source = self.train_data, self.val_data
+        if isinstance(train_source, tuple):
+            train_source = ArraySource(*train_source, training=True)
+        if isinstance(val_source, tuple):
+            val_source = ArraySource(*val_source)
+        history, weights, self.parallel_stats = train_data_parallel(
+            self.model, train_source, val_source, num_workers, epochs, batch_size, timeout
+        )
+        self.model.set_weights(weights)
+        if checkpoint_path:
+            self.model.save(checkpoint_path)
         return history
 
     def load_model(self, model_path='best_model.h5'):
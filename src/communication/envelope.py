@@ -0,0 +1,133 @@
+# communication/envelope.py
+
+import struct
+from typing import Iterator, List, Sequence, Tuple, Union
+
+from Crypto.Cipher import AES, PKCS1_OAEP
+from Crypto.Hash import SHA256
+from Crypto.PublicKey import RSA
+from Crypto.Random import get_random_bytes
+
+from .key_provider import key_cache
+from .stream_cipher import DEFAULT_CHUNK_SIZE, StreamSource, _Reader, decrypt_stream, encrypt_stream
+
+# Envelope header: magic, version, mode, number of recipients; followed by one
+# (key fingerprint, wrapped key length, wrapped key) entry per recipient.
+_ENVELOPE_HEADER = struct.Struct('>4sBBH')
+_RECIPIENT_HEADER = struct.Struct('>32sH')
+_ENVELOPE_MAGIC = b'QNEV'
+ENVELOPE_VERSION = 1
+
+_MODE_MESSAGE = 0
+_MODE_STREAM = 1
+
+_DATA_KEY_SIZE = 32
+_NONCE_SIZE = 12
+_TAG_SIZE = 16
+
+KeyLike = Union[bytes, str, RSA.RsaKey]
+
+
+def _as_key(key: KeyLike) -> RSA.RsaKey:
+    return key if isinstance(key, RSA.RsaKey) else key_cache.import_key(key)
+
+
+def recipient_id(key: KeyLike) -> bytes:
+    """SHA-256 fingerprint of the DER public key, identifying a recipient's slot."""
+    return SHA256.new(_as_key(key).publickey().export_key('DER')).digest()
+
+
+def oaep_cipher(key: KeyLike) -> PKCS1_OAEP.PKCS1OAEP_Cipher:
+    """RSA-OAEP (SHA-256) cipher for an encoded or parsed key."""
+    return PKCS1_OAEP.new(_as_key(key), hashAlgo=SHA256)
+
+
+def _seal_header(mode: int, data_key: bytes, recipients: Sequence[KeyLike]) -> bytes:
+    if not recipients:
+        raise ValueError("An envelope needs at least one recipient.")
+    parts = [_ENVELOPE_HEADER.pack(_ENVELOPE_MAGIC, ENVELOPE_VERSION, mode, len(recipients))]
+    for recipient in recipients:
+        wrapped = oaep_cipher(recipient).encrypt(data_key)
+        parts.append(_RECIPIENT_HEADER.pack(recipient_id(recipient), len(wrapped)))
+        parts.append(wrapped)
+    return b"".join(parts)
+
+
+def _open_header(reader: _Reader, mode: int, private_key: KeyLike) -> Tuple[bytes, bytes]:
+    """Read an envelope header and unwrap the data key; returns (header bytes, data key)."""
+    fixed = bytes(reader.read_exact(_ENVELOPE_HEADER.size))
+    magic, version, envelope_mode, count = _ENVELOPE_HEADER.unpack(fixed)
+    if magic != _ENVELOPE_MAGIC or version != ENVELOPE_VERSION or envelope_mode != mode:
+        raise ValueError("Not an envelope of the expected kind or unsupported envelope version.")
+    own_id = recipient_id(private_key)
+    parts: List[bytes] = [fixed]
+    wrapped_key = None
+    for _ in range(count):
+        entry = bytes(reader.read_exact(_RECIPIENT_HEADER.size))
+        fingerprint, length = _RECIPIENT_HEADER.unpack(entry)
+        wrapped = bytes(reader.read_exact(length))
+        parts += [entry, wrapped]
+        if fingerprint == own_id:
+            wrapped_key = wrapped
+    if wrapped_key is None:
+        raise ValueError("The envelope is not addressed to this key.")
+    return b"".join(parts), oaep_cipher(private_key).decrypt(wrapped_key)
+
+
+def seal(plaintext: Union[bytes, memoryview], recipients: Sequence[KeyLike]) -> bytes:
+    """
+    Encrypt a message once with a fresh AES-256-GCM data key wrapped for every recipient.
+    The header, including all wrapped keys, is authenticated as associated data.
+    :param plaintext: The message.
+    :param recipients: Recipients' public keys (encoded or parsed).
+    :return: The envelope.
+    """
+    data_key = get_random_bytes(_DATA_KEY_SIZE)
+    header = _seal_header(_MODE_MESSAGE, data_key, recipients)
+    cipher = AES.new(data_key, AES.MODE_GCM, nonce=get_random_bytes(_NONCE_SIZE))
+    cipher.update(header)
+    ciphertext, tag = cipher.encrypt_and_digest(plaintext)
+    return b"".join((header, cipher.nonce, tag, ciphertext))
+
+
+def open_envelope(envelope: Union[bytes, memoryview], private_key: KeyLike) -> bytes:
+    """
+    Decrypt an envelope produced by ``seal``.
+    :param envelope: The envelope.
+    :param private_key: One recipient's private key.
+    :return: The message.
+    :raises ValueError: If the envelope is not addressed to the key or fails authentication.
+    """
+    reader = _Reader(envelope)
+    header, data_key = _open_header(reader, _MODE_MESSAGE, private_key)
+    nonce = reader.read_exact(_NONCE_SIZE)
+    tag = reader.read_exact(_TAG_SIZE)
+    ciphertext = reader.read(len(envelope))
+    cipher = AES.new(data_key, AES.MODE_GCM, nonce=bytes(nonce))
+    cipher.update(header)
+    return cipher.decrypt_and_verify(ciphertext, tag)
+
+
+def seal_stream(
+    source: StreamSource,
+    recipients: Sequence[KeyLike],
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """
+    Envelope for a large payload: the wrapped data keys followed by a chunked
+    AES-GCM stream (see ``stream_cipher.encrypt_stream``) under that key.
+    As in ``seal``, the header with all wrapped keys is authenticated as associated
+    data, here of every chunk.
+    :return: Iterator of output pieces.
+    """
+    data_key = get_random_bytes(_DATA_KEY_SIZE)
+    header = _seal_header(_MODE_STREAM, data_key, recipients)
+    yield header
+    yield from encrypt_stream(data_key, source, chunk_size, associated_data=header)
+
+
+def open_stream(source: StreamSource, private_key: KeyLike) -> Iterator[bytes]:
+    """Decrypt a ``seal_stream`` envelope chunk by chunk."""
+    reader = _Reader(source)
+    header, data_key = _open_header(reader, _MODE_STREAM, private_key)
+    return decrypt_stream(lambda key_id: data_key, reader, associated_data=header)
@@ -0,0 +1,270 @@
+# communication/key_pool.py
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from Crypto.Hash import SHA256
+from Crypto.Protocol.KDF import HKDF
+
+from .qkd_pipeline import QKDPipeline
+from .quantum_communication import ChannelModel
+
+# QKD bytes consumed as the HKDF input keying material of one AES key
+_MASTER_SECRET_BYTES = 32
+_HKDF_CONTEXT = b"quantum-celestia-nexus/aes-key/"
+
+logger = logging.getLogger(__name__)
+
+
+class QKDKeyPool:
+    """
+    Thread-safe buffer of QKD key material kept filled by a background producer.
+
+    A daemon thread runs a QKDPipeline and appends the whole bytes of every
+    finished key block until ``capacity_bytes`` are buffered, then waits until
+    consumers make room. Material handed out by ``take`` is removed from the
+    pool, so every byte is used at most once.
+    """
+
+    def __init__(
+        self,
+        capacity_bytes: int = 1 << 20,
+        block_bits: int = 1 << 18,
+        seed: Optional[int] = None,
+        channel: Optional[ChannelModel] = None,
+        pipeline: Optional[QKDPipeline] = None
+    ):
+        """
+        :param capacity_bytes: Buffered bytes at which the producer pauses.
+        :param block_bits: Raw qubits per QKD block (ignored if ``pipeline`` is given).
+        :param seed: Master seed of the QKD pipeline (ignored if ``pipeline`` is given).
+        :param channel: Channel model of the QKD link (ignored if ``pipeline`` is given).
+        :param pipeline: Pipeline producing the key blocks.
+        """
+        self.capacity_bytes = capacity_bytes
+        self.pipeline = pipeline or QKDPipeline(block_bits=block_bits, seed=seed, channel=channel)
+        self.bytes_produced = 0
+        self.bytes_consumed = 0
+        self._buffer = bytearray()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self._error = None
+        self._closed = False
+
+    def start(self) -> 'QKDKeyPool':
+        """Start the background producer (no-op if it is already running)."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("QKD key pool is closed.")
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._produce, name='qkd-key-pool', daemon=True)
+                self._thread.start()
+        return self
+
+    def close(self) -> None:
+        """Stop the producer for good; buffered material stays available."""
+        self._stop.set()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> 'QKDKeyPool':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def available(self) -> int:
+        """Number of buffered key bytes."""
+        with self._cond:
+            return len(self._buffer)
+
+    def _produce(self) -> None:
+        stream = self.pipeline.blocks()
+        try:
+            for block in stream:
+                material = block.key[:block.key_length // 8]
+                with self._cond:
+                    self._buffer += material
+                    self.bytes_produced += len(material)
+                    self._cond.notify_all()
+                    while len(self._buffer) >= self.capacity_bytes and not self._stop.is_set():
+                        self._cond.wait()
+                if self._stop.is_set():
+                    return
+        except Exception as e:
+            logger.error("QKD key pool producer failed: %s", e)
+            with self._cond:
+                self._error = e
+                self._cond.notify_all()
+        finally:
+            stream.close()
+
+    def _pop(self, num_bytes: int) -> bytes:
+        material = bytes(self._buffer[:num_bytes])
+        del self._buffer[:num_bytes]
+        self.bytes_consumed += num_bytes
+        self._cond.notify_all()
+        return material
+
+    def take(self, num_bytes: int, timeout: Optional[float] = None) -> bytes:
+        """
+        Remove and return ``num_bytes`` of key material, waiting for the producer if needed.
+        :param num_bytes: Number of bytes to take.
+        :param timeout: Maximum seconds to wait, or None to wait indefinitely.
+        :return: Key material.
+        :raises RuntimeError: If the pool is closed (or its producer failed) before enough material is buffered.
+        """
+        with self._cond:
+            if not self._closed:
+                self.start()
+            ready = self._cond.wait_for(
+                lambda: len(self._buffer) >= num_bytes or self._error is not None or self._closed, timeout
+            )
+            if len(self._buffer) >= num_bytes:
+                return self._pop(num_bytes)
+            if self._error is not None:
+                raise RuntimeError("QKD key pool producer failed") from self._error
+            if self._closed:
+                raise RuntimeError("QKD key pool is closed.")
+            if not ready:
+                raise TimeoutError(f"No {num_bytes} bytes of QKD key material within {timeout} s.")
+            return self._pop(num_bytes)
+
+    def try_take(self, num_bytes: int) -> Optional[bytes]:
+        """Remove and return ``num_bytes`` of key material, or None if not enough is buffered."""
+        with self._cond:
+            if len(self._buffer) < num_bytes:
+                return None
+            return self._pop(num_bytes)
+
+
+class RotatingKeyManager:
+    """
+    AES keys derived with HKDF-SHA256 from QKD key pool material, rotated by use.
+
+    The key in use is replaced once it has protected ``max_messages`` messages
+    or ``max_bytes`` bytes. The next key is prefetched from the pool without
+    blocking, so rotation never waits for key generation; if no material is
+    buffered yet the current key stays in use and the rotation is retried on
+    the next message. Recent keys stay in a ring so in-flight messages can
+    still be decrypted by key id.
+    """
+
+    def __init__(
+        self,
+        pool: QKDKeyPool,
+        key_size: int = 32,
+        max_messages: int = 1 << 20,
+        max_bytes: int = 1 << 30,
+        ring_size: int = 8,
+        salt: bytes = b"",
+        initial_timeout: Optional[float] = 30.0
+    ):
+        """
+        :param pool: Source of QKD key material.
+        :param key_size: AES key size in bytes (16, 24 or 32).
+        :param max_messages: Messages encrypted under one key before rotation.
+        :param max_bytes: Plaintext bytes encrypted under one key before rotation.
+        :param ring_size: Number of recent keys kept for decryption.
+        :param salt: HKDF salt.
+        :param initial_timeout: Seconds the first key may wait for pool material.
+        """
+        if key_size not in (16, 24, 32):
+            raise ValueError("AES key size must be 16, 24 or 32 bytes.")
+        self.pool = pool
+        self.key_size = key_size
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.ring_size = ring_size
+        self.salt = salt
+        self.initial_timeout = initial_timeout
+        self.rotations = 0
+        self.deferred_rotations = 0
+        self._lock = threading.Lock()
+        self._ring = OrderedDict()
+        self._current: Optional[Tuple[int, bytes]] = None
+        self._next: Optional[Tuple[int, bytes]] = None
+        self._next_id = 0
+        self._messages = 0
+        self._bytes = 0
+
+    def _derive(self, secret: bytes) -> Tuple[int, bytes]:
+        key_id = self._next_id
+        self._next_id += 1
+        key = HKDF(secret, self.key_size, self.salt, SHA256,
+                   context=_HKDF_CONTEXT + key_id.to_bytes(4, 'big'))
+        return key_id, key
+
+    def _prefetch(self) -> None:
+        if self._next is None:
+            secret = self.pool.try_take(_MASTER_SECRET_BYTES)
+            if secret is not None:
+                self._next = self._derive(secret)
+
+    def _install(self, key: Tuple[int, bytes]) -> None:
+        self._current = key
+        self._ring[key[0]] = key[1]
+        while len(self._ring) > self.ring_size:
+            self._ring.popitem(last=False)
+        self._messages = self._bytes = 0
+
+    def encryption_key(self, num_bytes: int) -> Tuple[int, bytes]:
+        """
+        Return the key for a message of ``num_bytes`` bytes, rotating if the limits are reached.
+        Only the very first call may wait (up to ``initial_timeout``) for pool material.
+        :param num_bytes: Plaintext size of the message.
+        :return: (key id, key).
+        """
+        with self._lock:
+            started = self._current is not None
+        if not started:
+            # Wait for the first key without the lock, so other callers are not blocked behind it
+            secret = self.pool.take(_MASTER_SECRET_BYTES, timeout=self.initial_timeout)
+        with self._lock:
+            if self._current is None:
+                self._install(self._derive(secret))
+            elif not started and self._next is None:
+                # Another caller installed the first key meanwhile; keep this one for the rotation
+                self._next = self._derive(secret)
+            elif self._messages >= self.max_messages or self._bytes + num_bytes > self.max_bytes:
+                self._prefetch()
+                if self._next is not None:
+                    self._install(self._next)
+                    self._next = None
+                    self.rotations += 1
+                else:
+                    self.deferred_rotations += 1
+            self._messages += 1
+            self._bytes += num_bytes
+            self._prefetch()
+            return self._current
+
+    def charge(self, key_id: int, num_bytes: int) -> None:
+        """
+        Count bytes encrypted under ``key_id`` after it was handed out, e.g. by a stream
+        whose size was not known up front. Ignored once that key has been rotated out.
+        :param key_id: Key id returned by ``encryption_key``.
+        :param num_bytes: Plaintext bytes encrypted.
+        """
+        with self._lock:
+            if self._current is not None and self._current[0] == key_id:
+                self._bytes += num_bytes
+
+    def decryption_key(self, key_id: int) -> bytes:
+        """
+        Return a recent key by id.
+        :raises KeyError: If the key id is unknown or has left the ring.
+        """
+        with self._lock:
+            try:
+                return self._ring[key_id]
+            except KeyError:
+                raise KeyError(f"Unknown or retired key id {key_id}.") from None
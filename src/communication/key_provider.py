@@ -0,0 +1,229 @@
+# communication/key_provider.py
+
+import logging
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import List, Optional, Tuple, Union
+
+from Crypto.Hash import SHA256
+from Crypto.PublicKey import RSA
+from Crypto.Signature import pkcs1_15
+
+_POOL_FILE_PREFIX = 'pool-'
+
+logger = logging.getLogger(__name__)
+
+
+def _generate_pem(key_size: int) -> bytes:
+    """Generate an RSA key pair in a worker process and return it as PEM."""
+    return RSA.generate(key_size).export_key()
+
+
+def key_fingerprint(key_data: Union[bytes, str]) -> bytes:
+    """SHA-256 digest of an encoded key, used as its cache identity."""
+    if isinstance(key_data, str):
+        key_data = key_data.encode()
+    return SHA256.new(key_data).digest()
+
+
+class ParsedKeyCache:
+    """
+    Thread-safe LRU cache of imported RSA keys and their PKCS#1 v1.5 signature
+    schemes, keyed by the fingerprint of the encoded key.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        """
+        :param maxsize: Maximum number of cached keys.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key_data: Union[bytes, str]) -> Tuple[RSA.RsaKey, pkcs1_15.PKCS115_SigScheme]:
+        """
+        Return the parsed key and its signature scheme, importing the key on a miss.
+        :param key_data: PEM or DER encoded RSA key.
+        """
+        fingerprint = key_fingerprint(key_data)
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is not None:
+                self._entries.move_to_end(fingerprint)
+                self.hits += 1
+                return entry
+        key = RSA.import_key(key_data)
+        entry = (key, pkcs1_15.new(key))
+        with self._lock:
+            self.misses += 1
+            self._entries[fingerprint] = entry
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def import_key(self, key_data: Union[bytes, str]) -> RSA.RsaKey:
+        """Cached equivalent of ``RSA.import_key``."""
+        return self.get(key_data)[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Process-wide cache shared by SecureTransmission instances
+key_cache = ParsedKeyCache()
+
+
+class RSAKeyProvider:
+    """
+    Hands out RSA key pairs without paying for generation on the caller's path.
+
+    Spare key pairs are generated ahead of time in a background process and kept
+    in a pool of ``pool_size``; a key is only generated synchronously when the
+    pool is empty. With ``key_dir`` set, unused pooled keys are persisted on
+    ``close`` and loaded again on start-up, and named long-term keys can be
+    loaded with ``load_key``.
+    """
+
+    def __init__(
+        self,
+        key_size: int = 2048,
+        pool_size: int = 4,
+        key_dir: Optional[str] = None,
+        max_workers: int = 1,
+        prefill: bool = True
+    ):
+        """
+        :param key_size: RSA modulus size in bits.
+        :param pool_size: Number of spare key pairs to keep ready.
+        :param key_dir: Directory for persisted keys (nothing is persisted if None).
+        :param max_workers: Number of background generator processes.
+        :param prefill: Start filling the pool immediately instead of on first use.
+        """
+        self.key_size = key_size
+        self.pool_size = pool_size
+        self.key_dir = key_dir
+        self.max_workers = max_workers
+        self.misses = 0
+        self._pool = deque()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._closed = False
+        if key_dir:
+            os.makedirs(key_dir, exist_ok=True)
+            self._load_pool()
+        if prefill:
+            with self._lock:
+                submitted = self._refill()
+            self._watch(submitted)
+
+    @property
+    def available(self) -> int:
+        """Number of key pairs ready to be handed out."""
+        with self._lock:
+            return len(self._pool)
+
+    def get_key(self) -> RSA.RsaKey:
+        """
+        Return a fresh key pair, from the pool if possible.
+        Falls back to synchronous generation when the pool is empty.
+        """
+        with self._lock:
+            key = self._pool.popleft() if self._pool else None
+            if key is None:
+                self.misses += 1
+            submitted = self._refill()
+        self._watch(submitted)
+        if key is None:
+            key = RSA.generate(self.key_size)
+        return key
+
+    def load_key(self, name: str) -> RSA.RsaKey:
+        """
+        Load the persisted key pair ``name`` from ``key_dir``, creating it on first use.
+        :param name: Key name; stored as ``<key_dir>/<name>.pem`` (owner read/write only).
+        """
+        if not self.key_dir:
+            raise ValueError("Persisted keys require a key_dir.")
+        path = os.path.join(self.key_dir, f'{name}.pem')
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return RSA.import_key(f.read())
+        key = self.get_key()
+        self._write_pem(path, key.export_key())
+        return key
+
+    def close(self) -> None:
+        """Stop background generation and persist unused pooled keys if ``key_dir`` is set."""
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        if self.key_dir:
+            self._save_pool()
+
+    def __enter__(self) -> 'RSAKeyProvider':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _refill(self) -> List[Future]:
+        """
+        Submit generation jobs until pool plus pending jobs reach ``pool_size`` (lock held).
+        Pass the returned futures to ``_watch`` once the lock is released.
+        """
+        submitted = []
+        if self._closed:
+            return submitted
+        while len(self._pool) + len(self._pending) < self.pool_size:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            future = self._executor.submit(_generate_pem, self.key_size)
+            self._pending.add(future)
+            submitted.append(future)
+        return submitted
+
+    def _watch(self, futures: List[Future]) -> None:
+        # A future that is already done runs its callback inline, and the callback takes the lock
+        for future in futures:
+            future.add_done_callback(self._on_generated)
+
+    def _on_generated(self, future: Future) -> None:
+        with self._lock:
+            self._pending.discard(future)
+            if future.cancelled():
+                return
+            if future.exception() is not None:
+                logger.error("Background RSA key generation failed: %s", future.exception())
+                return
+            self._pool.append(RSA.import_key(future.result()))
+
+    def _load_pool(self) -> None:
+        for filename in sorted(os.listdir(self.key_dir)):
+            if filename.startswith(_POOL_FILE_PREFIX) and filename.endswith('.pem'):
+                path = os.path.join(self.key_dir, filename)
+                with open(path, 'rb') as f:
+                    key = RSA.import_key(f.read())
+                # Pooled keys are handed out once, so the file must not be reused
+                os.remove(path)
+                if key.size_in_bits() == self.key_size:
+                    self._pool.append(key)
+
+    def _save_pool(self) -> None:
+        with self._lock:
+            keys, self._pool = list(self._pool), deque()
+        for i, key in enumerate(keys):
+            self._write_pem(os.path.join(self.key_dir, f'{_POOL_FILE_PREFIX}{i:04d}.pem'), key.export_key())
+
+    @staticmethod
+    def _write_pem(path: str, pem: bytes) -> None:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(pem)
@@ -0,0 +1,93 @@
+# communication/privacy_amplification.py
+
+import math
+
+import numpy as np
+from scipy import fft
+
+from .reconciliation import binary_entropy
+
+# Keys longer than this are hashed tile by tile so memory stays bounded
+DEFAULT_BLOCK_BITS = 1 << 21
+
+
+def secure_key_length(key_length: int, qber: float, leaked_bits: int, epsilon: float = 1e-10) -> int:
+    """
+    Length of the final key after privacy amplification.
+    Removes the eavesdropper's information bound n·h(qber), the bits leaked
+    during reconciliation and a security margin of 2·log2(1/epsilon).
+    :param key_length: Length of the reconciled key.
+    :param qber: Estimated quantum bit error rate.
+    :param leaked_bits: Bits disclosed during error correction.
+    :param epsilon: Security parameter of the universal hash.
+    :return: Number of secure bits (0 if none can be extracted).
+    """
+    secure = key_length * (1 - binary_entropy(qber)) - leaked_bits - 2 * math.log2(1 / epsilon)
+    return max(int(math.floor(secure)), 0)
+
+
+def toeplitz_hash(key_bits: np.ndarray, seed_bits: np.ndarray, output_length: int) -> np.ndarray:
+    """
+    Multiply a key by a random Toeplitz matrix over GF(2) using an FFT convolution.
+
+    The m x n matrix is T[i, j] = seed[i - j + n - 1], so T·x is a slice of the
+    linear convolution seed * x, computed in O((n + m) log(n + m)).
+    :param key_bits: Unpacked 0/1 key of length n.
+    :param seed_bits: Unpacked 0/1 seed of length m + n - 1.
+    :param output_length: Number of output bits m.
+    :return: Unpacked 0/1 uint8 array of length m.
+    """
+    n, m = key_bits.size, output_length
+    if n == 0 or m == 0:
+        return np.zeros(m, dtype=np.uint8)
+    if seed_bits.size != m + n - 1:
+        raise ValueError(f"Toeplitz seed must have {m + n - 1} bits, got {seed_bits.size}.")
+    # Circular wrap-around only reaches indices below n - 1, which are discarded
+    size = fft.next_fast_len(m + n - 1, real=True)
+    spectrum = fft.rfft(key_bits.astype(np.float64), size) * fft.rfft(seed_bits.astype(np.float64), size)
+    product = fft.irfft(spectrum, size)[n - 1:n - 1 + m]
+    return (np.rint(product).astype(np.int64) & 1).astype(np.uint8)
+
+
+def _unpack_range(packed: np.ndarray, start: int, count: int) -> np.ndarray:
+    """Unpack ``count`` bits starting at bit ``start`` of a packed array."""
+    first, offset = divmod(start, 8)
+    last = (start + count + 7) // 8
+    return np.unpackbits(packed[first:last])[offset:offset + count]
+
+
+def toeplitz_hash_packed(
+    key: np.ndarray,
+    key_length: int,
+    seed: np.ndarray,
+    output_length: int,
+    block_bits: int = DEFAULT_BLOCK_BITS
+) -> np.ndarray:
+    """
+    Bit-packed GF(2) Toeplitz hashing for large keys.
+
+    The matrix is split into ``block_bits`` x ``block_bits`` tiles, each of which
+    is itself Toeplitz and multiplied with ``toeplitz_hash``; the partial
+    products are XOR-accumulated into the packed output. Key, seed and output
+    stay packed, so memory is O(block_bits) instead of O(key_length).
+    :param key: Bit-packed key.
+    :param key_length: Number of valid key bits n.
+    :param seed: Bit-packed seed of m + n - 1 bits.
+    :param output_length: Number of output bits m.
+    :param block_bits: Tile size; must be a multiple of 8.
+    :return: Bit-packed output of ``output_length`` bits.
+    """
+    if block_bits % 8:
+        raise ValueError("block_bits must be a multiple of 8.")
+    n, m = key_length, output_length
+    output = np.zeros((m + 7) // 8, dtype=np.uint8)
+    for j0 in range(0, n, block_bits):
+        key_bits = _unpack_range(key, j0, min(block_bits, n - j0))
+        if not key_bits.any():
+            continue
+        for i0 in range(0, m, block_bits):
+            rows = min(block_bits, m - i0)
+            tile_seed = _unpack_range(seed, i0 - j0 + n - key_bits.size, rows + key_bits.size - 1)
+            partial = np.packbits(toeplitz_hash(key_bits, tile_seed, rows))
+            output[i0 // 8:i0 // 8 + partial.size] ^= partial
+    return output
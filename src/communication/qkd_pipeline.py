@@ -0,0 +1,214 @@
+# communication/qkd_pipeline.py
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .quantum_communication import QBER_ABORT_THRESHOLD, ChannelModel, QuantumKeyDistribution
+
+# Seconds a stage waits on a queue before re-checking whether the pipeline was stopped
+_POLL_INTERVAL = 0.1
+_END = object()
+
+
+@dataclass
+class KeyBlock:
+    """A finished block of key material produced by the pipeline."""
+    index: int
+    key: bytes
+    key_length: int
+    raw_bits: int
+    qber: Optional[float] = None
+
+
+@dataclass
+class PipelineStats:
+    """Running totals for a QKD pipeline."""
+    blocks: int = 0
+    raw_bits: int = 0
+    key_bits: int = 0
+    aborted_blocks: int = 0
+    stage_seconds: Dict[str, float] = field(default_factory=dict)
+
+
+class _StageFailure:
+    def __init__(self, stage: str, error: BaseException):
+        self.stage = stage
+        self.error = error
+
+
+class QKDPipeline:
+    """
+    Streaming, block-wise QKD post-processing pipeline.
+
+    The raw qubit stream is cut into fixed-size blocks, each simulated as an
+    independent QuantumKeyDistribution session. Blocks flow through the
+    generate/measure, sift/QBER, reconcile and amplify stages, each running in
+    its own thread and connected by bounded queues, so stages overlap while at
+    most ``queue_size`` blocks wait between any two of them.
+    """
+
+    def __init__(
+        self,
+        block_bits: int = 1 << 20,
+        sample_fraction: float = 0.1,
+        queue_size: int = 2,
+        seed: Optional[int] = None,
+        session_factory: Callable[..., QuantumKeyDistribution] = QuantumKeyDistribution,
+        channel: Optional[ChannelModel] = None,
+        qber_threshold: Optional[float] = QBER_ABORT_THRESHOLD
+    ):
+        """
+        :param block_bits: Number of raw qubits per block.
+        :param sample_fraction: Fraction of sifted bits disclosed for QBER estimation.
+        :param queue_size: Maximum number of blocks buffered between two stages.
+        :param seed: Master seed; every block gets its own child random stream.
+        :param session_factory: Callable ``(num_bits, seed=..., channel=...)`` creating the QKD session for a block.
+        :param channel: Channel model applied to every block (noiseless if None).
+        :param qber_threshold: Blocks whose QBER exceeds this are aborted and not yielded
+                               (None disables the check).
+        """
+        self.block_bits = block_bits
+        self.sample_fraction = sample_fraction
+        self.queue_size = queue_size
+        self.session_factory = session_factory
+        self.channel = channel
+        self.qber_threshold = qber_threshold
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.stats = PipelineStats()
+        self._stats_lock = threading.Lock()
+
+    def _stages(self) -> List[Tuple[str, Callable[[QuantumKeyDistribution], None]]]:
+        return [
+            ('measure', self._measure),
+            ('sift', self._sift),
+            ('reconcile', lambda qkd: qkd.error_correction()),
+            ('amplify', lambda qkd: qkd.privacy_amplification()),
+        ]
+
+    @staticmethod
+    def _measure(qkd: QuantumKeyDistribution) -> None:
+        qkd.generate_sender_bits()
+        qkd.simulate_receiver()
+
+    def _sift(self, qkd: QuantumKeyDistribution) -> None:
+        qkd.sift_key()
+        qkd.estimate_qber(self.sample_fraction, threshold=self.qber_threshold)
+
+    def blocks(self, num_blocks: Optional[int] = None) -> Iterator[KeyBlock]:
+        """
+        Run the pipeline and yield key blocks as they are finished.
+        Aborted blocks pass through the later stages without work and are only
+        counted in ``stats.aborted_blocks``.
+        :param num_blocks: Number of raw blocks to process, or None to run until
+                           the generator is closed.
+        :return: Iterator of KeyBlock in production order.
+        """
+        stop = threading.Event()
+        stages = self._stages()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(stages) + 1)]
+
+        threads = [threading.Thread(
+            target=self._source, args=(queues[0], num_blocks, stop), name='qkd-source', daemon=True
+        )]
+        for i, (name, func) in enumerate(stages):
+            threads.append(threading.Thread(
+                target=self._worker, args=(name, func, queues[i], queues[i + 1], stop),
+                name=f'qkd-{name}', daemon=True
+            ))
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = self._get(queues[-1], stop)
+                if item is _END:
+                    return
+                if isinstance(item, _StageFailure):
+                    raise RuntimeError(f"QKD pipeline stage '{item.stage}' failed") from item.error
+                index, qkd = item
+                if qkd.aborted:
+                    with self._stats_lock:
+                        self.stats.aborted_blocks += 1
+                        self.stats.raw_bits += qkd.num_bits
+                    continue
+                block = KeyBlock(
+                    index=index,
+                    key=qkd.get_key(packed=True),
+                    key_length=qkd.key_length,
+                    raw_bits=qkd.num_bits,
+                    qber=qkd.qber
+                )
+                with self._stats_lock:
+                    self.stats.blocks += 1
+                    self.stats.raw_bits += block.raw_bits
+                    self.stats.key_bits += block.key_length
+                yield block
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    def _source(self, out_q: queue.Queue, num_blocks: Optional[int], stop: threading.Event) -> None:
+        index = 0
+        while not stop.is_set() and (num_blocks is None or index < num_blocks):
+            session = self.session_factory(
+                self.block_bits, seed=self.seed_sequence.spawn(1)[0], channel=self.channel
+            )
+            if not self._put(out_q, (index, session), stop):
+                return
+            index += 1
+        self._put(out_q, _END, stop)
+
+    def _worker(
+        self,
+        name: str,
+        func: Callable[[QuantumKeyDistribution], None],
+        in_q: queue.Queue,
+        out_q: queue.Queue,
+        stop: threading.Event
+    ) -> None:
+        while True:
+            item = self._get(in_q, stop)
+            if item is None:
+                return
+            if item is _END or isinstance(item, _StageFailure):
+                self._put(out_q, item, stop)
+                return
+            start = time.perf_counter()
+            try:
+                func(item[1])
+            except Exception as e:
+                self._put(out_q, _StageFailure(name, e), stop)
+                return
+            with self._stats_lock:
+                self.stats.stage_seconds[name] = (
+                    self.stats.stage_seconds.get(name, 0.0) + time.perf_counter() - start
+                )
+            if not self._put(out_q, item, stop):
+                return
+
+    @staticmethod
+    def _get(q: queue.Queue, stop: threading.Event):
+        """Blocking get that gives up (returning None) once the pipeline is stopped."""
+        while not stop.is_set():
+            try:
+                return q.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return None
+
+    @staticmethod
+    def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+        """Blocking put that gives up once the pipeline is stopped."""
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
@@ -0,0 +1,186 @@
+# communication/qkd_sessions.py
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import groupby
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .quantum_communication import (
+    QBER_ABORT_THRESHOLD, ChannelModel, QuantumKeyDistribution, ReceiverDraws,
+    _random_packed, draw_receiver, measure_packed
+)
+
+_BIT_GENERATORS = {
+    'PCG64': np.random.PCG64,
+    'Philox': np.random.Philox,
+}
+
+
+@dataclass
+class SessionConfig:
+    """Parameters of one simulated QKD link."""
+    num_bits: int
+    sample_fraction: float = 0.1
+    reconciliation: str = 'cascade'
+    epsilon: float = 1e-10
+    channel: Optional[ChannelModel] = None
+    qber_threshold: Optional[float] = QBER_ABORT_THRESHOLD
+
+
+@dataclass
+class SessionResult:
+    """Summary of a finished QKD session."""
+    index: int
+    num_bits: int
+    sifted_bits: int
+    qber: float
+    leaked_bits: int
+    reconciliation_rounds: int
+    key_length: int
+    key: Optional[bytes] = None
+    aborted: bool = False
+    qber_sample_size: int = 0
+
+
+@dataclass
+class SessionSummary:
+    """Accept/abort statistics over a set of sessions."""
+    sessions: int
+    accepted: int
+    aborted: int
+    key_bits: int
+
+    @property
+    def abort_rate(self) -> float:
+        return self.aborted / self.sessions if self.sessions else 0.0
+
+
+def summarize_sessions(results: Sequence[SessionResult]) -> SessionSummary:
+    """Count accepted and aborted sessions and the total final key length."""
+    aborted = sum(result.aborted for result in results)
+    return SessionSummary(
+        sessions=len(results),
+        accepted=len(results) - aborted,
+        aborted=aborted,
+        key_bits=sum(result.key_length for result in results)
+    )
+
+
+def _make_generator(seed_sequence: np.random.SeedSequence, bit_generator: str) -> np.random.Generator:
+    return np.random.Generator(_BIT_GENERATORS[bit_generator](seed_sequence))
+
+
+def _stack_draws(draws: List[ReceiverDraws], num_bits: int) -> ReceiverDraws:
+    """Stack per-session draws into 2-D arrays; unused channel masks become zero rows."""
+    zeros = np.zeros((num_bits + 7) // 8, dtype=np.uint8)
+    fields = []
+    for values in zip(*draws):
+        if all(value is None for value in values):
+            fields.append(None)
+        else:
+            fields.append(np.stack([zeros if value is None else value for value in values]))
+    return ReceiverDraws(*fields)
+
+
+def _run_sessions(
+    jobs: List[Tuple[int, SessionConfig, np.random.SeedSequence]],
+    bit_generator: str,
+    keep_keys: bool
+) -> List[SessionResult]:
+    """
+    Simulate a group of sessions in this process.
+    Only the measurement is vectorized across sessions: sessions of equal length
+    are measured together as (sessions, bytes) arrays. Random draws, sifting, QBER
+    estimation, reconciliation and privacy amplification still run per session.
+    """
+    results = []
+    jobs = sorted(jobs, key=lambda job: job[1].num_bits)
+    for num_bits, group in groupby(jobs, key=lambda job: job[1].num_bits):
+        group = list(group)
+        sessions = [QuantumKeyDistribution(num_bits, seed=_make_generator(seed, bit_generator),
+                                           channel=config.channel)
+                    for _, config, seed in group]
+        # Each session draws from its own stream in the same order as the
+        # single-session methods, so results do not depend on batching.
+        sender_bits, basis_sender = (
+            np.stack([_random_packed(qkd.rng, num_bits) for qkd in sessions]) for _ in range(2)
+        )
+        per_session = [draw_receiver(qkd.rng, num_bits, qkd.channel) for qkd in sessions]
+        receiver_bits = measure_packed(sender_bits, basis_sender, _stack_draws(per_session, num_bits), num_bits)
+
+        for row, ((index, config, _), qkd) in enumerate(zip(group, sessions)):
+            qkd.set_sender_draws(sender_bits[row], basis_sender[row])
+            qkd.set_receiver_draws(per_session[row], receiver_bits[row])
+            qkd.sift_key()
+            sifted_bits = qkd.key_length
+            qkd.estimate_qber(config.sample_fraction, threshold=config.qber_threshold)
+            qkd.error_correction(config.reconciliation)
+            qkd.privacy_amplification(config.epsilon)
+            results.append(SessionResult(
+                index=index,
+                num_bits=num_bits,
+                sifted_bits=sifted_bits,
+                qber=qkd.qber,
+                leaked_bits=qkd.leaked_bits,
+                reconciliation_rounds=qkd.reconciliation_rounds,
+                key_length=qkd.key_length,
+                key=qkd.get_key(packed=True) if keep_keys else None,
+                aborted=qkd.aborted,
+                qber_sample_size=qkd.qber_sample_size
+            ))
+    return results
+
+
+class MultiSessionQKD:
+    """
+    Simulate many independent QKD sessions, in-process with the measurement
+    batched as 2-D arrays, or fanned out over a process pool.
+
+    Every session gets its own ``numpy.random.Generator`` derived from a master
+    seed with ``SeedSequence.spawn``, so results are reproducible and identical
+    whichever execution mode is used.
+    """
+
+    def __init__(self, master_seed: Optional[int] = None, bit_generator: str = 'PCG64'):
+        """
+        :param master_seed: Seed all session streams are derived from (random if None).
+        :param bit_generator: 'PCG64' or 'Philox'.
+        """
+        if bit_generator not in _BIT_GENERATORS:
+            raise ValueError(f"Unsupported bit generator '{bit_generator}'. "
+                             f"Choose from: {', '.join(_BIT_GENERATORS)}.")
+        self.seed_sequence = np.random.SeedSequence(master_seed)
+        self.bit_generator = bit_generator
+
+    def session_seeds(self, num_sessions: int) -> List[np.random.SeedSequence]:
+        """Child seed sequences for sessions 0..num_sessions-1 (stable for a given master seed)."""
+        return [np.random.SeedSequence(self.seed_sequence.entropy, spawn_key=(i,))
+                for i in range(num_sessions)]
+
+    def run(
+        self,
+        configs: Sequence[SessionConfig],
+        max_workers: Optional[int] = None,
+        chunk_size: int = 64,
+        keep_keys: bool = False
+    ) -> List[SessionResult]:
+        """
+        Simulate one session per config.
+        :param configs: Link configurations, one per session.
+        :param max_workers: Number of worker processes; None or 1 runs in-process.
+        :param chunk_size: Sessions per batch sent to a worker.
+        :param keep_keys: Include the final packed keys in the results.
+        :return: SessionResults in the order of ``configs``.
+        """
+        jobs = list(zip(range(len(configs)), configs, self.session_seeds(len(configs))))
+        if not max_workers or max_workers == 1:
+            results = _run_sessions(jobs, self.bit_generator, keep_keys)
+        else:
+            chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(_run_sessions, chunk, self.bit_generator, keep_keys)
+                           for chunk in chunks]
+                results = [result for future in futures for result in future.result()]
+        return sorted(results, key=lambda result: result.index)
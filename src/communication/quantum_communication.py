@@ -1,71 +1,420 @@
 # communication/quantum_communication.py
 
 import numpy as np
-import random
-from typing import List, Tuple
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import List, NamedTuple, Optional, Tuple, Union
+from .reconciliation import ReconciliationResult, create_reconciler
+from .privacy_amplification import (
+    DEFAULT_BLOCK_BITS, secure_key_length, toeplitz_hash, toeplitz_hash_packed
+)
+
+# Number of packed bytes processed per chunk when bits have to be unpacked,
+# which bounds temporary memory to a few MiB regardless of the session size.
+_CHUNK_BYTES = 1 << 20
+
+# QBER assumed for reconciliation when it has not been estimated
+_DEFAULT_QBER = 0.02
+
+# Bits drawn per chunk for Bernoulli masks (bounds the float temporaries to 8 MiB)
+_BERNOULLI_CHUNK_BITS = 1 << 20
+
+# Sessions whose QBER exceeds this are aborted; BB84 with one-way
+# post-processing cannot distil a secret key above roughly 11%.
+QBER_ABORT_THRESHOLD = 0.11
+
+
+SeedLike = Union[None, int, np.random.SeedSequence, np.random.Generator]
+
+
+def _random_packed(rng: np.random.Generator, num_bits: int) -> np.ndarray:
+    """Return ``num_bits`` uniformly random bits packed into uint8 (padding bits are zero)."""
+    packed = rng.integers(0, 256, size=(num_bits + 7) // 8, dtype=np.uint8)
+    return _clear_padding(packed, num_bits)
+
+
+def _clear_padding(packed: np.ndarray, num_bits: int) -> np.ndarray:
+    """Zero the unused low-order bits of the last byte (of every row) in place."""
+    tail = num_bits % 8
+    if tail and packed.size:
+        packed[..., -1] &= np.uint8((0xFF << (8 - tail)) & 0xFF)
+    return packed
+
+
+def _bernoulli_packed(rng: np.random.Generator, num_bits: int, probability: float) -> np.ndarray:
+    """Return a packed mask whose bits are set independently with ``probability``."""
+    chunks = [
+        np.packbits(rng.random(min(_BERNOULLI_CHUNK_BITS, num_bits - start)) < probability)
+        for start in range(0, num_bits, _BERNOULLI_CHUNK_BITS)
+    ]
+    if not chunks:
+        return np.zeros(0, dtype=np.uint8)
+    # Chunks hold a multiple of 8 bits except the last, so they concatenate byte-aligned
+    return np.concatenate(chunks)
+
+
+@dataclass(frozen=True)
+class ChannelModel:
+    """
+    Noisy quantum channel between sender and receiver.
+    :param loss: Probability that a qubit is lost and never detected.
+    :param depolarization: Probability that a qubit is fully depolarized, so the
+                           receiver gets a random outcome (QBER contribution p/2).
+    :param intercept_fraction: Fraction of qubits an intercept-resend eavesdropper measures
+                               in a random basis and re-prepares (QBER contribution f/4).
+    """
+    loss: float = 0.0
+    depolarization: float = 0.0
+    intercept_fraction: float = 0.0
+
+    def __post_init__(self):
+        for name in ('loss', 'depolarization', 'intercept_fraction'):
+            value = getattr(self, name)
+            if not 0.0 <= value <= 1.0:
+                raise ValueError(f"Channel {name} must be a probability in [0, 1], got {value}.")
+
+
+class ReceiverDraws(NamedTuple):
+    """Packed random draws for one receiver measurement; channel masks are None when unused."""
+    basis_receiver: np.ndarray
+    outcome: np.ndarray
+    intercepted: Optional[np.ndarray] = None
+    eve_basis: Optional[np.ndarray] = None
+    eve_outcome: Optional[np.ndarray] = None
+    depolarized: Optional[np.ndarray] = None
+    lost: Optional[np.ndarray] = None
+
+
+def draw_receiver(rng: np.random.Generator, num_bits: int, channel: Optional[ChannelModel] = None) -> ReceiverDraws:
+    """
+    Draw the receiver's bases and outcomes and the channel's noise masks, in a fixed order.
+    Channel effects with probability zero draw nothing, so a noiseless channel
+    consumes the random stream exactly like no channel at all.
+    """
+    basis_receiver = _random_packed(rng, num_bits)  # Random basis for the receiver
+    outcome = _random_packed(rng, num_bits)
+    if channel is None:
+        return ReceiverDraws(basis_receiver, outcome)
+    intercepted = eve_basis = eve_outcome = depolarized = lost = None
+    if channel.intercept_fraction:
+        intercepted = _bernoulli_packed(rng, num_bits, channel.intercept_fraction)
+        eve_basis = _random_packed(rng, num_bits)
+        eve_outcome = _random_packed(rng, num_bits)
+    if channel.depolarization:
+        depolarized = _bernoulli_packed(rng, num_bits, channel.depolarization)
+    if channel.loss:
+        lost = _bernoulli_packed(rng, num_bits, channel.loss)
+    return ReceiverDraws(basis_receiver, outcome, intercepted, eve_basis, eve_outcome, depolarized, lost)
+
+
+def measure_packed(
+    sender_bits: np.ndarray,
+    basis_sender: np.ndarray,
+    draws: ReceiverDraws,
+    num_bits: int
+) -> np.ndarray:
+    """
+    Receiver measurement on packed arrays of any shape (one row per session).
+    Intercepted qubits are replaced by the eavesdropper's re-prepared state, depolarized
+    qubits give a random outcome. Otherwise matching bases reproduce the incoming bit
+    and mismatched bases give the random ``outcome``. Losses only affect sifting.
+    """
+    basis, bits = basis_sender, sender_bits
+    if draws.intercepted is not None:
+        eve = draws.intercepted
+        eve_match = ~(basis_sender ^ draws.eve_basis)
+        eve_bits = (sender_bits & eve_match) | (draws.eve_outcome & ~eve_match)
+        basis = (basis & ~eve) | (draws.eve_basis & eve)
+        bits = (bits & ~eve) | (eve_bits & eve)
+    match = ~(basis ^ draws.basis_receiver)
+    if draws.depolarized is not None:
+        match &= ~draws.depolarized
+    return _clear_padding((bits & match) | (draws.outcome & ~match), num_bits)
+
+
+def wilson_bounds(errors, trials, z: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Wilson score interval for an error rate, vectorized over ``errors``/``trials``.
+    :param errors: Observed error counts.
+    :param trials: Number of compared bits (must be positive).
+    :param z: Standard normal quantile of the one-sided confidence level.
+    :return: (lower, upper) bounds.
+    """
+    errors = np.asarray(errors, dtype=np.float64)
+    trials = np.asarray(trials, dtype=np.float64)
+    rate = errors / trials
+    z2 = z * z
+    denominator = 1 + z2 / trials
+    center = (rate + z2 / (2 * trials)) / denominator
+    half_width = z * np.sqrt(rate * (1 - rate) / trials + z2 / (4 * trials * trials)) / denominator
+    return np.maximum(center - half_width, 0.0), np.minimum(center + half_width, 1.0)
+
+
+@dataclass
+class QBEREstimate:
+    """Outcome of the online QBER test of a session."""
+    qber: float
+    lower: float
+    upper: float
+    sampled_bits: int
+    errors: int
+    aborted: bool
+
+
+def _select_bits(packed: np.ndarray, packed_mask: np.ndarray, num_bits: int) -> np.ndarray:
+    """
+    Keep the bits of ``packed`` whose mask bit is set and repack them.
+    :param packed: Bit-packed uint8 array.
+    :param packed_mask: Bit-packed uint8 selection mask of the same length.
+    :param num_bits: Number of valid bits in both arrays.
+    :return: Bit-packed uint8 array of the selected bits.
+    """
+    chunk_bits = _CHUNK_BYTES * 8
+    selected = []
+    for start in range(0, (num_bits + 7) // 8, _CHUNK_BYTES):
+        count = min(chunk_bits, num_bits - start * 8)
+        stop = start + _CHUNK_BYTES
+        mask = np.unpackbits(packed_mask[start:stop], count=count).view(bool)
+        selected.append(np.unpackbits(packed[start:stop], count=count)[mask])
+    if not selected:
+        return np.zeros(0, dtype=np.uint8)
+    return np.packbits(np.concatenate(selected))
+
+
+def _count_bits(packed: np.ndarray) -> int:
+    """Return the number of set bits in a packed uint8 array."""
+    return int(np.unpackbits(packed).sum(dtype=np.int64))
+
 
 class QuantumKeyDistribution:
-    def __init__(self, num_bits: int):
+    def __init__(self, num_bits: int, seed: SeedLike = None, channel: Optional[ChannelModel] = None):
         """
         Initialize the Quantum Key Distribution (QKD) protocol.
+
+        Bits and bases are stored bit-packed (one bit per qubit) and every
+        protocol step operates on whole arrays.
         :param num_bits: Number of bits to be transmitted.
+        :param seed: Seed, SeedSequence or Generator for this session's private
+                     random stream; sessions never touch the global NumPy state.
+        :param channel: Loss, noise and eavesdropping on the quantum channel (noiseless if None).
         """
         self.num_bits = num_bits
-        self.sender_bits = None
-        self.basis_sender = None
-        self.basis_receiver = None
-        self.receiver_bits = None
+        self.rng = np.random.default_rng(seed)
+        self.channel = channel
+        self._sender_bits = None
+        self._basis_sender = None
+        self._basis_receiver = None
+        self._receiver_bits = None
+        self._lost = None
         self.key = None
+        self.receiver_key = None
+        self.key_length = 0
+        self.qber = None
+        self.qber_sample_size = 0
+        self.qber_estimate = None
+        self.aborted = False
+        self.leaked_bits = 0
+        self.reconciliation_rounds = 0
+
+    @property
+    def sender_bits(self) -> Optional[np.ndarray]:
+        """Sender bits unpacked to a uint8 array of 0/1 values."""
+        return self._unpack(self._sender_bits)
+
+    @property
+    def basis_sender(self) -> Optional[np.ndarray]:
+        """Sender bases unpacked to 0/1 values (0 for Z-basis, 1 for X-basis)."""
+        return self._unpack(self._basis_sender)
+
+    @property
+    def basis_receiver(self) -> Optional[np.ndarray]:
+        """Receiver bases unpacked to 0/1 values (0 for Z-basis, 1 for X-basis)."""
+        return self._unpack(self._basis_receiver)
+
+    @property
+    def receiver_bits(self) -> Optional[np.ndarray]:
+        """Receiver measurement results unpacked to 0/1 values."""
+        return self._unpack(self._receiver_bits)
+
+    def _unpack(self, packed: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        if packed is None:
+            return None
+        return np.unpackbits(packed, count=self.num_bits)
 
     def generate_sender_bits(self):
         """Generate random bits and random bases for the sender."""
-        self.sender_bits = np.random.randint(0, 2, self.num_bits)
-        self.basis_sender = np.random.randint(0, 2, self.num_bits)  # 0 for Z-basis, 1 for X-basis
+        self.set_sender_draws(_random_packed(self.rng, self.num_bits),
+                              _random_packed(self.rng, self.num_bits))  # 0 for Z-basis, 1 for X-basis
+
+    def set_sender_draws(self, sender_bits: np.ndarray, basis_sender: np.ndarray):
+        """
+        Store the sender's bits and bases.
+        :param sender_bits: Packed sender bits of this session.
+        :param basis_sender: Packed sender bases (0 for Z-basis, 1 for X-basis).
+        """
+        self._sender_bits = sender_bits
+        self._basis_sender = basis_sender
 
     def simulate_receiver(self):
-        """Simulate the receiver's measurement."""
-        self.basis_receiver = np.random.randint(0, 2, self.num_bits)  # Random basis for the receiver
-        self.receiver_bits = np.zeros(self.num_bits)
+        """Simulate transmission over the channel and the receiver's measurement."""
+        self.set_receiver_draws(draw_receiver(self.rng, self.num_bits, self.channel))
 
-        for i in range(self.num_bits):
-            if self.basis_receiver[i] == self.basis_sender[i]:
-                self.receiver_bits[i] = self.sender_bits[i]  # Correct measurement
-            else:
-                self.receiver_bits[i] = random.randint(0, 1)  # Random measurement
+    def set_receiver_draws(self, draws: ReceiverDraws, receiver_bits: Optional[np.ndarray] = None):
+        """
+        Store the receiver's draws and measurement results.
+        :param draws: Receiver bases, outcomes and channel masks of this session.
+        :param receiver_bits: Precomputed measurement results (computed from ``draws`` if None).
+        """
+        if receiver_bits is None:
+            receiver_bits = measure_packed(self._sender_bits, self._basis_sender, draws, self.num_bits)
+        self._basis_receiver = draws.basis_receiver
+        self._receiver_bits = receiver_bits
+        self._lost = draws.lost
 
     def sift_key(self):
-        """Sift the key based on matching bases."""
-        key_bits = []
-        for i in range(self.num_bits):
-            if self.basis_sender[i] == self.basis_receiver[i]:
-                key_bits.append(int(self.sender_bits[i]))
-        self.key = np.array(key_bits)
-
-    def error_correction(self) -> None:
+        """Sift the key based on matching bases, dropping qubits lost in the channel."""
+        match = ~(self._basis_sender ^ self._basis_receiver)
+        if self._lost is not None:
+            match &= ~self._lost
+        match = _clear_padding(match, self.num_bits)
+        self.key_length = _count_bits(match)
+        self.key = _select_bits(self._sender_bits, match, self.num_bits)
+        self.receiver_key = _select_bits(self._receiver_bits, match, self.num_bits)
+
+    def estimate_qber(
+        self,
+        sample_fraction: float = 0.1,
+        threshold: Optional[float] = QBER_ABORT_THRESHOLD,
+        confidence: float = 0.999,
+        check_interval: int = 256
+    ) -> float:
         """
-        Perform error correction on the key.
-        This is a placeholder for a more complex error correction algorithm.
+        Estimate the quantum bit error rate (QBER) from a random sample of the sifted key.
+        The sampled bits are disclosed publicly and therefore removed from both keys.
+
+        The sample is compared online in steps of ``check_interval`` bits. As soon
+        as the lower Wilson bound of the QBER exceeds ``threshold`` the session is
+        aborted without disclosing the rest of the sample; it is also aborted if the
+        final estimate exceeds the threshold. Aborted sessions discard their keys
+        and skip error correction and privacy amplification.
+        :param sample_fraction: Fraction of sifted bits to sacrifice for the estimate.
+        :param threshold: Abort threshold for the QBER, or None to never abort.
+        :param confidence: One-sided confidence level of the bounds.
+        :param check_interval: Number of sampled bits compared between two checks.
+        :return: Estimated QBER (0.0 if no bits were sampled).
         """
-        # In a real implementation, you would use a method like Cascade or LDPC codes.
-        print("Performing error correction (placeholder).")
+        sender = np.unpackbits(self.key, count=self.key_length)
+        receiver = np.unpackbits(self.receiver_key, count=self.key_length)
+        sampled = self.rng.random(self.key_length) < sample_fraction
+        positions = np.flatnonzero(sampled)
+        errors = np.cumsum(sender[positions] != receiver[positions], dtype=np.int64)
+
+        z = NormalDist().inv_cdf(confidence)
+        checks = np.arange(check_interval, positions.size, check_interval)
+        checks = np.append(checks, positions.size) if positions.size else checks
+        lower, upper = wilson_bounds(errors[checks - 1], checks, z) if checks.size else ([], [])
+        exceeded = np.flatnonzero(np.asarray(lower) > threshold) if threshold is not None else []
 
-    def privacy_amplification(self) -> None:
+        step = exceeded[0] if len(exceeded) else checks.size - 1
+        sample_size = int(checks[step]) if checks.size else 0
+        error_count = int(errors[sample_size - 1]) if sample_size else 0
+        self.qber_sample_size = sample_size
+        self.qber = error_count / sample_size if sample_size else 0.0
+        self.aborted = threshold is not None and (len(exceeded) > 0 or self.qber > threshold)
+        self.qber_estimate = QBEREstimate(
+            qber=self.qber,
+            lower=float(lower[step]) if sample_size else 0.0,
+            upper=float(upper[step]) if sample_size else 1.0,
+            sampled_bits=sample_size,
+            errors=error_count,
+            aborted=self.aborted
+        )
+        if self.aborted:
+            self.key = self.receiver_key = np.zeros(0, dtype=np.uint8)
+            self.key_length = 0
+            return self.qber
+
+        kept = ~sampled
+        self.key = np.packbits(sender[kept])
+        self.receiver_key = np.packbits(receiver[kept])
+        self.key_length = self.key_length - self.qber_sample_size
+        return self.qber
+
+    def error_correction(self, method: str = 'cascade', **kwargs) -> Optional[ReconciliationResult]:
         """
-        Perform privacy amplification on the key.
-        This is a placeholder for a more complex privacy amplification algorithm.
+        Reconcile the receiver's key with the sender's key.
+        Block sizes or code rates follow the estimated QBER (see ``estimate_qber``);
+        the number of disclosed parity/syndrome bits is added to ``leaked_bits``.
+        Bits of LDPC frames that fail to decode are dropped from both keys.
+        :param method: 'cascade' (interactive) or 'ldpc' (one-way, single message).
+        :param kwargs: Options passed to the reconciler.
+        :return: ReconciliationResult with leaked-bit and round counts (None if the session was aborted).
         """
-        # In a real implementation, you would use a method like universal hashing.
-        print("Performing privacy amplification (placeholder).")
+        if self.aborted:
+            return None
+        qber = self.qber if self.qber is not None else _DEFAULT_QBER
+        if method == 'cascade':
+            kwargs.setdefault('rng', self.rng)
+        reconciler = create_reconciler(method, **kwargs)
+        result = reconciler.reconcile(self.key, self.receiver_key, self.key_length, qber)
+        if result.kept is not None:
+            self.key = _select_bits(self.key, result.kept, self.key_length)
+        self.receiver_key = result.key
+        self.key_length = result.key_length
+        self.leaked_bits += result.leaked_bits
+        self.reconciliation_rounds += result.rounds
+        return result
 
-    def get_key(self) -> List[int]:
-        """Return the generated key."""
-        return self.key.tolist() if self.key is not None else []
+    def privacy_amplification(self, epsilon: float = 1e-10, block_bits: int = DEFAULT_BLOCK_BITS) -> int:
+        """
+        Compress the reconciled key with a random Toeplitz hash (universal hashing).
+        The output length follows the estimated QBER and the bits leaked during
+        error correction (see ``secure_key_length``). Keys up to ``block_bits``
+        are hashed with a single FFT, longer keys with the tiled bit-packed path.
+        :param epsilon: Security parameter of the hash.
+        :param block_bits: Size limit for the single-FFT path and tile size of the packed path.
+        :return: Length of the final key (0 if the session was aborted).
+        """
+        if self.aborted:
+            return 0
+        qber = self.qber if self.qber is not None else _DEFAULT_QBER
+        output_length = secure_key_length(self.key_length, qber, self.leaked_bits, epsilon)
+        seed = _random_packed(self.rng, output_length + self.key_length - 1) if output_length else None
+
+        if output_length == 0:
+            self.key = self.receiver_key = np.zeros(0, dtype=np.uint8)
+        elif self.key_length <= block_bits:
+            seed_bits = np.unpackbits(seed, count=output_length + self.key_length - 1)
+            self.key, self.receiver_key = (
+                np.packbits(toeplitz_hash(np.unpackbits(key, count=self.key_length), seed_bits, output_length))
+                for key in (self.key, self.receiver_key)
+            )
+        else:
+            self.key, self.receiver_key = (
+                toeplitz_hash_packed(key, self.key_length, seed, output_length, block_bits)
+                for key in (self.key, self.receiver_key)
+            )
+        self.key_length = output_length
+        return output_length
+
+    def get_key(self, packed: bool = False) -> Union[List[int], bytes]:
+        """
+        Return the generated key.
+        :param packed: Return the key as bit-packed bytes (MSB first, zero padded)
+                       instead of a list of ints.
+        :return: List of key bits, or packed bytes if ``packed`` is True.
+        """
+        if self.key is None:
+            return b"" if packed else []
+        if packed:
+            return self.key.tobytes()
+        return np.unpackbits(self.key, count=self.key_length).tolist()
 
 # Example usage
 if __name__ == "__main__":
     num_bits = 10  # Number of bits to transmit
     qkd = QuantumKeyDistribution(num_bits)
-    
+
     # Step 1: Generate sender bits and bases
     qkd.generate_sender_bits()
     print("Sender Bits:", qkd.sender_bits)
@@ -0,0 +1,399 @@
+# communication/reconciliation.py
+
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+# Parity of every byte value, used to finish bit-packed XOR reductions
+_BYTE_PARITY = (np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1) & 1).astype(np.uint8)
+
+# QBER assumed when sizing blocks for a channel that showed no errors in the sample
+_MIN_QBER = 1e-3
+
+# Variable-node degree and supported check-node degrees of the regular LDPC codes
+# (code rate 1 - 3/dc, from 0.25 up to 0.85)
+_LDPC_VARIABLE_DEGREE = 3
+_LDPC_CHECK_DEGREES = (4, 5, 6, 7, 8, 9, 10, 12, 14, 16, 20)
+# Public seed shared by both parties so they construct identical parity-check matrices
+_LDPC_SEED = 0x51DC
+# Log-likelihood ratio used for padding bits known to both parties
+_KNOWN_BIT_LLR = 100.0
+
+
+@dataclass
+class ReconciliationResult:
+    """Outcome of an error reconciliation run."""
+    key: np.ndarray          # Corrected receiver key, bit-packed
+    key_length: int
+    leaked_bits: int         # Parity/syndrome bits disclosed on the public channel
+    rounds: int              # Communication rounds (round trips) used
+    corrected_bits: int
+    # Packed mask of the input key bits that survived reconciliation; None if all did
+    kept: Optional[np.ndarray] = None
+    failed_blocks: int = 0
+
+
+def binary_entropy(p: float) -> float:
+    """Binary Shannon entropy h(p) in bits."""
+    if p <= 0.0 or p >= 1.0:
+        return 0.0
+    return -p * math.log2(p) - (1 - p) * math.log2(1 - p)
+
+
+def block_parities(bits: np.ndarray, block_size: int) -> np.ndarray:
+    """
+    Compute the parity of consecutive blocks with a bit-packed XOR reduction.
+    :param bits: Unpacked 0/1 uint8 array.
+    :param block_size: Bits per block; the last block may be shorter.
+    :return: uint8 array with one parity bit per block.
+    """
+    num_blocks = -(-bits.size // block_size)
+    padded = np.zeros(num_blocks * block_size, dtype=np.uint8)
+    padded[:bits.size] = bits
+    packed = np.packbits(padded.reshape(num_blocks, block_size), axis=1)
+    return _BYTE_PARITY[np.bitwise_xor.reduce(packed, axis=1)]
+
+
+def prefix_parities(bits: np.ndarray) -> np.ndarray:
+    """Return P with P[i] = parity(bits[:i]), so any range parity is P[j] ^ P[i]."""
+    prefix = np.zeros(bits.size + 1, dtype=np.uint8)
+    np.bitwise_xor.accumulate(bits, out=prefix[1:])
+    return prefix
+
+
+@dataclass
+class _CascadePass:
+    order: np.ndarray          # Permutation applied to the key in this pass
+    block_size: int
+    parities: np.ndarray       # Sender block parities (disclosed)
+    prefix: np.ndarray         # Sender prefix parities over the permuted key
+
+
+class CascadeReconciler:
+    """
+    Cascade error reconciliation.
+
+    Block parities of every pass are computed for all blocks at once, and the
+    binary searches for all blocks with mismatching parity (including blocks
+    of earlier passes re-opened by a correction) advance together, one
+    communication round per bisection level.
+    """
+
+    def __init__(self, num_passes: int = 4, rng=None):
+        """
+        :param num_passes: Number of Cascade passes.
+        :param rng: Source of the public shuffles (``numpy.random`` by default).
+        """
+        self.num_passes = num_passes
+        self.rng = rng if rng is not None else np.random
+
+    @staticmethod
+    def initial_block_size(qber: float, key_length: int) -> int:
+        """Block size of the first pass, chosen so each block holds ~0.73 errors."""
+        size = math.ceil(0.73 / max(qber, _MIN_QBER))
+        return int(min(max(size, 4), max(key_length, 1)))
+
+    def reconcile(
+        self,
+        sender_key: np.ndarray,
+        receiver_key: np.ndarray,
+        key_length: int,
+        qber: float
+    ) -> ReconciliationResult:
+        """
+        Correct the receiver's key so that it matches the sender's key.
+        :param sender_key: Bit-packed sender key.
+        :param receiver_key: Bit-packed receiver key.
+        :param key_length: Number of valid bits in both keys.
+        :param qber: Estimated quantum bit error rate, used to size the blocks.
+        :return: ReconciliationResult with the corrected receiver key.
+        """
+        sender = np.unpackbits(sender_key, count=key_length)
+        receiver = np.unpackbits(receiver_key, count=key_length)
+        leaked = rounds = corrected = 0
+        passes: List[_CascadePass] = []
+        block_size = self.initial_block_size(qber, key_length)
+
+        for pass_index in range(self.num_passes if key_length else 0):
+            order = np.arange(key_length) if pass_index == 0 else self.rng.permutation(key_length)
+            permuted = sender[order]
+            passes.append(_CascadePass(order, block_size, block_parities(permuted, block_size),
+                                       prefix_parities(permuted)))
+            leaked += passes[-1].parities.size
+            rounds += 1
+
+            while True:
+                targets = self._odd_blocks(passes, receiver)
+                if not targets:
+                    break
+                positions, search_leaked, search_rounds = self._bisect(passes, targets, receiver, key_length)
+                receiver[positions] ^= 1
+                leaked += search_leaked
+                rounds += search_rounds
+                corrected += positions.size
+
+            block_size = min(2 * block_size, key_length)
+
+        return ReconciliationResult(
+            key=np.packbits(receiver),
+            key_length=key_length,
+            leaked_bits=leaked,
+            rounds=rounds,
+            corrected_bits=corrected
+        )
+
+    @staticmethod
+    def _odd_blocks(passes: List[_CascadePass], receiver: np.ndarray) -> List[Tuple[int, np.ndarray]]:
+        """Find the blocks, in every pass so far, whose receiver parity differs from the sender's."""
+        targets = []
+        for index, cascade_pass in enumerate(passes):
+            parities = block_parities(receiver[cascade_pass.order], cascade_pass.block_size)
+            odd = np.flatnonzero(parities != cascade_pass.parities)
+            if odd.size:
+                targets.append((index, odd))
+        return targets
+
+    @staticmethod
+    def _bisect(
+        passes: List[_CascadePass],
+        targets: List[Tuple[int, np.ndarray]],
+        receiver: np.ndarray,
+        key_length: int
+    ) -> Tuple[np.ndarray, int, int]:
+        """
+        Run the binary searches of all target blocks in lock-step.
+        :return: Unique key positions of the located errors, parity bits leaked
+                 and communication rounds used.
+        """
+        involved = sorted({index for index, _ in targets})
+        row_of = {index: row for row, index in enumerate(involved)}
+        orders = np.stack([passes[i].order for i in involved])
+        sender_prefix = np.stack([passes[i].prefix for i in involved])
+        receiver_prefix = np.stack([prefix_parities(receiver[passes[i].order]) for i in involved])
+
+        rows = np.concatenate([np.full(blocks.size, row_of[i]) for i, blocks in targets])
+        lo = np.concatenate([blocks * passes[i].block_size for i, blocks in targets])
+        hi = np.minimum(
+            np.concatenate([(blocks + 1) * passes[i].block_size for i, blocks in targets]), key_length
+        )
+
+        leaked = rounds = 0
+        active = hi - lo > 1
+        while active.any():
+            r, l, h = rows[active], lo[active], hi[active]
+            mid = (l + h) // 2
+            sender_half = sender_prefix[r, mid] ^ sender_prefix[r, l]
+            receiver_half = receiver_prefix[r, mid] ^ receiver_prefix[r, l]
+            in_first_half = sender_half != receiver_half
+            hi[active] = np.where(in_first_half, mid, h)
+            lo[active] = np.where(in_first_half, l, mid)
+            leaked += int(active.sum())
+            rounds += 1
+            active = hi - lo > 1
+
+        return np.unique(orders[rows, lo]), leaked, rounds
+
+
+@dataclass(frozen=True)
+class LDPCCode:
+    """A regular binary LDPC code in CSR form."""
+    n: int                     # Code length (bits per frame)
+    m: int                     # Number of parity checks (syndrome bits per frame)
+    check_degree: int
+    H: csr_matrix              # m x n parity-check matrix
+    edge_vars: np.ndarray      # (m, check_degree) variable index of each edge, i.e. H.indices
+    var_order: np.ndarray      # Edge permutation grouping the edges by variable node
+
+    @property
+    def rate(self) -> float:
+        return 1.0 - self.m / self.n
+
+    def syndromes(self, frames: np.ndarray) -> np.ndarray:
+        """Return H·x mod 2 for each row of the (num_frames, n) 0/1 array."""
+        return (self.H @ frames.T.astype(np.uint8)).T & 1
+
+
+@lru_cache(maxsize=None)
+def ldpc_code(n: int, check_degree: int, seed: int = _LDPC_SEED) -> LDPCCode:
+    """
+    Build (once per length and rate) a pseudo-random regular LDPC code.
+    Variable nodes have degree 3 and check nodes ``check_degree``; ``n`` must be a
+    multiple of ``check_degree``. Checks never connect to the same variable twice.
+    """
+    if n % check_degree:
+        raise ValueError(f"Code length {n} is not a multiple of the check degree {check_degree}.")
+    dv = _LDPC_VARIABLE_DEGREE
+    m = n * dv // check_degree
+    rng = np.random.default_rng(seed)
+    sockets = rng.permutation(np.repeat(np.arange(n, dtype=np.int32), dv))
+
+    # Re-shuffle sockets of checks that connect to a variable twice until none do
+    for _ in range(1000):
+        rows = np.sort(sockets.reshape(m, check_degree), axis=1)
+        repeated = np.flatnonzero((rows[:, 1:] == rows[:, :-1]).any(axis=1))
+        if not repeated.size:
+            break
+        i = repeated * check_degree + rng.integers(0, check_degree, repeated.size)
+        j = rng.integers(0, sockets.size, repeated.size)
+        sockets[i], sockets[j] = sockets[j], sockets[i].copy()
+    else:
+        raise RuntimeError(f"Could not construct an LDPC code with n={n}, dc={check_degree}.")
+
+    edge_vars = np.sort(sockets.reshape(m, check_degree), axis=1)
+    H = csr_matrix(
+        (np.ones(edge_vars.size, dtype=np.uint8), edge_vars.ravel(),
+         np.arange(0, edge_vars.size + 1, check_degree)),
+        shape=(m, n)
+    )
+    var_order = np.argsort(edge_vars.ravel(), kind='stable')
+    return LDPCCode(n, m, check_degree, H, edge_vars, var_order)
+
+
+class LDPCReconciler:
+    """
+    One-way syndrome-based LDPC reconciliation.
+
+    The sender discloses the syndrome of every frame in a single message; the
+    receiver decodes the error pattern with normalized min-sum belief
+    propagation, vectorized across a batch of frames. Frames that fail to
+    decode are discarded by both parties.
+    """
+
+    def __init__(
+        self,
+        frame_bits: int = 8160,
+        efficiency: float = 1.8,
+        max_iterations: int = 50,
+        batch_frames: int = 64,
+        scaling: float = 0.75
+    ):
+        """
+        :param frame_bits: Target code length; rounded down to a multiple of the check degree.
+        :param efficiency: Syndrome length relative to the Shannon limit n·h(QBER).
+        :param max_iterations: Maximum belief-propagation iterations.
+        :param batch_frames: Frames decoded together in one vectorized batch.
+        :param scaling: Normalization factor applied to min-sum check messages.
+        """
+        self.frame_bits = frame_bits
+        self.efficiency = efficiency
+        self.max_iterations = max_iterations
+        self.batch_frames = batch_frames
+        self.scaling = scaling
+
+    def select_code(self, qber: float) -> LDPCCode:
+        """Pick the highest-rate code whose syndrome covers ``efficiency · h(qber)``."""
+        required = self.efficiency * binary_entropy(max(qber, _MIN_QBER))
+        suitable = [dc for dc in _LDPC_CHECK_DEGREES if _LDPC_VARIABLE_DEGREE / dc >= required]
+        check_degree = max(suitable) if suitable else min(_LDPC_CHECK_DEGREES)
+        return ldpc_code(self.frame_bits - self.frame_bits % check_degree, check_degree)
+
+    def reconcile(
+        self,
+        sender_key: np.ndarray,
+        receiver_key: np.ndarray,
+        key_length: int,
+        qber: float
+    ) -> ReconciliationResult:
+        """
+        Correct the receiver's key so that it matches the sender's key.
+        :param sender_key: Bit-packed sender key.
+        :param receiver_key: Bit-packed receiver key.
+        :param key_length: Number of valid bits in both keys.
+        :param qber: Estimated quantum bit error rate, used to pick the code rate.
+        :return: ReconciliationResult; ``kept`` marks the bits of decoded frames.
+        """
+        code = self.select_code(qber)
+        num_frames = -(-key_length // code.n)
+        sender = np.zeros(num_frames * code.n, dtype=np.uint8)
+        receiver = np.zeros(num_frames * code.n, dtype=np.uint8)
+        sender[:key_length] = np.unpackbits(sender_key, count=key_length)
+        receiver[:key_length] = np.unpackbits(receiver_key, count=key_length)
+        sender = sender.reshape(num_frames, code.n)
+        receiver = receiver.reshape(num_frames, code.n)
+
+        # Padding bits are zero on both sides, so their error is known to be 0
+        prior = np.full((num_frames, code.n), math.log((1 - qber) / qber) if qber > 0 else _KNOWN_BIT_LLR,
+                        dtype=np.float32)
+        prior.reshape(-1)[key_length:] = _KNOWN_BIT_LLR
+        target = code.syndromes(sender) ^ code.syndromes(receiver)
+
+        errors = np.zeros_like(receiver)
+        decoded = np.zeros(num_frames, dtype=bool)
+        for start in range(0, num_frames, self.batch_frames):
+            batch = slice(start, start + self.batch_frames)
+            errors[batch], decoded[batch] = self.decode(code, target[batch], prior[batch])
+
+        corrected = (receiver ^ errors).reshape(-1)[:key_length]
+        kept = np.repeat(decoded, code.n)[:key_length]
+        return ReconciliationResult(
+            key=np.packbits(corrected[kept]),
+            key_length=int(kept.sum()),
+            leaked_bits=num_frames * code.m,
+            rounds=1,
+            corrected_bits=int(errors[decoded].sum()),
+            kept=None if decoded.all() else np.packbits(kept),
+            failed_blocks=int((~decoded).sum())
+        )
+
+    def decode(self, code: LDPCCode, syndromes: np.ndarray, prior: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Decode a batch of error patterns from their syndromes with min-sum BP.
+        :param code: LDPC code.
+        :param syndromes: (batch, m) target syndromes.
+        :param prior: (batch, n) channel log-likelihood ratios (positive favours no error).
+        :return: (batch, n) error estimates and a (batch,) mask of frames whose
+                 estimate reproduces the syndrome.
+        """
+        batch, dc = syndromes.shape[0], code.check_degree
+        errors = np.zeros((batch, code.n), dtype=np.uint8)
+        decoded = np.zeros(batch, dtype=bool)
+        active = np.arange(batch)
+        check_sign = (1 - 2 * syndromes.astype(np.float32))[:, :, None]
+        c2v = np.zeros((batch, code.m, dc), dtype=np.float32)
+        edge_slot = np.arange(dc)
+
+        for _ in range(self.max_iterations + 1):
+            incoming = c2v.reshape(active.size, -1)[:, code.var_order]
+            total = prior + incoming.reshape(active.size, code.n, _LDPC_VARIABLE_DEGREE).sum(axis=2)
+            hard = (total < 0).astype(np.uint8)
+
+            solved = (code.syndromes(hard) == syndromes).all(axis=1)
+            if solved.any():
+                errors[active[solved]] = hard[solved]
+                decoded[active[solved]] = True
+                keep = ~solved
+                active, prior, syndromes = active[keep], prior[keep], syndromes[keep]
+                check_sign, c2v, total = check_sign[keep], c2v[keep], total[keep]
+            if not active.size:
+                break
+
+            # Check-node update: sign product and minimum over the other edges
+            v2c = total[:, code.edge_vars] - c2v
+            sign = np.where(v2c < 0, -1.0, 1.0).astype(np.float32)
+            magnitude = np.abs(v2c)
+            first = np.argmin(magnitude, axis=2)
+            min1 = np.take_along_axis(magnitude, first[..., None], axis=2)
+            np.put_along_axis(magnitude, first[..., None], np.inf, axis=2)
+            min2 = magnitude.min(axis=2, keepdims=True)
+            others_min = np.where(edge_slot == first[..., None], min2, min1)
+            c2v = self.scaling * check_sign * sign.prod(axis=2, keepdims=True) * sign * others_min
+
+        return errors, decoded
+
+
+_RECONCILERS = {
+    'cascade': CascadeReconciler,
+    'ldpc': LDPCReconciler,
+}
+
+
+def create_reconciler(method: str, **kwargs):
+    """Factory method to create a reconciler by name."""
+    if method not in _RECONCILERS:
+        raise ValueError(f"Unsupported reconciliation method '{method}'. "
+                         f"Choose from: {', '.join(sorted(_RECONCILERS))}.")
+    return _RECONCILERS[method](**kwargs)
@@ -0,0 +1,369 @@
+# communication/secure_channel.py
+
+import asyncio
+import base64
+import inspect
+import itertools
+import logging
+import struct
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple, Union
+
+from Crypto.Hash import SHA256
+from Crypto.Protocol.KDF import HKDF
+from Crypto.Random import get_random_bytes
+
+from . import wire_format
+from .envelope import recipient_id
+from .secure_transmission import SecureTransmission
+
+# Handshake messages are sequences of u32-length-prefixed blobs
+_BLOB_LENGTH = struct.Struct('>I')
+_MAX_HANDSHAKE_BLOB = 1 << 16
+_PROTOCOL_LABEL = b"quantum-celestia-nexus/secure-channel/v1"
+_CLIENT_FINISHED = "|client-finished"
+_NONCE_SIZE = 32
+_SESSION_SECRET_SIZE = 32
+
+# Largest accepted frame; bounds the memory a peer can make us allocate
+MAX_FRAME_SIZE = 16 << 20
+
+# Response payloads start with a status byte
+_STATUS_OK = 0
+_STATUS_ERROR = 1
+
+Handler = Callable[[bytes], Union[bytes, Awaitable[bytes]]]
+
+logger = logging.getLogger(__name__)
+
+
+class ChannelError(ConnectionError):
+    """The handshake failed or the connection was lost or misused by the peer."""
+
+
+class RemoteError(RuntimeError):
+    """The server's request handler raised an exception."""
+
+
+def _write_blobs(writer: asyncio.StreamWriter, *blobs: bytes) -> None:
+    for blob in blobs:
+        writer.write(_BLOB_LENGTH.pack(len(blob)))
+        writer.write(blob)
+
+
+async def _read_blobs(reader: asyncio.StreamReader, count: int) -> Tuple[bytes, ...]:
+    blobs = []
+    for _ in range(count):
+        (length,) = _BLOB_LENGTH.unpack(await reader.readexactly(_BLOB_LENGTH.size))
+        if length > _MAX_HANDSHAKE_BLOB:
+            raise ChannelError("Handshake message too large.")
+        blobs.append(await reader.readexactly(length))
+    return tuple(blobs)
+
+
+async def _read_frame(reader: asyncio.StreamReader, max_frame_size: int) -> bytes:
+    """Read one wire-format frame off the stream."""
+    header = await reader.readexactly(wire_format.HEADER.size)
+    size = wire_format.size_from_header(header)
+    if size > max_frame_size:
+        raise ChannelError(f"Frame of {size} bytes exceeds the {max_frame_size}-byte limit.")
+    return header + await reader.readexactly(size - len(header))
+
+
+def _transcript(*parts: bytes) -> str:
+    digest = SHA256.new(_PROTOCOL_LABEL)
+    for part in parts:
+        digest.update(_BLOB_LENGTH.pack(len(part)) + part)
+    return digest.hexdigest()
+
+
+class _Session:
+    """Directional AES-GCM keys of one connection, each held by a SecureTransmission."""
+
+    def __init__(self, secret: bytes, salt: bytes, transcript: str, is_client: bool):
+        client_key, server_key = HKDF(secret, 32, salt, SHA256, num_keys=2, context=transcript.encode())
+        self.tx = SecureTransmission()
+        self.rx = SecureTransmission()
+        self.tx.aes_key, self.rx.aes_key = (client_key, server_key) if is_client else (server_key, client_key)
+
+    def encode(self, payload: bytes, sequence: int) -> bytearray:
+        return self.tx.encrypt_frame(payload, sequence=sequence)
+
+    def decode(self, frame: bytes) -> Tuple[int, bytes]:
+        plaintext, _ = self.rx.decrypt_from(frame)
+        return wire_format.decode_from(frame).sequence, plaintext
+
+
+class SecureChannelServer:
+    """
+    Asyncio server for the secure channel.
+
+    Every connection starts with an RSA handshake: the server wraps a fresh
+    session secret for the client with RSA-OAEP and signs the handshake
+    transcript, the client proves possession of its key by signing it too.
+    Both sides derive one AES-GCM key per direction with HKDF. Requests are
+    then pipelined wire-format frames, answered (possibly out of order) with
+    the request's sequence number. At most ``max_concurrency`` requests per
+    connection are handled at once; beyond that the server stops reading, so
+    TCP flow control pushes back on the client.
+    """
+
+    def __init__(
+        self,
+        handler: Handler,
+        secure_transmission: Optional[SecureTransmission] = None,
+        max_concurrency: int = 64,
+        authorized_keys: Optional[Iterable[bytes]] = None,
+        handshake_timeout: float = 10.0,
+        max_frame_size: int = MAX_FRAME_SIZE
+    ):
+        """
+        :param handler: Called with each request payload; returns (or resolves to) the response.
+        :param secure_transmission: Holder of the server's RSA identity (a new one if None).
+        :param max_concurrency: Requests handled concurrently per connection.
+        :param authorized_keys: Client public keys allowed to connect (any client if None).
+        :param handshake_timeout: Seconds a client may take to complete the handshake.
+        :param max_frame_size: Largest accepted request frame.
+        """
+        self.handler = handler
+        self.identity = secure_transmission or SecureTransmission()
+        self.public_key = self.identity.generate_rsa_keys()[0]
+        self.max_concurrency = max_concurrency
+        self.authorized = {recipient_id(key) for key in authorized_keys} if authorized_keys is not None else None
+        self.handshake_timeout = handshake_timeout
+        self.max_frame_size = max_frame_size
+        self.connections = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0, path: Optional[str] = None) -> 'SecureChannelServer':
+        """
+        Start listening on TCP ``host:port`` (an ephemeral port if 0) or on the Unix socket ``path``.
+        """
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=path)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self
+
+    @property
+    def address(self):
+        """(host, port) for TCP servers, the socket path for Unix servers."""
+        return self._server.sockets[0].getsockname()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def __aenter__(self) -> 'SecureChannelServer':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _handshake(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> _Session:
+        client_key, client_nonce = await _read_blobs(reader, 2)
+        if self.authorized is not None and recipient_id(client_key) not in self.authorized:
+            raise ChannelError("Client key is not authorized.")
+        server_nonce = get_random_bytes(_NONCE_SIZE)
+        secret = get_random_bytes(_SESSION_SECRET_SIZE)
+        wrapped = self.identity.encrypt_rsa(base64.b64encode(secret).decode(), client_key).encode()
+        transcript = _transcript(client_key, client_nonce, self.public_key, server_nonce, wrapped)
+        signature = self.identity.sign_message(transcript).encode()
+        _write_blobs(writer, self.public_key, server_nonce, wrapped, signature)
+        await writer.drain()
+
+        (finished,) = await _read_blobs(reader, 1)
+        if not self.identity.verify_signature(transcript + _CLIENT_FINISHED, finished.decode(), client_key):
+            raise ChannelError("Client handshake signature is invalid.")
+        return _Session(secret, client_nonce + server_nonce, transcript, is_client=False)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        requests: Set[asyncio.Task] = set()
+        try:
+            session = await asyncio.wait_for(self._handshake(reader, writer), self.handshake_timeout)
+            self.connections += 1
+            slots = asyncio.Semaphore(self.max_concurrency)
+            last_sequence = -1
+            while True:
+                try:
+                    frame = await _read_frame(reader, self.max_frame_size)
+                except asyncio.IncompleteReadError:
+                    break
+                sequence, payload = session.decode(frame)
+                if sequence <= last_sequence:
+                    raise ChannelError("Replayed or reordered request frame.")
+                last_sequence = sequence
+                await slots.acquire()
+                request = asyncio.create_task(self._serve(session, writer, sequence, payload))
+                requests.add(request)
+                request.add_done_callback(lambda done: (requests.discard(done), slots.release()))
+            await asyncio.gather(*requests, return_exceptions=True)
+        except (ChannelError, ValueError, ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+            logger.warning("Secure channel connection closed: %s", e)
+        except asyncio.CancelledError:
+            # Server shutdown; finish normally so asyncio's stream callback does not report it
+            pass
+        finally:
+            for request in requests:
+                request.cancel()
+            writer.close()
+            self._tasks.discard(task)
+
+    async def _serve(self, session: _Session, writer: asyncio.StreamWriter, sequence: int, payload: bytes) -> None:
+        try:
+            response = self.handler(payload)
+            if inspect.isawaitable(response):
+                response = await response
+            body = bytes([_STATUS_OK]) + bytes(response)
+        except Exception as e:
+            body = bytes([_STATUS_ERROR]) + f"{type(e).__name__}: {e}".encode()
+        if writer.is_closing():
+            return
+        writer.write(session.encode(body, sequence))
+        await writer.drain()
+
+
+class SecureChannelClient:
+    """
+    Client side of the secure channel: one connection multiplexing many concurrent
+    requests. Requests are written as soon as they are issued and responses are
+    matched to them by sequence number, so callers share (and reuse) the
+    connection instead of opening one per message. ``max_in_flight`` bounds the
+    number of unanswered requests; further callers wait for a slot.
+    """
+
+    def __init__(
+        self,
+        secure_transmission: Optional[SecureTransmission] = None,
+        server_public_key: Optional[bytes] = None,
+        max_in_flight: int = 256,
+        handshake_timeout: float = 10.0,
+        max_frame_size: int = MAX_FRAME_SIZE
+    ):
+        """
+        :param secure_transmission: Holder of the client's RSA identity (a new one if None).
+        :param server_public_key: Expected server key; any server key is accepted if None.
+        :param max_in_flight: Maximum number of unanswered requests.
+        :param handshake_timeout: Seconds allowed for connecting and the handshake.
+        :param max_frame_size: Largest accepted response frame.
+        """
+        self.identity = secure_transmission or SecureTransmission()
+        self.public_key = self.identity.generate_rsa_keys()[0]
+        self.server_id = recipient_id(server_public_key) if server_public_key is not None else None
+        self.max_in_flight = max_in_flight
+        self.handshake_timeout = handshake_timeout
+        self.max_frame_size = max_frame_size
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._session: Optional[_Session] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._sequence = itertools.count()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._receiver: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+
+    async def connect(self, host: str = '127.0.0.1', port: Optional[int] = None,
+                      path: Optional[str] = None) -> 'SecureChannelClient':
+        """Connect over TCP ``host:port`` or to the Unix socket ``path`` and run the handshake."""
+        if path is not None:
+            opening = asyncio.open_unix_connection(path)
+        else:
+            opening = asyncio.open_connection(host, port)
+        self._reader, self._writer = await asyncio.wait_for(opening, self.handshake_timeout)
+        try:
+            self._session = await asyncio.wait_for(self._handshake(), self.handshake_timeout)
+        except asyncio.IncompleteReadError:
+            self._writer.close()
+            raise ChannelError("Server closed the connection during the handshake.") from None
+        except BaseException:
+            self._writer.close()
+            raise
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._receiver = asyncio.create_task(self._receive())
+        return self
+
+    async def _handshake(self) -> _Session:
+        client_nonce = get_random_bytes(_NONCE_SIZE)
+        _write_blobs(self._writer, self.public_key, client_nonce)
+        await self._writer.drain()
+        server_key, server_nonce, wrapped, signature = await _read_blobs(self._reader, 4)
+        if self.server_id is not None and recipient_id(server_key) != self.server_id:
+            raise ChannelError("Server key does not match the expected key.")
+        transcript = _transcript(self.public_key, client_nonce, server_key, server_nonce, wrapped)
+        if not self.identity.verify_signature(transcript, signature.decode(), server_key):
+            raise ChannelError("Server handshake signature is invalid.")
+        secret = base64.b64decode(self.identity.decrypt_rsa(wrapped.decode()))
+        _write_blobs(self._writer, self.identity.sign_message(transcript + _CLIENT_FINISHED).encode())
+        await self._writer.drain()
+        return _Session(secret, client_nonce + server_nonce, transcript, is_client=True)
+
+    async def _receive(self) -> None:
+        try:
+            while True:
+                sequence, body = self._session.decode(await _read_frame(self._reader, self.max_frame_size))
+                future = self._pending.pop(sequence, None)
+                if future is None or future.done():
+                    continue
+                if body[:1] == bytes([_STATUS_OK]):
+                    future.set_result(body[1:])
+                else:
+                    future.set_exception(RemoteError(body[1:].decode('utf-8', 'replace')))
+        except asyncio.CancelledError:
+            self._error = ChannelError("Channel closed.")
+            raise
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            self._error = ChannelError(f"Connection lost: {e}")
+        except (ChannelError, ValueError) as e:
+            self._error = ChannelError(f"Invalid response frame: {e}")
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(self._error or ChannelError("Channel closed."))
+            self._pending.clear()
+
+    async def request(self, payload: bytes, timeout: Optional[float] = None) -> bytes:
+        """
+        Send a request and wait for its response; many requests may be in flight at once.
+        :param payload: Request payload.
+        :param timeout: Seconds to wait for the response (no limit if None).
+        :return: Response payload.
+        :raises RemoteError: If the server's handler raised.
+        :raises ChannelError: If the connection is closed or lost.
+        """
+        if self._session is None:
+            raise ChannelError("Not connected.")
+        async with self._slots:
+            if self._error is not None or self._receiver.done():
+                raise self._error or ChannelError("Channel closed.")
+            sequence = next(self._sequence)
+            future = asyncio.get_running_loop().create_future()
+            self._pending[sequence] = future
+            try:
+                self._writer.write(self._session.encode(payload, sequence))
+                await self._writer.drain()
+                return await asyncio.wait_for(future, timeout) if timeout is not None else await future
+            finally:
+                self._pending.pop(sequence, None)
+
+    async def close(self) -> None:
+        if self._receiver is not None:
+            self._receiver.cancel()
+            await asyncio.gather(self._receiver, return_exceptions=True)
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def __aenter__(self) -> 'SecureChannelClient':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
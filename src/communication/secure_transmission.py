@@ -2,80 +2,330 @@
 
 from Crypto.Cipher import AES
 from Crypto.Random import get_random_bytes
-from Crypto.Util.Padding import pad, unpad
+from Crypto.Util.Padding import unpad
 from Crypto.PublicKey import RSA
 from Crypto.Signature import pkcs1_15
 from Crypto.Hash import SHA256
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import count
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
 import base64
+from . import wire_format
+from .key_pool import QKDKeyPool, RotatingKeyManager
+from .key_provider import RSAKeyProvider, key_cache
+from .envelope import oaep_cipher, open_envelope, open_stream, seal, seal_stream
+from .stream_cipher import DEFAULT_CHUNK_SIZE, NO_KEY_ID, StreamSource, decrypt_stream, encrypt_stream
+
+# Items per task when batches are spread over a pool
+_BATCH_CHUNK_SIZE = 256
+
+_GCM_NONCE_SIZE = 12
+_GCM_TAG_SIZE = 16
+
+
+def _verify(message: str, signature: str, public_key: bytes) -> bool:
+    message_hash = SHA256.new(message.encode())
+    _, verifier = key_cache.get(public_key)
+    try:
+        verifier.verify(message_hash, base64.b64decode(signature))
+        return True
+    except (ValueError, TypeError):
+        return False
+
+
+def _verify_chunk(items: Sequence[Tuple[str, str, bytes]]) -> List[bool]:
+    return [_verify(message, signature, public_key) for message, signature, public_key in items]
+
+
+def _sign_chunk(private_key: bytes, messages: Sequence[str]) -> List[str]:
+    _, signer = key_cache.get(private_key)
+    return [base64.b64encode(signer.sign(SHA256.new(message.encode()))).decode('utf-8')
+            for message in messages]
+
+
+def _run_chunked(func, chunks: List[tuple], max_workers: Optional[int], use_processes: bool) -> list:
+    """Apply ``func`` to every argument tuple in ``chunks``, in-process or on a pool, keeping order."""
+    if max_workers == 1 or len(chunks) <= 1:
+        results = [func(*args) for args in chunks]
+    else:
+        pool_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        with pool_class(max_workers=max_workers) as executor:
+            results = list(executor.map(func, *zip(*chunks)))
+    return [item for result in results for item in result]
+
 
 class SecureTransmission:
-    def __init__(self):
-        """Initialize the Secure Transmission class."""
+    def __init__(
+        self,
+        key_pool: Optional[QKDKeyPool] = None,
+        max_messages: int = 1 << 20,
+        max_bytes: int = 1 << 30,
+        rsa_key_provider: Optional[RSAKeyProvider] = None
+    ):
+        """
+        Initialize the Secure Transmission class.
+        :param key_pool: QKD key pool to derive rotating AES keys from; a single
+                         random AES key is used if None.
+        :param max_messages: Messages per AES key before rotation (with ``key_pool``).
+        :param max_bytes: Plaintext bytes per AES key before rotation (with ``key_pool``).
+        :param rsa_key_provider: Source of pre-generated RSA key pairs. The RSA key is
+                                 only obtained on first use, so sessions that never use
+                                 it pay nothing.
+        """
         self.aes_key = get_random_bytes(16)  # AES key must be either 16, 24, or 32 bytes long
-        self.rsa_key = RSA.generate(2048)  # Generate RSA key pair
+        self.key_manager = None
+        if key_pool is not None:
+            key_pool.start()
+            self.key_manager = RotatingKeyManager(key_pool, max_messages=max_messages, max_bytes=max_bytes)
+        self.rsa_key_provider = rsa_key_provider
+        self._rsa_key = None
+        self._sequence = count()
+
+    @property
+    def rsa_key(self) -> RSA.RsaKey:
+        """RSA key pair, taken from the key provider (or generated) on first access."""
+        if self._rsa_key is None:
+            if self.rsa_key_provider is not None:
+                self._rsa_key = self.rsa_key_provider.get_key()
+            else:
+                self._rsa_key = RSA.generate(2048)  # Generate RSA key pair
+        return self._rsa_key
+
+    @rsa_key.setter
+    def rsa_key(self, key: RSA.RsaKey):
+        self._rsa_key = key
 
     def encrypt_aes(self, plaintext: str) -> str:
         """
         Encrypt the plaintext using AES encryption.
+        Thin wrapper around ``encrypt_frame`` for text transports.
         :param plaintext: The plaintext to encrypt.
         :return: Base64 encoded ciphertext.
         """
-        cipher = AES.new(self.aes_key, AES.MODE_CBC)
-        ct_bytes = cipher.encrypt(pad(plaintext.encode(), AES.block_size))
-        iv = base64.b64encode(cipher.iv).decode('utf-8')
-        ct = base64.b64encode(ct_bytes).decode('utf-8')
-        return iv + ":" + ct
+        return base64.b64encode(self.encrypt_frame(plaintext.encode())).decode('utf-8')
 
     def decrypt_aes(self, ciphertext: str) -> str:
         """
         Decrypt the ciphertext using AES decryption.
+        Accepts Base64 frames from ``encrypt_aes`` as well as the earlier
+        ``[key_id:]iv:ct`` AES-CBC text format.
         :param ciphertext: The Base64 encoded ciphertext to decrypt.
         :return: Decrypted plaintext.
         """
-        iv, ct = ciphertext.split(":")
-        iv = base64.b64decode(iv)
-        ct = base64.b64decode(ct)
-        cipher = AES.new(self.aes_key, AES.MODE_CBC, iv)
+        if ":" not in ciphertext:
+            plaintext, _ = self.decrypt_from(base64.b64decode(ciphertext))
+            return plaintext.decode('utf-8')
+        parts = ciphertext.split(":")
+        key = self._aes_key(int(parts[0]) if len(parts) == 3 else None)
+        iv = base64.b64decode(parts[-2])
+        ct = base64.b64decode(parts[-1])
+        cipher = AES.new(key, AES.MODE_CBC, iv)
         plaintext = unpad(cipher.decrypt(ct), AES.block_size).decode('utf-8')
         return plaintext
 
+    @staticmethod
+    def frame_size(payload_length: int) -> int:
+        """Upper bound of the encoded size of a frame carrying ``payload_length`` bytes."""
+        return wire_format.frame_size(payload_length, _GCM_NONCE_SIZE, _GCM_TAG_SIZE, key_id=0)
+
+    def encrypt_into(
+        self,
+        buffer: Union[bytearray, memoryview],
+        plaintext: Union[bytes, memoryview],
+        offset: int = 0,
+        sequence: Optional[int] = None
+    ) -> int:
+        """
+        Encrypt with AES-GCM straight into a binary frame in ``buffer``.
+        The ciphertext is written in place (no intermediate copies) and the frame
+        header is authenticated as associated data.
+        :param buffer: Writable buffer with at least ``frame_size(len(plaintext))`` bytes after ``offset``.
+        :param plaintext: The message.
+        :param offset: Position of the frame in ``buffer``.
+        :param sequence: Frame sequence number (a per-instance counter if None).
+        :return: Number of bytes written.
+        """
+        length = len(plaintext)
+        if self.key_manager is None:
+            key, key_id = self.aes_key, None
+        else:
+            key_id, key = self.key_manager.encryption_key(length)
+        if sequence is None:
+            sequence = next(self._sequence)
+        size = wire_format.frame_size(length, _GCM_NONCE_SIZE, _GCM_TAG_SIZE, key_id)
+        if offset + size > len(buffer):
+            raise ValueError(f"Buffer too small for a {size}-byte frame.")
+
+        view = memoryview(buffer)
+        nonce_start = offset + wire_format.encode_header_into(
+            view, offset, wire_format.ALG_AES_GCM, sequence, length, _GCM_NONCE_SIZE, _GCM_TAG_SIZE, key_id
+        )
+        payload_start = nonce_start + _GCM_NONCE_SIZE
+        tag_start = payload_start + length
+        nonce = get_random_bytes(_GCM_NONCE_SIZE)
+        view[nonce_start:payload_start] = nonce
+        cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
+        cipher.update(view[offset:nonce_start])
+        cipher.encrypt(plaintext, output=view[payload_start:tag_start])
+        view[tag_start:tag_start + _GCM_TAG_SIZE] = cipher.digest()
+        return size
+
+    def encrypt_frame(self, plaintext: Union[bytes, memoryview], sequence: Optional[int] = None) -> bytearray:
+        """Encrypt a message into a newly allocated binary frame (see ``encrypt_into``)."""
+        buffer = bytearray(self.frame_size(len(plaintext)))
+        del buffer[self.encrypt_into(buffer, plaintext, sequence=sequence):]
+        return buffer
+
+    def decrypt_from(self, view: Union[bytes, bytearray, memoryview], offset: int = 0) -> Tuple[bytes, int]:
+        """
+        Decrypt the binary frame at ``offset``; header fields are parsed in place.
+        :param view: Buffer holding one or more frames.
+        :param offset: Start of the frame.
+        :return: (plaintext, frame size) — the size is the offset step to the next frame.
+        :raises ValueError: If the frame is malformed or fails authentication.
+        """
+        frame = wire_format.decode_from(view, offset)
+        if frame.algorithm != wire_format.ALG_AES_GCM:
+            raise ValueError(f"Unsupported frame algorithm {frame.algorithm}.")
+        # Lengths come from the untrusted header; a shorter tag would weaken authentication
+        if len(frame.nonce) != _GCM_NONCE_SIZE or len(frame.tag) != _GCM_TAG_SIZE:
+            raise ValueError("Invalid AES-GCM nonce or tag length.")
+        cipher = AES.new(self._aes_key(frame.key_id), AES.MODE_GCM, nonce=frame.nonce)
+        cipher.update(frame.header)
+        return cipher.decrypt_and_verify(frame.payload, frame.tag), frame.size
+
+    def _aes_key(self, key_id: Optional[int]) -> bytes:
+        if key_id is None:
+            return self.aes_key
+        if self.key_manager is None:
+            raise ValueError("Ciphertext uses a QKD-derived key but no key pool is configured.")
+        return self.key_manager.decryption_key(key_id)
+
+    def encrypt_stream(self, source: StreamSource, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Encrypt a large payload with AES-GCM in individually authenticated chunks.
+        Works on bytes-like objects, binary file objects and iterables of bytes
+        with constant memory; write the yielded pieces to the destination in order.
+        With a key pool the whole stream uses one key, and its bytes count towards
+        that key's ``max_bytes``: up front for bytes-like payloads, chunk by chunk otherwise.
+        :param source: The payload to encrypt.
+        :param chunk_size: Plaintext bytes per chunk.
+        :return: Iterator of encrypted pieces.
+        """
+        if self.key_manager is None:
+            return encrypt_stream(self.aes_key, source, chunk_size, NO_KEY_ID)
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            key_id, key = self.key_manager.encryption_key(memoryview(source).nbytes)
+            return encrypt_stream(key, source, chunk_size, key_id)
+        key_id, key = self.key_manager.encryption_key(0)
+        return encrypt_stream(key, source, chunk_size, key_id, on_chunk=partial(self.key_manager.charge, key_id))
+
+    def decrypt_stream(self, source: StreamSource) -> Iterator[bytes]:
+        """
+        Decrypt a payload produced by ``encrypt_stream``.
+        Chunks are yielded only after they have been authenticated.
+        :param source: The encrypted stream (bytes-like, binary file object or iterable of bytes).
+        :return: Iterator of plaintext chunks.
+        :raises ValueError: If the stream was modified, truncated or extended.
+        """
+        return decrypt_stream(self._aes_key, source)
+
     def generate_rsa_keys(self) -> Tuple[bytes, bytes]:
         """Generate RSA public and private keys."""
         private_key = self.rsa_key.export_key()
         public_key = self.rsa_key.publickey().export_key()
-        return private_key, public_key
+        return public_key, private_key
 
     def encrypt_rsa(self, message: str, public_key: bytes) -> str:
         """
-        Encrypt a message using RSA encryption.
+        Encrypt a short message using RSA-OAEP (SHA-256).
+        The message must fit in one RSA block (190 bytes for a 2048-bit key);
+        use ``encrypt_envelope`` for anything longer.
         :param message: The message to encrypt.
         :param public_key: The recipient's public key.
         :return: Base64 encoded ciphertext.
         """
-        rsa_key = RSA.import_key(public_key)
-        ciphertext = rsa_key.encrypt(message.encode(), None)[0]
+        ciphertext = oaep_cipher(public_key).encrypt(message.encode())
         return base64.b64encode(ciphertext).decode('utf-8')
 
-    def decrypt_rsa(self, ciphertext: str) -> str:
+    def decrypt_rsa(self, ciphertext: str, private_key: Optional[bytes] = None) -> str:
         """
-        Decrypt a message using RSA decryption.
+        Decrypt a message encrypted with ``encrypt_rsa``.
         :param ciphertext: The Base64 encoded ciphertext to decrypt.
+        :param private_key: Encoded private key to decrypt with (defaults to this instance's key).
         :return: Decrypted message.
         """
         ciphertext = base64.b64decode(ciphertext)
-        plaintext = self.rsa_key.decrypt(ciphertext).decode('utf-8')
+        plaintext = oaep_cipher(private_key or self.rsa_key).decrypt(ciphertext).decode('utf-8')
         return plaintext
 
-    def sign_message(self, message: str) -> str:
+    def encrypt_envelope(self, message: bytes, public_keys: Sequence[bytes]) -> bytes:
+        """
+        Hybrid encryption for one or many recipients: the message is encrypted once
+        with a fresh AES-GCM key, which is wrapped with RSA-OAEP for every recipient.
+        :param message: The message to encrypt.
+        :param public_keys: The recipients' public keys.
+        :return: The envelope.
+        """
+        return seal(message, public_keys)
+
+    def decrypt_envelope(self, envelope: bytes) -> bytes:
+        """
+        Decrypt an envelope addressed to this instance's key.
+        :param envelope: The envelope from ``encrypt_envelope``.
+        :return: The message.
+        """
+        return open_envelope(envelope, self.rsa_key)
+
+    def encrypt_envelope_stream(
+        self,
+        source: StreamSource,
+        public_keys: Sequence[bytes],
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Iterator[bytes]:
+        """
+        Envelope encryption for large payloads; the payload is encrypted once as a
+        chunked AES-GCM stream (see ``encrypt_stream``).
+        :return: Iterator of encrypted pieces.
+        """
+        return seal_stream(source, public_keys, chunk_size)
+
+    def decrypt_envelope_stream(self, source: StreamSource) -> Iterator[bytes]:
+        """Decrypt an ``encrypt_envelope_stream`` payload addressed to this instance's key."""
+        return open_stream(source, self.rsa_key)
+
+    def sign_message(self, message: str, private_key: Optional[bytes] = None) -> str:
         """
         Sign a message using RSA private key.
         :param message: The message to sign.
+        :param private_key: Encoded private key to sign with (defaults to this instance's key).
         :return: Base64 encoded signature.
         """
         message_hash = SHA256.new(message.encode())
-        signature = pkcs1_15.new(self.rsa_key).sign(message_hash)
+        signer = key_cache.get(private_key)[1] if private_key is not None else pkcs1_15.new(self.rsa_key)
+        signature = signer.sign(message_hash)
         return base64.b64encode(signature).decode('utf-8')
 
+    def sign_many(
+        self,
+        messages: Sequence[str],
+        max_workers: Optional[int] = None,
+        use_processes: bool = False,
+        chunk_size: int = _BATCH_CHUNK_SIZE
+    ) -> List[str]:
+        """
+        Sign a batch of messages with this instance's private key.
+        :param messages: The messages to sign.
+        :param max_workers: Pool size; 1 signs in the calling thread.
+        :param use_processes: Use a process pool instead of a thread pool.
+        :param chunk_size: Messages per pool task.
+        :return: Base64 encoded signatures, in the order of ``messages``.
+        """
+        private_key = self.rsa_key.export_key()
+        chunks = [(private_key, messages[i:i + chunk_size]) for i in range(0, len(messages), chunk_size)]
+        return _run_chunked(_sign_chunk, chunks, max_workers, use_processes)
+
     def verify_signature(self, message: str, signature: str, public_key: bytes) -> bool:
         """
         Verify a message signature using RSA public key.
@@ -84,13 +334,25 @@ class SecureTransmission:
         :param public_key: The public key to verify against.
         :return: True if the signature is valid, False otherwise.
         """
-        message_hash = SHA256.new(message.encode())
-        rsa_key = RSA.import_key(public_key)
-        try:
-            pkcs1_15.new(rsa_key).verify(message_hash, base64.b64decode(signature))
-            return True
-        except (ValueError, TypeError):
-            return False
+        return _verify(message, signature, public_key)
+
+    def verify_many(
+        self,
+        items: Sequence[Tuple[str, str, bytes]],
+        max_workers: Optional[int] = None,
+        use_processes: bool = False,
+        chunk_size: int = _BATCH_CHUNK_SIZE
+    ) -> List[bool]:
+        """
+        Verify a batch of signatures; parsed public keys are cached by fingerprint.
+        :param items: (message, Base64 signature, public key) tuples.
+        :param max_workers: Pool size; 1 verifies in the calling thread.
+        :param use_processes: Use a process pool instead of a thread pool.
+        :param chunk_size: Items per pool task.
+        :return: One validity flag per item, in order.
+        """
+        chunks = [(items[i:i + chunk_size],) for i in range(0, len(items), chunk_size)]
+        return _run_chunked(_verify_chunk, chunks, max_workers, use_processes)
 
 # Example usage
 if __name__ == "__main__":
@@ -105,7 +367,7 @@ if __name__ == "__main__":
     print("Decrypted AES Message:", decrypted_message_aes)
 
     # RSA Key Generation
-    private_key, public_key = secure_transmission.generate_rsa _keys()
+    public_key, private_key = secure_transmission.generate_rsa_keys()
     print("Private Key:", private_key.decode('utf-8'))
     print("Public Key:", public_key.decode('utf-8'))
 
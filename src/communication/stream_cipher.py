@@ -0,0 +1,208 @@
+# communication/stream_cipher.py
+
+import struct
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+
+# Stream header: magic, version, reserved, key id, chunk size, nonce prefix.
+# It is authenticated as associated data of every chunk.
+_STREAM_HEADER = struct.Struct('>4sBxII8s')
+_STREAM_MAGIC = b'QNST'
+STREAM_VERSION = 1
+
+# Chunk header: plaintext length with the top bit flagging the final chunk
+_CHUNK_HEADER = struct.Struct('>I')
+_FINAL_FLAG = 1 << 31
+_TAG_SIZE = 16
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+# The chunk size is read from the unauthenticated header before any tag is checked,
+# so it is capped to bound what a forged header can make the receiver read
+MAX_CHUNK_SIZE = 1 << 24
+# Key id stored when the stream is encrypted with a static (not pool-derived) key
+NO_KEY_ID = 0xFFFFFFFF
+# GCM nonce = 8-byte random prefix + 4-byte chunk counter
+_MAX_CHUNKS = 1 << 32
+
+StreamSource = Union[bytes, bytearray, memoryview, Iterable[bytes], object]
+
+
+def _plaintext_chunks(source: StreamSource, chunk_size: int) -> Iterator[memoryview]:
+    """
+    Cut any supported source into ``chunk_size`` chunks (the last may be shorter).
+    Bytes-like sources are sliced without copying; files are read into two
+    alternating buffers, so a chunk stays valid until the next-but-one is read.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source).cast('B')
+        for start in range(0, len(view), chunk_size):
+            yield view[start:start + chunk_size]
+    elif hasattr(source, 'readinto'):
+        buffers = [bytearray(chunk_size), bytearray(chunk_size)]
+        current = 0
+        while True:
+            view = memoryview(buffers[current])
+            filled = 0
+            while filled < chunk_size:
+                count = source.readinto(view[filled:])
+                if not count:
+                    break
+                filled += count
+            if filled == 0:
+                return
+            yield view[:filled]
+            if filled < chunk_size:
+                return
+            current ^= 1
+    else:
+        pieces = iter(lambda: source.read(chunk_size), b'') if hasattr(source, 'read') else iter(source)
+        pending = bytearray()
+        for piece in pieces:
+            pending += piece
+            while len(pending) >= chunk_size:
+                yield memoryview(bytes(pending[:chunk_size]))
+                del pending[:chunk_size]
+        if pending:
+            yield memoryview(bytes(pending))
+
+
+class _Reader:
+    """Exact-size reads from bytes-like objects, files or iterators of bytes."""
+
+    def __init__(self, source: StreamSource):
+        self._view = None
+        self._offset = 0
+        self._file = None
+        self._pieces = None
+        self._pending = bytearray()
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self._view = memoryview(source).cast('B')
+        elif hasattr(source, 'read'):
+            self._file = source
+        else:
+            self._pieces = iter(source)
+
+    def read(self, size: int) -> Union[bytes, memoryview]:
+        """Return up to ``size`` bytes; fewer only at the end of the source."""
+        if self._view is not None:
+            data = self._view[self._offset:self._offset + size]
+            self._offset += len(data)
+            return data
+        while len(self._pending) < size:
+            piece = self._file.read(size - len(self._pending)) if self._file else next(self._pieces, b'')
+            if not piece:
+                break
+            self._pending += piece
+        data = bytes(self._pending[:size])
+        del self._pending[:size]
+        return data
+
+    def read_exact(self, size: int) -> Union[bytes, memoryview]:
+        data = self.read(size)
+        if len(data) != size:
+            raise ValueError("Truncated encrypted stream.")
+        return data
+
+
+def encrypt_stream(
+    key: bytes,
+    source: StreamSource,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    key_id: int = NO_KEY_ID,
+    on_chunk: Optional[Callable[[int], None]] = None,
+    associated_data: bytes = b''
+) -> Iterator[bytes]:
+    """
+    Encrypt a stream with AES-GCM in fixed-size, individually authenticated chunks.
+
+    Every chunk uses the nonce ``prefix || counter`` and authenticates the stream
+    header and its own chunk header, whose final-chunk flag makes truncation
+    detectable. Memory use is O(chunk_size) whatever the stream length.
+    :param key: AES key (16, 24 or 32 bytes).
+    :param source: bytes/bytearray/memoryview, a binary file object or an iterable of bytes.
+    :param chunk_size: Plaintext bytes per chunk.
+    :param key_id: Key id recorded in the header for the receiver's key lookup.
+    :param on_chunk: Called with the plaintext length of every encrypted chunk.
+    :param associated_data: Extra data authenticated with every chunk (not included in the output).
+    :return: Iterator of encrypted output pieces (header first).
+    """
+    if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+        raise ValueError(f"Chunk size must be between 1 and {MAX_CHUNK_SIZE} bytes.")
+    nonce_prefix = get_random_bytes(8)
+    header = _STREAM_HEADER.pack(_STREAM_MAGIC, STREAM_VERSION, key_id, chunk_size, nonce_prefix)
+    yield header
+
+    chunks = _plaintext_chunks(source, chunk_size)
+    chunk = next(chunks, memoryview(b''))
+    counter = 0
+    while chunk is not None:
+        following = next(chunks, None)
+        if counter >= _MAX_CHUNKS:
+            raise ValueError("Stream exceeds the maximum number of chunks for one nonce prefix.")
+        length = len(chunk)
+        frame = bytearray(_CHUNK_HEADER.size + length + _TAG_SIZE)
+        _CHUNK_HEADER.pack_into(frame, 0, length | (_FINAL_FLAG if following is None else 0))
+        cipher = AES.new(key, AES.MODE_GCM, nonce=nonce_prefix + counter.to_bytes(4, 'big'))
+        cipher.update(associated_data)
+        cipher.update(header)
+        cipher.update(frame[:_CHUNK_HEADER.size])
+        body = memoryview(frame)[_CHUNK_HEADER.size:]
+        cipher.encrypt(chunk, output=body[:length])
+        body[length:] = cipher.digest()
+        if on_chunk is not None:
+            on_chunk(length)
+        yield frame
+        chunk = following
+        counter += 1
+
+
+def stream_key_id(header: bytes) -> Optional[int]:
+    """Return the key id of a stream header (None for a static key)."""
+    magic, version, key_id, _, _ = _STREAM_HEADER.unpack(header)
+    if magic != _STREAM_MAGIC or version != STREAM_VERSION:
+        raise ValueError("Not an encrypted stream or unsupported stream version.")
+    return None if key_id == NO_KEY_ID else key_id
+
+
+def decrypt_stream(
+    key_lookup: Callable[[Optional[int]], bytes],
+    source: StreamSource,
+    associated_data: bytes = b''
+) -> Iterator[bytes]:
+    """
+    Decrypt a stream produced by ``encrypt_stream``, chunk by chunk.
+    Each chunk is only yielded after its tag has been verified.
+    :param key_lookup: Returns the AES key for the header's key id (None for a static key).
+    :param source: bytes/bytearray/memoryview, a binary file object, an iterable of bytes
+                   or a reader positioned at the stream header.
+    :param associated_data: The associated data given to ``encrypt_stream``.
+    :return: Iterator of plaintext chunks.
+    :raises ValueError: If a chunk fails authentication or the stream is truncated or extended.
+    """
+    reader = source if isinstance(source, _Reader) else _Reader(source)
+    header = bytes(reader.read_exact(_STREAM_HEADER.size))
+    key = key_lookup(stream_key_id(header))
+    _, _, _, chunk_size, nonce_prefix = _STREAM_HEADER.unpack(header)
+    if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+        raise ValueError("Invalid chunk size in encrypted stream header.")
+
+    counter = 0
+    while True:
+        chunk_header = reader.read_exact(_CHUNK_HEADER.size)
+        (value,) = _CHUNK_HEADER.unpack(chunk_header)
+        length, final = value & ~_FINAL_FLAG, bool(value & _FINAL_FLAG)
+        if length > chunk_size:
+            raise ValueError("Invalid chunk length in encrypted stream.")
+        body = reader.read_exact(length + _TAG_SIZE)
+        cipher = AES.new(key, AES.MODE_GCM, nonce=nonce_prefix + counter.to_bytes(4, 'big'))
+        cipher.update(associated_data)
+        cipher.update(header)
+        cipher.update(chunk_header)
+        yield cipher.decrypt_and_verify(body[:length], body[length:])
+        counter += 1
+        if final:
+            break
+    if reader.read(1):
+        raise ValueError("Unexpected data after the final chunk of the encrypted stream.")
@@ -0,0 +1,150 @@
+# communication/wire_format.py
+
+import struct
+from dataclasses import dataclass
+from typing import Optional, Union
+
+# Frame header: magic, version, algorithm, flags, nonce length, tag length,
+# reserved, sequence number, payload length. Optional fields (key id) follow
+# the fixed header, then nonce, payload and tag.
+HEADER = struct.Struct('>2sBBBBBxQI')
+_KEY_ID = struct.Struct('>I')
+MAGIC = b'QN'
+VERSION = 1
+
+ALG_AES_GCM = 1
+
+FLAG_KEY_ID = 0x01
+_KNOWN_FLAGS = FLAG_KEY_ID
+
+BufferLike = Union[bytearray, memoryview]
+
+
+@dataclass
+class Frame:
+    """
+    A decoded frame. ``header``, ``nonce``, ``payload`` and ``tag`` are views
+    into the decoded buffer, so they are only valid while it is unchanged.
+    """
+    algorithm: int
+    flags: int
+    sequence: int
+    key_id: Optional[int]
+    header: memoryview
+    nonce: memoryview
+    payload: memoryview
+    tag: memoryview
+    size: int
+
+
+def header_size(key_id: Optional[int] = None) -> int:
+    """Size of the fixed header plus optional fields."""
+    return HEADER.size + (_KEY_ID.size if key_id is not None else 0)
+
+
+def frame_size(payload_length: int, nonce_length: int, tag_length: int, key_id: Optional[int] = None) -> int:
+    """Total encoded size of a frame."""
+    return header_size(key_id) + nonce_length + payload_length + tag_length
+
+
+def size_from_header(header: Union[bytes, BufferLike]) -> int:
+    """
+    Total frame size from its first ``HEADER.size`` bytes, for reading frames off a stream.
+    :raises ValueError: If the header is not a valid frame header.
+    """
+    magic, version, _, flags, nonce_length, tag_length, _, payload_length = HEADER.unpack_from(header)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a frame or unsupported frame version.")
+    key_id_size = _KEY_ID.size if flags & FLAG_KEY_ID else 0
+    return HEADER.size + key_id_size + nonce_length + payload_length + tag_length
+
+
+def encode_header_into(
+    buffer: BufferLike,
+    offset: int,
+    algorithm: int,
+    sequence: int,
+    payload_length: int,
+    nonce_length: int,
+    tag_length: int,
+    key_id: Optional[int] = None
+) -> int:
+    """
+    Write a frame header at ``offset``; the caller fills in nonce, payload and tag.
+    :return: Header size in bytes.
+    """
+    flags = FLAG_KEY_ID if key_id is not None else 0
+    HEADER.pack_into(buffer, offset, MAGIC, VERSION, algorithm, flags,
+                     nonce_length, tag_length, sequence, payload_length)
+    if key_id is not None:
+        _KEY_ID.pack_into(buffer, offset + HEADER.size, key_id)
+    return header_size(key_id)
+
+
+def encode_into(
+    buffer: BufferLike,
+    algorithm: int,
+    nonce: bytes,
+    payload: Union[bytes, memoryview],
+    tag: bytes,
+    sequence: int = 0,
+    key_id: Optional[int] = None,
+    offset: int = 0
+) -> int:
+    """
+    Encode a complete frame into ``buffer`` at ``offset``.
+    :return: Number of bytes written.
+    """
+    size = frame_size(len(payload), len(nonce), len(tag), key_id)
+    if offset + size > len(buffer):
+        raise ValueError(f"Buffer too small for a {size}-byte frame.")
+    view = memoryview(buffer)
+    position = offset + encode_header_into(
+        view, offset, algorithm, sequence, len(payload), len(nonce), len(tag), key_id
+    )
+    for part in (nonce, payload, tag):
+        view[position:position + len(part)] = part
+        position += len(part)
+    return size
+
+
+def decode_from(view: Union[bytes, BufferLike], offset: int = 0) -> Frame:
+    """
+    Decode the frame starting at ``offset`` without copying its contents.
+    :param view: Buffer holding one or more frames.
+    :param offset: Start of the frame.
+    :return: Frame whose ``size`` gives the offset of the next frame.
+    :raises ValueError: If the frame is malformed, truncated or of an unknown version.
+    """
+    view = memoryview(view)
+    if len(view) - offset < HEADER.size:
+        raise ValueError("Truncated frame header.")
+    magic, version, algorithm, flags, nonce_length, tag_length, sequence, payload_length = (
+        HEADER.unpack_from(view, offset)
+    )
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a frame or unsupported frame version.")
+    if flags & ~_KNOWN_FLAGS:
+        raise ValueError(f"Unknown frame flags 0x{flags:02x}.")
+    key_id = None
+    if flags & FLAG_KEY_ID:
+        if len(view) - offset < HEADER.size + _KEY_ID.size:
+            raise ValueError("Truncated frame header.")
+        key_id = _KEY_ID.unpack_from(view, offset + HEADER.size)[0]
+    start = offset + header_size(key_id)
+    size = frame_size(payload_length, nonce_length, tag_length, key_id)
+    if offset + size > len(view):
+        raise ValueError("Truncated frame.")
+    payload_start = start + nonce_length
+    tag_start = payload_start + payload_length
+    return Frame(
+        algorithm=algorithm,
+        flags=flags,
+        sequence=sequence,
+        key_id=key_id,
+        header=view[offset:start],
+        nonce=view[start:payload_start],
+        payload=view[payload_start:tag_start],
+        tag=view[tag_start:tag_start + tag_length],
+        size=size
+    )
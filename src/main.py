@@ -3,6 +3,9 @@
 import argparse
 import logging
 from src.communication.quantum_communication import QuantumKeyDistribution
+from src.communication.qkd_pipeline import QKDPipeline
+from src.communication.key_pool import QKDKeyPool
+from src.communication.secure_transmission import SecureTransmission
 from src.blockchain.blockchain import Blockchain
 from src.ai_model import AIModel
 from src.utils import generate_nonce, validate_transaction  # Hypothetical utility functions
@@ -24,11 +27,37 @@ def run_quantum_key_distribution(num_bits):
     qkd.simulate_receiver()
     qkd.sift_key()
     qkd.error_correction()
-    qkd.privacy_amplification()
+    if qkd.privacy_amplification() == 0:
+        raise ValueError(f"{num_bits} qubits leave no secure key after error correction and "
+                         f"privacy amplification; use more bits (e.g. 1024).")
     final_key = qkd.get_key()
     logging.info("Final Key from QKD: %s", final_key)
     return final_key
 
+def run_quantum_key_stream(block_bits, num_blocks):
+    """Run block-wise streaming Quantum Key Distribution."""
+    logging.info("=== Running streaming Quantum Key Distribution ===")
+    pipeline = QKDPipeline(block_bits=block_bits)
+    key_blocks = []
+    for block in pipeline.blocks(num_blocks):
+        logging.info("Key block %d ready: %d bits (QBER %.4f)", block.index, block.key_length, block.qber)
+        key_blocks.append(block.key)
+    logging.info("Stream finished: %d raw bits -> %d key bits",
+                 pipeline.stats.raw_bits, pipeline.stats.key_bits)
+    return b"".join(key_blocks)
+
+def send_secure_message(message, block_bits):
+    """Encrypt a message with an AES key derived from a background QKD key pool."""
+    logging.info("=== Sending message with QKD-derived AES keys ===")
+    with QKDKeyPool(block_bits=block_bits) as key_pool:
+        secure_transmission = SecureTransmission(key_pool=key_pool)
+        encrypted = secure_transmission.encrypt_aes(message)
+        logging.info("Encrypted message: %s", encrypted)
+        logging.info("Decrypted message: %s", secure_transmission.decrypt_aes(encrypted))
+        logging.info("Key pool: %d bytes produced, %d consumed",
+                     key_pool.bytes_produced, key_pool.bytes_consumed)
+    return encrypted
+
 def deploy_ai_model():
     """Deploy the AI model."""
     logging.info("=== Deploying AI Model ===")
@@ -51,7 +80,11 @@ def create_transaction(blockchain, sender, receiver, amount, key):
 
 def main():
     parser = argparse.ArgumentParser(description="Quantum Celestia Nexus Main Application")
-    parser.add_argument('--num_bits', type=int, default=10, help="Number of bits for Quantum Key Distribution.")
+    parser.add_argument('--num_bits', type=int, default=1024, help="Number of bits for Quantum Key Distribution.")
+    parser.add_argument('--qkd_blocks', type=int, default=None,
+                        help="Run QKD as a stream of this many blocks of --num_bits qubits each.")
+    parser.add_argument('--secure_message', type=str, default=None,
+                        help="Encrypt this message with AES keys derived from a QKD key pool.")
     parser.add_argument('--deploy_ai', action='store_true', help="Deploy the AI model.")
     parser.add_argument('--sender', type=str, required=True, help="Sender's address.")
     parser.add_argument('--receiver', type=str, required=True, help="Receiver's address.")
@@ -64,7 +97,13 @@ def main():
     blockchain = initialize_blockchain()
 
     # Run Quantum Key Distribution
-    final_key = run_quantum_key_distribution(args.num_bits)
+    if args.qkd_blocks:
+        final_key = run_quantum_key_stream(args.num_bits, args.qkd_blocks)
+    else:
+        final_key = run_quantum_key_distribution(args.num_bits)
+
+    if args.secure_message:
+        send_secure_message(args.secure_message, max(args.num_bits, 1 << 14))
 
     # Optionally deploy the AI model
     if args.deploy_ai:
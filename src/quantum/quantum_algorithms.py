@@ -58,7 +58,9 @@ class GroverSearch(QuantumAlgorithm):
             # Apply diffusion operator
             self._apply_diffusion()
         
-        return self.circuit_designer.simulate(shots=1000)
+        designer = self.circuit_designer
+        designer.circuit.measure(designer.quantum_register, designer.classical_register)
+        return designer.simulate(shots=1000)
 
     def _apply_diffusion(self) -> None:
         """Apply the diffusion operator."""
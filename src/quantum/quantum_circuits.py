@@ -1,4 +1,5 @@
-from typing import List, Optional, Tuple
+import time
+from typing import Dict, List, Optional, Tuple
 import numpy as np
 from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister, execute, Aer
 from qiskit.circuit import Parameter
@@ -46,16 +47,34 @@ class QuantumCircuitDesigner:
         # Implementation of Surface code or Shor's code
         pass
 
-    def simulate(self, shots: int = 1000, backend_name: str = 'qasm_simulator') -> dict:
-        """Simulate the quantum circuit with specified parameters."""
+    def simulate(
+        self,
+        shots: int = 1000,
+        backend_name: str = 'qasm_simulator',
+        timings: Optional[Dict[str, float]] = None
+    ) -> dict:
+        """Simulate the quantum circuit with specified parameters.
+
+        If ``timings`` is given, the wall-clock seconds spent in the
+        optimize, bind and execute phases are stored in it.
+        """
+        timings = {} if timings is None else timings
         try:
             backend = Aer.get_backend(backend_name)
+            start = time.perf_counter()
             optimized_circuit = optimize_circuit(self.circuit)
+            timings['optimize'] = time.perf_counter() - start
+
+            start = time.perf_counter()
             bound_circuit = optimized_circuit.bind_parameters(
                 {param: value for param, value in self.parameters}
             )
             validate_circuit(bound_circuit)
+            timings['bind'] = time.perf_counter() - start
+
+            start = time.perf_counter()
             result = execute(bound_circuit, backend, shots=shots).result()
+            timings['execute'] = time.perf_counter() - start
             return result.get_counts()
         except Exception as e:
             raise QuantumCircuitError(f"Simulation failed: {str(e)}")
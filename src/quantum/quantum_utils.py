@@ -1,18 +1,18 @@
 from typing import List, Tuple, Optional, Dict, Union, Callable
 import numpy as np
 from scipy.linalg import expm
-from qiskit import QuantumCircuit, Aero
+from qiskit import QuantumCircuit, Aer, execute
 from qiskit.quantum_info import Statevector, DensityMatrix, Operator, state_fidelity
 from qiskit.transpiler import PassManager
 from qiskit.transpiler.passes import (
-    Optimize1QGates, CXCancellation, CommutativeCancellation,
+    Optimize1qGates, CXCancellation, CommutativeCancellation,
     OptimizeSwapBeforeMeasure, Unroller, Depth, FixedPoint
 )
 from qiskit.providers.aer.noise import NoiseModel
-import torch
-import tensorflow as tf
 from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
 import logging
+import multiprocessing
 from dataclasses import dataclass
 
 # Configure logging
@@ -86,21 +86,24 @@ class QuantumOptimizer:
     def _create_pass_manager(self) -> PassManager:
         """Create an advanced pass manager for circuit optimization."""
         passes = [
-            Optimize1QGates(),
+            # Optimize1qGates works on the u1/u2/u3 basis, so unroll first
+            Unroller(basis=['u1', 'u2', 'u3', 'cx']),
+            Optimize1qGates(),
             CXCancellation(),
             CommutativeCancellation(),
             OptimizeSwapBeforeMeasure(),
-            Unroller(),
             Depth(),
-            FixedPoint(max_iterations=20)
+            FixedPoint('depth')
         ]
         
         if self.optimization_level >= 2:
-            passes.extend([
-                # Add more sophisticated optimization passes
-                self._custom_optimization_pass(),
-                self._quantum_topology_optimization()
-            ])
+            # Add more sophisticated optimization passes (skipped until implemented)
+            passes.extend(
+                optimization_pass for optimization_pass in (
+                    self._custom_optimization_pass(),
+                    self._quantum_topology_optimization()
+                ) if optimization_pass is not None
+            )
             
         return PassManager(passes)
     
@@ -159,9 +162,11 @@ class QuantumParallelProcessor:
         backend: str = 'qasm_simulator'
     ) -> List[Dict]:
         """Execute quantum circuits in parallel."""
-        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+        # Forking after the simulator and TensorFlow have started threads can deadlock the workers
+        with ProcessPoolExecutor(max_workers=self.max_workers,
+                                 mp_context=multiprocessing.get_context('spawn')) as executor:
             results = list(executor.map(
-                lambda circuit: self._execute_single_circuit(circuit, backend),
+                partial(self._execute_single_circuit, backend=backend),
                 circuits
             ))
         return results
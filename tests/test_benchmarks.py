@@ -0,0 +1,61 @@
+# tests/test_benchmarks.py
+
+import argparse
+import os
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+import bench_quantum
+from harness import BenchmarkSuite, finish
+
+class TestQuantumBenchmarks(unittest.TestCase):
+
+    def test_tiny_cases_run(self):
+        suite = BenchmarkSuite('quantum', repeat=1, warmup=0)
+        rng = np.random.default_rng(0)
+        bench_quantum.bench_simulate(suite, [2], [1], 16, rng)
+        bench_quantum.bench_grover(suite, [2])
+        self.assertEqual([(r.name, r.status, r.error) for r in suite.results],
+                         [('circuit_simulate', 'ok', None), ('grover_run', 'ok', None)])
+        self.assertGreater(suite.results[0].metrics['gates_per_second'], 0)
+
+class TestHarness(unittest.TestCase):
+
+    def run_suite(self, fail):
+        suite = BenchmarkSuite('harness', repeat=1, warmup=0)
+
+        def case(timer):
+            if fail:
+                raise RuntimeError("broken")
+            return {'items': 1}
+
+        suite.run_case('case', {'size': 1}, case)
+        return suite
+
+    def finish(self, suite, baseline=None):
+        args = argparse.Namespace(output=None, baseline=baseline, tolerance=0.2)
+        return finish(suite, args)
+
+    def test_failing_case_fails_the_run(self):
+        self.assertEqual(self.finish(self.run_suite(fail=False)), 0)
+        self.assertEqual(self.finish(self.run_suite(fail=True)), 1)
+
+    def test_failing_case_is_a_regression(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            baseline = os.path.join(tmp, 'baseline.json')
+            self.run_suite(fail=False).write_json(baseline)
+            regressions = self.run_suite(fail=True).compare(baseline)
+            self.assertEqual([(r.key, r.error) for r in regressions], [('case[size=1]', 'RuntimeError: broken')])
+            self.assertEqual(self.finish(self.run_suite(fail=True), baseline), 1)
+
+    def test_memory_fields(self):
+        result = self.run_suite(fail=False).results[0]
+        self.assertGreater(result.process_peak_rss_mb, 0)
+        self.assertGreaterEqual(result.peak_rss_growth_mb, 0)
+
+if __name__ == '__main__':
+    unittest.main()
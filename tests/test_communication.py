@@ -1,12 +1,39 @@
 # tests/test_communication.py
 
+import asyncio
+import base64
+import io
+import os
+import struct
+import tempfile
+import threading
+import time
 import unittest
+from concurrent.futures import Future
+from communication.key_pool import QKDKeyPool, RotatingKeyManager
+from communication.key_provider import ParsedKeyCache, RSAKeyProvider
+from Crypto.Cipher import AES
+from Crypto.PublicKey import RSA
+from Crypto.Util.Padding import pad
 from communication.secure_transmission import SecureTransmission
+from communication.secure_channel import ChannelError, RemoteError, SecureChannelClient, SecureChannelServer
+from communication import wire_format
+from communication.stream_cipher import MAX_CHUNK_SIZE, stream_key_id
+
+# One pool of small RSA keys for every test that needs a key pair
+key_provider = None
+
+def setUpModule():
+    global key_provider
+    key_provider = RSAKeyProvider(key_size=1024, prefill=False)
+
+def tearDownModule():
+    key_provider.close()
 
 class TestSecureTransmission(unittest.TestCase):
 
     def setUp(self):
-        self.secure_transmission = SecureTransmission()
+        self.secure_transmission = SecureTransmission(rsa_key_provider=key_provider)
 
     def test_aes_encryption_decryption(self):
         message = "This is a secret message."
@@ -28,5 +55,353 @@ class TestSecureTransmission(unittest.TestCase):
         is_valid = self.secure_transmission.verify_signature(message, signature, public_key)
         self.assertTrue(is_valid)
 
+class TestWireFormat(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.secure_transmission = SecureTransmission()
+
+    def test_frames_share_one_buffer(self):
+        messages = [b"first", b"", b"third message" * 100]
+        buffer = bytearray(sum(self.secure_transmission.frame_size(len(m)) for m in messages))
+        offset = 0
+        for message in messages:
+            offset += self.secure_transmission.encrypt_into(buffer, message, offset=offset)
+
+        view, position, decrypted, sequences = memoryview(buffer)[:offset], 0, [], []
+        while position < len(view):
+            sequences.append(wire_format.decode_from(view, position).sequence)
+            plaintext, size = self.secure_transmission.decrypt_from(view, position)
+            decrypted.append(plaintext)
+            position += size
+        self.assertEqual(decrypted, messages)
+        self.assertEqual(sequences, sorted(sequences))
+
+    def test_frame_layout(self):
+        frame = self.secure_transmission.encrypt_frame(b"payload", sequence=42)
+        self.assertEqual(len(frame), wire_format.HEADER.size + 12 + 7 + 16)
+        decoded = wire_format.decode_from(frame)
+        self.assertEqual((decoded.algorithm, decoded.sequence, decoded.key_id), (wire_format.ALG_AES_GCM, 42, None))
+        self.assertEqual(len(decoded.payload), 7)
+
+    def test_header_is_authenticated(self):
+        frame = self.secure_transmission.encrypt_frame(b"payload", sequence=1)
+        frame[wire_format.HEADER.size - 5] ^= 1  # sequence number
+        with self.assertRaises(ValueError):
+            self.secure_transmission.decrypt_from(frame)
+        with self.assertRaises(ValueError):
+            wire_format.decode_from(frame[:10])
+
+    def test_truncated_tag_is_rejected(self):
+        nonce = os.urandom(12)
+        header_size = wire_format.header_size()
+        frame = bytearray(wire_format.frame_size(5, len(nonce), 4))
+        wire_format.encode_header_into(frame, 0, wire_format.ALG_AES_GCM, 7, 5, len(nonce), 4)
+        cipher = AES.new(self.secure_transmission.aes_key, AES.MODE_GCM, nonce=nonce, mac_len=4)
+        cipher.update(bytes(frame[:header_size]))
+        ciphertext, tag = cipher.encrypt_and_digest(b"hello")
+        wire_format.encode_into(frame, wire_format.ALG_AES_GCM, nonce, ciphertext, tag, sequence=7)
+        with self.assertRaises(ValueError):
+            self.secure_transmission.decrypt_from(frame)
+
+    def test_legacy_text_format(self):
+        cipher = AES.new(self.secure_transmission.aes_key, AES.MODE_CBC)
+        ct = cipher.encrypt(pad(b"legacy", AES.block_size))
+        legacy = base64.b64encode(cipher.iv).decode() + ":" + base64.b64encode(ct).decode()
+        self.assertEqual(self.secure_transmission.decrypt_aes(legacy), "legacy")
+
+class TestStreamEncryption(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.secure_transmission = SecureTransmission()
+        cls.payload = bytes(range(256)) * 1000
+
+    def decrypt(self, encrypted):
+        return b"".join(self.secure_transmission.decrypt_stream(encrypted))
+
+    def test_sources_round_trip(self):
+        sources = [
+            self.payload,
+            memoryview(self.payload),
+            io.BytesIO(self.payload),
+            (self.payload[i:i + 777] for i in range(0, len(self.payload), 777)),
+        ]
+        for source in sources:
+            encrypted = b"".join(self.secure_transmission.encrypt_stream(source, chunk_size=4096))
+            self.assertEqual(self.decrypt(encrypted), self.payload)
+            self.assertEqual(self.decrypt(io.BytesIO(encrypted)), self.payload)
+
+    def test_empty_payload(self):
+        encrypted = b"".join(self.secure_transmission.encrypt_stream(b""))
+        self.assertEqual(self.decrypt(encrypted), b"")
+
+    def test_forged_chunk_size_is_rejected_before_reading(self):
+        header = bytearray(next(self.secure_transmission.encrypt_stream(self.payload)))
+        struct.pack_into('>I', header, 10, (1 << 31) - 1)  # chunk size field
+        forged = io.BytesIO(bytes(header) + struct.pack('>I', (1 << 31) - 16))
+        requested = []
+        read = forged.read
+        forged.read = lambda size=-1: requested.append(size) or read(size)
+        with self.assertRaises(ValueError):
+            self.decrypt(forged)
+        self.assertLessEqual(max(requested), MAX_CHUNK_SIZE)
+
+    def test_tampering_and_truncation_are_detected(self):
+        pieces = list(self.secure_transmission.encrypt_stream(self.payload, chunk_size=4096))
+        encrypted = bytearray(b"".join(pieces))
+        encrypted[len(pieces[0]) + 10] ^= 1
+        with self.assertRaises(ValueError):
+            self.decrypt(encrypted)
+        with self.assertRaises(ValueError):
+            self.decrypt(b"".join(pieces[:-1]))
+        with self.assertRaises(ValueError):
+            self.decrypt(b"".join(pieces) + b"x")
+
+class TestQKDKeyPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = QKDKeyPool(capacity_bytes=4096, block_bits=1 << 14, seed=3)
+        self.addCleanup(self.pool.close)
+
+    def test_take_consumes_material(self):
+        first = self.pool.take(32, timeout=10)
+        second = self.pool.take(32, timeout=10)
+        self.assertEqual(len(first), 32)
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.pool.bytes_consumed, 64)
+
+    def test_take_after_close(self):
+        self.pool.take(32, timeout=10)
+        self.pool.close()
+        with self.assertRaises(RuntimeError):
+            self.pool.take(1 << 20, timeout=10)
+        self.assertFalse(self.pool._thread.is_alive())
+        with self.assertRaises(RuntimeError):
+            self.pool.start()
+
+    def test_first_key_is_shared_by_concurrent_callers(self):
+        manager = RotatingKeyManager(self.pool)
+        keys = []
+        threads = [threading.Thread(target=lambda: keys.append(manager.encryption_key(10))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+        self.assertEqual(len(keys), 4)
+        self.assertEqual({key_id for key_id, _ in keys}, {0})
+
+    def test_keys_rotate_by_message_count(self):
+        manager = RotatingKeyManager(self.pool, max_messages=2)
+        keys = [manager.encryption_key(100) for _ in range(6)]
+        self.assertEqual([key_id for key_id, _ in keys], [0, 0, 1, 1, 2, 2])
+        self.assertEqual(len({key for _, key in keys}), 3)
+        self.assertEqual(manager.decryption_key(1), keys[2][1])
+
+    def test_keys_rotate_by_byte_volume(self):
+        manager = RotatingKeyManager(self.pool, max_bytes=1000)
+        key_ids = [manager.encryption_key(600)[0] for _ in range(3)]
+        self.assertEqual(key_ids, [0, 1, 2])
+
+    def test_secure_transmission_uses_pool_keys(self):
+        secure_transmission = SecureTransmission(key_pool=self.pool, max_messages=1)
+        messages = [f"message {i}" for i in range(4)]
+        encrypted = [secure_transmission.encrypt_aes(message) for message in messages]
+        key_ids = {wire_format.decode_from(base64.b64decode(ciphertext)).key_id for ciphertext in encrypted}
+        self.assertEqual(len(key_ids), 4)
+        self.assertEqual([secure_transmission.decrypt_aes(ciphertext) for ciphertext in encrypted], messages)
+        stream = b"".join(secure_transmission.encrypt_stream(b"payload" * 1000, chunk_size=512))
+        self.assertEqual(b"".join(secure_transmission.decrypt_stream(stream)), b"payload" * 1000)
+
+    def test_streams_count_towards_byte_volume(self):
+        secure_transmission = SecureTransmission(key_pool=self.pool, max_bytes=1000)
+        pieces = list(secure_transmission.encrypt_stream(io.BytesIO(b"x" * 2000), chunk_size=512))
+        self.assertEqual(stream_key_id(pieces[0]), 0)
+        frame = secure_transmission.encrypt_frame(b"after the stream")
+        self.assertEqual(wire_format.decode_from(frame).key_id, 1)
+        header = next(secure_transmission.encrypt_stream(b"y" * 2000))
+        self.assertEqual(stream_key_id(header), 2)
+        self.assertEqual(b"".join(secure_transmission.decrypt_stream(b"".join(pieces))), b"x" * 2000)
+
+class TestEnvelopeEncryption(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.parties = [SecureTransmission(rsa_key_provider=key_provider) for _ in range(3)]
+        cls.public_keys = [party.rsa_key.publickey().export_key() for party in cls.parties]
+
+    def test_multi_recipient_envelope(self):
+        message = b"model weights " * 5000
+        envelope = self.parties[0].encrypt_envelope(message, self.public_keys[1:])
+        for party in self.parties[1:]:
+            self.assertEqual(party.decrypt_envelope(envelope), message)
+        with self.assertRaises(ValueError):
+            self.parties[0].decrypt_envelope(envelope)
+
+        tampered = bytearray(envelope)
+        tampered[-1] ^= 1
+        with self.assertRaises(ValueError):
+            self.parties[1].decrypt_envelope(bytes(tampered))
+
+    def test_envelope_stream(self):
+        payload = bytes(range(256)) * 300
+        encrypted = b"".join(self.parties[0].encrypt_envelope_stream(
+            io.BytesIO(payload), self.public_keys, chunk_size=1000
+        ))
+        for party in self.parties:
+            self.assertEqual(b"".join(party.decrypt_envelope_stream(io.BytesIO(encrypted))), payload)
+
+    def test_envelope_stream_header_is_authenticated(self):
+        encrypted = b"".join(self.parties[0].encrypt_envelope_stream(
+            io.BytesIO(b"stream payload"), self.public_keys
+        ))
+        # Flip the last byte of the first recipient's wrapped key; the other recipients
+        # can still unwrap their own key but must reject the modified header.
+        first_entry = struct.calcsize('>4sBBH')
+        _, wrapped_length = struct.unpack_from('>32sH', encrypted, first_entry)
+        tampered = bytearray(encrypted)
+        tampered[first_entry + struct.calcsize('>32sH') + wrapped_length - 1] ^= 1
+        with self.assertRaises(ValueError):
+            b"".join(self.parties[1].decrypt_envelope_stream(io.BytesIO(bytes(tampered))))
+
+class TestBatchSignatures(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.signer = SecureTransmission(rsa_key_provider=key_provider)
+        cls.public_key = cls.signer.rsa_key.publickey().export_key()
+        cls.messages = [f"transaction {i}" for i in range(40)]
+
+    def test_sign_and_verify_many(self):
+        signatures = self.signer.sign_many(self.messages, max_workers=2, chunk_size=8)
+        self.assertEqual(signatures[5], self.signer.sign_message(self.messages[5]))
+        items = [(message, signature, self.public_key) for message, signature in zip(self.messages, signatures)]
+        items[3] = (items[3][0] + "!", items[3][1], self.public_key)
+        expected = [i != 3 for i in range(len(items))]
+        self.assertEqual(self.signer.verify_many(items, max_workers=2, chunk_size=8), expected)
+        self.assertEqual(self.signer.verify_many(items, max_workers=2, use_processes=True, chunk_size=16),
+                         expected)
+
+    def test_key_cache(self):
+        cache = ParsedKeyCache(maxsize=1)
+        first = cache.import_key(self.public_key)
+        self.assertIs(cache.import_key(self.public_key), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        cache.import_key(self.signer.rsa_key.export_key())
+        self.assertIsNot(cache.import_key(self.public_key), first)
+
+class _InlineExecutor:
+    """Executor whose futures are already done when submit returns."""
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+class TestRSAKeyProvider(unittest.TestCase):
+
+    def test_refill_with_finished_futures(self):
+        provider = RSAKeyProvider(key_size=1024, pool_size=1, prefill=False)
+        self.addCleanup(provider.close)
+        provider._executor = _InlineExecutor()
+        # The done callback runs inline; registering it under the lock used to deadlock
+        worker = threading.Thread(target=provider.get_key, daemon=True)
+        worker.start()
+        worker.join(30)
+        self.assertFalse(worker.is_alive())
+        self.assertEqual((provider.misses, provider.available), (1, 1))
+
+    def test_pool_hands_out_distinct_keys(self):
+        with RSAKeyProvider(key_size=1024, pool_size=2) as provider:
+            deadline = time.monotonic() + 30
+            while provider.available < 2 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            keys = [provider.get_key() for _ in range(3)]
+        self.assertEqual(len({key.n for key in keys}), 3)
+        self.assertTrue(all(key.has_private() for key in keys))
+
+    def test_keys_are_persisted(self):
+        with tempfile.TemporaryDirectory() as key_dir:
+            with RSAKeyProvider(key_size=1024, pool_size=1, key_dir=key_dir, prefill=False) as provider:
+                identity = provider.load_key('node')
+                spare = RSA.generate(1024)
+                provider._pool.append(spare)
+            self.assertEqual(os.stat(os.path.join(key_dir, 'node.pem')).st_mode & 0o777, 0o600)
+            with RSAKeyProvider(key_size=1024, pool_size=1, key_dir=key_dir, prefill=False) as provider:
+                self.assertEqual(provider.load_key('node').n, identity.n)
+                self.assertIn(spare.n, {key.n for key in provider._pool})
+
+    def test_rsa_key_is_lazy(self):
+        provider = RSAKeyProvider(key_size=1024, pool_size=1, prefill=False)
+        self.addCleanup(provider.close)
+        secure_transmission = SecureTransmission(rsa_key_provider=provider)
+        self.assertIsNone(secure_transmission._rsa_key)
+        self.assertEqual(secure_transmission.rsa_key.size_in_bits(), 1024)
+        self.assertIs(secure_transmission.rsa_key, secure_transmission._rsa_key)
+
+class TestSecureChannel(unittest.IsolatedAsyncioTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server_identity = SecureTransmission(rsa_key_provider=key_provider)
+        cls.client_identity = SecureTransmission(rsa_key_provider=key_provider)
+        cls.other_identity = SecureTransmission(rsa_key_provider=key_provider)
+
+    @staticmethod
+    async def handler(payload):
+        if payload == b"fail":
+            raise KeyError("missing")
+        # Answer later requests first to exercise out-of-order responses
+        await asyncio.sleep(0.01 if payload.endswith(b"0") else 0)
+        return payload.upper()
+
+    async def asyncSetUp(self):
+        self.server = await SecureChannelServer(self.handler, self.server_identity, max_concurrency=8).start()
+        self.host, self.port = self.server.address[:2]
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def test_pipelined_requests(self):
+        async with await SecureChannelClient(
+            self.client_identity, server_public_key=self.server.public_key, max_in_flight=16
+        ).connect(self.host, self.port) as client:
+            payloads = [f"request {i}".encode() for i in range(50)]
+            responses = await asyncio.gather(*(client.request(payload) for payload in payloads))
+            self.assertEqual(responses, [payload.upper() for payload in payloads])
+            with self.assertRaises(RemoteError):
+                await client.request(b"fail")
+            self.assertEqual(await client.request(b"still usable"), b"STILL USABLE")
+        self.assertEqual(self.server.connections, 1)
+
+    async def test_unix_socket(self):
+        with tempfile.TemporaryDirectory() as socket_dir:
+            path = os.path.join(socket_dir, 'channel.sock')
+            server = await SecureChannelServer(self.handler, self.server_identity).start(path=path)
+            try:
+                async with await SecureChannelClient(self.client_identity).connect(path=path) as client:
+                    self.assertEqual(await client.request(b"unix"), b"UNIX")
+            finally:
+                await server.close()
+
+    async def test_key_checks(self):
+        with self.assertRaises(ChannelError):
+            await SecureChannelClient(self.client_identity, server_public_key=self.other_identity.generate_rsa_keys()[0]
+                                      ).connect(self.host, self.port)
+        server = await SecureChannelServer(
+            self.handler, self.server_identity, authorized_keys=[self.client_identity.generate_rsa_keys()[0]]
+        ).start()
+        try:
+            host, port = server.address[:2]
+            with self.assertRaises(ChannelError):
+                await SecureChannelClient(self.other_identity).connect(host, port)
+            async with await SecureChannelClient(self.client_identity).connect(host, port) as client:
+                self.assertEqual(await client.request(b"ok"), b"OK")
+        finally:
+            await server.close()
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,272 @@
+# tests/test_inference.py
+
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+import numpy as np
+import tensorflow as tf
+from ai.inference import ModelInference, list_images
+from ai.prediction_cache import PredictionCache, file_digest
+from ai.model_registry import ModelRegistry, model_memory
+from ai.batching_server import BatchingInferenceServer
+from ai.neural_networks import ConvolutionalNN, FeedforwardNN
+from ai.quantization import TFLiteInference, export_tflite, quantization_report
+
+def save_small_model(path, input_shape=(8, 8, 3), num_classes=3, seed=0):
+    tf.keras.utils.set_random_seed(seed)
+    model = tf.keras.Sequential([
+        tf.keras.layers.Input(shape=input_shape),
+        tf.keras.layers.Conv2D(4, (3, 3), activation='relu'),
+        tf.keras.layers.Flatten(),
+        tf.keras.layers.Dense(num_classes, activation='softmax'),
+    ])
+    model.save(path)
+    return model
+
+def write_images(image_dir, count, size=(12, 10), seed=0):
+    rng = np.random.default_rng(seed)
+    for i in range(count):
+        pixels = rng.integers(0, 256, size=size + (3,), dtype=np.uint8)
+        extension = 'png' if i % 2 else 'jpg'
+        tf.keras.utils.save_img(os.path.join(image_dir, f'img_{i:03d}.{extension}'), pixels)
+
+class TestBatchPredict(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.image_dir = os.path.join(self.tmp.name, 'images')
+        os.mkdir(self.image_dir)
+        write_images(self.image_dir, 11)
+        with open(os.path.join(self.image_dir, 'notes.txt'), 'w') as f:
+            f.write('not an image')
+        self.model_path = os.path.join(self.tmp.name, 'model.keras')
+        save_small_model(self.model_path)
+        self.inference = ModelInference(self.model_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_matches_per_image_prediction(self):
+        from tensorflow.keras.preprocessing.image import load_img, img_to_array
+
+        predictions = self.inference.batch_predict(self.image_dir, img_size=(8, 8), batch_size=4)
+        self.assertEqual(sorted(predictions), list_images(self.image_dir))
+        for filename, pred in predictions.items():
+            img = load_img(os.path.join(self.image_dir, filename), target_size=(8, 8))
+            expected = self.inference.predict(np.expand_dims(img_to_array(img) / 255.0, axis=0))[0]
+            self.assertEqual(pred, expected)
+
+    def test_iter_batch_predict_streams_in_order(self):
+        results = list(self.inference.iter_batch_predict(self.image_dir, img_size=(8, 8), batch_size=3))
+        self.assertEqual([name for name, _ in results], list_images(self.image_dir))
+
+    def test_empty_directory(self):
+        empty_dir = os.path.join(self.tmp.name, 'empty')
+        os.mkdir(empty_dir)
+        self.assertEqual(self.inference.batch_predict(empty_dir), {})
+
+class TestPredictionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.image_dir = os.path.join(self.tmp.name, 'images')
+        os.mkdir(self.image_dir)
+        write_images(self.image_dir, 6)
+        self.model_path = os.path.join(self.tmp.name, 'model.keras')
+        save_small_model(self.model_path)
+        self.inference = ModelInference(self.model_path)
+        self.db_path = os.path.join(self.tmp.name, 'cache.sqlite')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def predict(self, inference=None):
+        with PredictionCache(self.db_path) as cache:
+            predictions = (inference or self.inference).batch_predict(self.image_dir, img_size=(8, 8), cache=cache)
+            return predictions, cache
+
+    def test_only_changed_files_are_scored(self):
+        first, cache = self.predict()
+        self.assertEqual(cache.misses, 6)
+        self.assertEqual(first, self.inference.batch_predict(self.image_dir, img_size=(8, 8)))
+
+        second, cache = self.predict()
+        self.assertEqual((cache.hits, cache.misses, cache.hashed), (6, 0, 0))
+        self.assertEqual(second, first)
+
+        write_images(self.image_dir, 1, seed=1)
+        os.utime(os.path.join(self.image_dir, 'img_001.png'))
+        third, cache = self.predict()
+        self.assertEqual((cache.hits, cache.misses, cache.hashed), (5, 1, 2))
+        self.assertEqual(sorted(third), sorted(first))
+
+    def test_cached_and_new_predictions_stream_in_order(self):
+        first, _ = self.predict()
+        pixels = np.random.default_rng(1).integers(0, 256, size=(12, 10, 3), dtype=np.uint8)
+        tf.keras.utils.save_img(os.path.join(self.image_dir, 'img_003.png'), pixels)
+        with PredictionCache(self.db_path) as cache:
+            results = list(self.inference.iter_batch_predict(self.image_dir, img_size=(8, 8), cache=cache))
+            self.assertEqual((cache.hits, cache.misses), (5, 1))
+        self.assertEqual([name for name, _ in results], list_images(self.image_dir))
+        self.assertTrue(all(type(pred) is int for _, pred in results))
+        self.assertTrue(all(type(pred) is int for pred in first.values()))
+
+    def test_model_version_and_size_are_part_of_the_key(self):
+        self.predict()
+        other = ModelInference(self.model_path, model_version='retrained')
+        _, cache = self.predict(other)
+        self.assertEqual(cache.misses, 6)
+        self.assertNotEqual(self.inference.cache_version((8, 8)), self.inference.cache_version((16, 16)))
+
+    def test_model_file_is_hashed_on_first_cache_use(self):
+        inference = ModelInference(self.model_path)
+        self.assertIsNone(inference._model_version)
+        self.assertEqual(inference.model_version, file_digest(self.model_path).hex())
+
+class TestModelRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = []
+        for i in range(3):
+            path = os.path.join(self.tmp.name, f'model_{i}.keras')
+            save_small_model(path, seed=i)
+            self.paths.append(path)
+        self.loaded = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def factory(self, model_path, model_version):
+        self.loaded.append(model_path)
+        return ModelInference(model_path, model_version)
+
+    def test_concurrent_requests_load_once(self):
+        registry = ModelRegistry(factory=self.factory)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.get(self.paths[0])))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.loaded, [self.paths[0]])
+        self.assertEqual(len({id(inference) for inference in results}), 1)
+        self.assertEqual((registry.loads, registry.hits), (1, 7))
+        # Warm-up traced the prediction step already
+        self.assertIsNotNone(results[0]._compiled_predict)
+
+    def test_lru_eviction_under_memory_budget(self):
+        size = model_memory(ModelInference(self.paths[0]).model)
+        registry = ModelRegistry(memory_budget=2 * size, factory=self.factory)
+        registry.get(self.paths[0])
+        registry.get(self.paths[1])
+        registry.get(self.paths[0])
+        registry.get(self.paths[2])
+        self.assertIn(self.paths[0], registry)
+        self.assertNotIn(self.paths[1], registry)
+        self.assertEqual((registry.evictions, registry.memory_used), (1, 2 * size))
+        registry.get(self.paths[1])
+        self.assertEqual(self.loaded, [self.paths[0], self.paths[1], self.paths[2], self.paths[1]])
+
+class TestBatchingInferenceServer(unittest.IsolatedAsyncioTestCase):
+
+    async def test_requests_are_batched_and_resolved_individually(self):
+        batches = []
+
+        def predict_batch(batch):
+            batches.append(len(batch))
+            return batch.sum(axis=1)
+
+        async with BatchingInferenceServer(predict_batch, max_batch_size=8, max_wait=0.05) as server:
+            samples = [np.array([i, 1]) for i in range(20)]
+            results = await asyncio.gather(*(server.predict(sample) for sample in samples))
+            stats = server.stats()
+        self.assertEqual(list(results), [i + 1 for i in range(20)])
+        self.assertEqual(batches, [8, 8, 4])
+        self.assertEqual(stats['batch_size']['<=8'], 2)
+        self.assertEqual(stats['batch_size']['<=4'], 1)
+        self.assertEqual(stats['batches'], 3)
+
+    async def test_max_wait_flushes_partial_batch(self):
+        async with BatchingInferenceServer(lambda batch: batch, max_batch_size=64, max_wait=0.01) as server:
+            result = await asyncio.wait_for(server.predict(np.array(3)), timeout=5)
+        self.assertEqual(result, 3)
+
+    async def test_bad_shape_fails_alone(self):
+        async with BatchingInferenceServer(lambda batch: batch.sum(axis=1), max_batch_size=4,
+                                           max_wait=0.05) as server:
+            good, bad = await asyncio.wait_for(
+                asyncio.gather(server.predict(np.array([1, 2])), server.predict(np.array([1, 2, 3])),
+                               return_exceptions=True),
+                timeout=5
+            )
+        self.assertEqual(good, 3)
+        self.assertIsInstance(bad, ValueError)
+
+    async def test_errors_propagate_to_every_caller(self):
+        def predict_batch(batch):
+            raise ValueError("bad batch")
+
+        async with BatchingInferenceServer(predict_batch, max_batch_size=4, max_wait=0.01) as server:
+            results = await asyncio.gather(*(server.predict(np.zeros(2)) for _ in range(3)),
+                                           return_exceptions=True)
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+
+    async def test_model_inference_backend(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            model_path = os.path.join(tmp, 'model.keras')
+            save_small_model(model_path)
+            inference = ModelInference(model_path)
+        images = np.random.default_rng(0).random((10, 8, 8, 3), dtype=np.float32)
+        async with BatchingInferenceServer(inference.predict_batch, max_batch_size=4) as server:
+            results = await asyncio.gather(*(server.predict(image) for image in images))
+        np.testing.assert_array_equal(results, inference.predict(images))
+
+class TestQuantization(unittest.TestCase):
+
+    def setUp(self):
+        tf.keras.utils.set_random_seed(0)
+        rng = np.random.default_rng(0)
+        self.images = rng.random((40, 12, 12, 3), dtype=np.float32)
+        self.labels = rng.integers(0, 4, size=40)
+
+    def test_float_export_matches_keras(self):
+        network = FeedforwardNN(input_shape=(16,), num_classes=4)
+        data = np.random.default_rng(1).random((10, 16), dtype=np.float32)
+        inference = TFLiteInference(model_content=export_tflite(network, mode='float'), batch_size=4)
+        np.testing.assert_allclose(inference.predict_proba(data), network.model.predict(data, verbose=0),
+                                   rtol=1e-4, atol=1e-5)
+
+    def test_int8_export_and_interpreter(self):
+        network = ConvolutionalNN(input_shape=(12, 12, 3), num_classes=4)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'model_int8.tflite')
+            export_tflite(network, path, mode='int8', calibration_data=self.images)
+            inference = TFLiteInference(model_path=path, num_threads=2)
+        probabilities = inference.predict_proba(self.images)
+        self.assertEqual(probabilities.shape, (40, 4))
+        self.assertEqual(probabilities.dtype, np.float32)
+        np.testing.assert_allclose(probabilities.sum(axis=1), 1.0, atol=0.05)
+        with self.assertRaises(ValueError):
+            export_tflite(network, mode='int8')
+
+    def test_report(self):
+        network = ConvolutionalNN(input_shape=(12, 12, 3), num_classes=4)
+        calibration = np.random.default_rng(1).random((20, 12, 12, 3), dtype=np.float32)
+        report = quantization_report(network, self.images, self.labels, calibration_data=calibration,
+                                     modes=('float', 'dynamic', 'int8'))
+        self.assertEqual(report['float']['agreement'], 1.0)
+        self.assertEqual(report['float']['accuracy_delta'], 0.0)
+        self.assertLess(report['dynamic']['size_bytes'], report['float']['size_bytes'])
+        for mode in ('dynamic', 'int8'):
+            self.assertAlmostEqual(report[mode]['accuracy'] - report['keras']['accuracy'],
+                                   report[mode]['accuracy_delta'])
+        with self.assertRaises(ValueError):
+            quantization_report(network, self.images, self.labels, modes=('int8',))
+        self.assertEqual(set(quantization_report(network, self.images, self.labels)), {'keras', 'dynamic'})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,11 @@
 # tests/test_quantum.py
 
 import unittest
-from communication.quantum_communication import QuantumKeyDistribution
+import numpy as np
+from communication.quantum_communication import ChannelModel, QuantumKeyDistribution
+from communication.qkd_pipeline import QKDPipeline
+from communication.qkd_sessions import MultiSessionQKD, SessionConfig, summarize_sessions
+from communication.privacy_amplification import secure_key_length, toeplitz_hash, toeplitz_hash_packed
 
 class TestQuantumKeyDistribution(unittest.TestCase):
 
@@ -25,13 +29,61 @@ class TestQuantumKeyDistribution(unittest.TestCase):
         self.qkd.sift_key()
         self.assertIsNotNone(self.qkd.get_key())
 
-    def test_error_correction(self):
+    def test_sift_key_matches_bases(self):
         self.qkd.generate_sender_bits()
         self.qkd.simulate_receiver()
         self.qkd.sift_key()
-        original_key = self.qkd.get_key()
-        self.qkd.error_correction()
-        self.assertNotEqual(original_key, self.qkd.get_key())
+        match = self.qkd.basis_sender == self.qkd.basis_receiver
+        self.assertEqual(self.qkd.get_key(), self.qkd.sender_bits[match].tolist())
+        self.assertEqual(self.qkd.key_length, int(match.sum()))
+
+    def test_packed_storage(self):
+        qkd = QuantumKeyDistribution(num_bits=100_003)
+        qkd.generate_sender_bits()
+        qkd.simulate_receiver()
+        qkd.sift_key()
+        self.assertEqual(qkd._sender_bits.nbytes, (100_003 + 7) // 8)
+        packed_key = qkd.get_key(packed=True)
+        self.assertIsInstance(packed_key, bytes)
+        self.assertEqual(len(packed_key), (qkd.key_length + 7) // 8)
+        self.assertEqual(packed_key, qkd.receiver_key.tobytes())
+
+    def test_error_correction(self):
+        qkd = QuantumKeyDistribution(num_bits=20_000, seed=7)
+        qkd.generate_sender_bits()
+        qkd.simulate_receiver()
+        qkd.sift_key()
+        errors = (np.random.default_rng(7).random(qkd.key_length) < 0.03).astype(np.uint8)
+        noisy = np.unpackbits(qkd.receiver_key, count=qkd.key_length) ^ errors
+        qkd.receiver_key = np.packbits(noisy)
+        qkd.qber = 0.03
+
+        result = qkd.error_correction()
+        self.assertEqual(qkd.receiver_key.tobytes(), qkd.key.tobytes())
+        self.assertEqual(result.corrected_bits, int(errors.sum()))
+        self.assertGreater(result.leaked_bits, 0)
+        self.assertEqual(qkd.leaked_bits, result.leaked_bits)
+        self.assertGreater(result.rounds, 0)
+
+    def test_ldpc_error_correction(self):
+        qkd = QuantumKeyDistribution(num_bits=40_000, seed=11)
+        qkd.generate_sender_bits()
+        qkd.simulate_receiver()
+        qkd.sift_key()
+        errors = (np.random.default_rng(11).random(qkd.key_length) < 0.02).astype(np.uint8)
+        noisy = np.unpackbits(qkd.receiver_key, count=qkd.key_length) ^ errors
+        qkd.receiver_key = np.packbits(noisy)
+        qkd.qber = 0.02
+
+        result = qkd.error_correction(method='ldpc')
+        self.assertEqual(result.rounds, 1)
+        self.assertGreater(qkd.key_length, 0)
+        self.assertEqual(qkd.receiver_key.tobytes(), qkd.key.tobytes())
+        self.assertEqual(qkd.leaked_bits, result.leaked_bits)
+
+    def test_unknown_error_correction_method(self):
+        with self.assertRaises(ValueError):
+            self.qkd.error_correction(method='turbo')
 
     def test_privacy_amplification(self):
         self.qkd.generate_sender_bits()
@@ -41,5 +93,142 @@ class TestQuantumKeyDistribution(unittest.TestCase):
         self.qkd.privacy_amplification()
         self.assertNotEqual(original_key, self.qkd.get_key())
 
+class TestChannelModel(unittest.TestCase):
+
+    def run_session(self, channel, num_bits=200_000, **kwargs):
+        qkd = QuantumKeyDistribution(num_bits, seed=11, channel=channel)
+        qkd.generate_sender_bits()
+        qkd.simulate_receiver()
+        qkd.sift_key()
+        qkd.estimate_qber(**kwargs)
+        return qkd
+
+    def test_noiseless_channel_matches_default(self):
+        plain = self.run_session(None)
+        noiseless = self.run_session(ChannelModel())
+        self.assertEqual(noiseless.get_key(packed=True), plain.get_key(packed=True))
+        self.assertEqual(noiseless.qber, 0.0)
+
+    def test_loss_and_depolarization(self):
+        qkd = self.run_session(ChannelModel(loss=0.5, depolarization=0.1), sample_fraction=0.5)
+        self.assertAlmostEqual(qkd.qber, 0.05, delta=0.01)
+        sifted = qkd.key_length + qkd.qber_sample_size
+        self.assertAlmostEqual(sifted / 200_000, 0.25, delta=0.01)
+        self.assertFalse(qkd.aborted)
+
+    def test_intercept_resend_aborts_early(self):
+        qkd = self.run_session(ChannelModel(intercept_fraction=1.0))
+        self.assertTrue(qkd.aborted)
+        self.assertTrue(qkd.qber_estimate.lower > 0.11)
+        # The test stops long before the ~10000 bit sample is used up
+        self.assertLess(qkd.qber_sample_size, 2000)
+        self.assertIsNone(qkd.error_correction())
+        self.assertEqual(qkd.privacy_amplification(), 0)
+        self.assertEqual(qkd.get_key(), [])
+
+    def test_invalid_probability(self):
+        with self.assertRaises(ValueError):
+            ChannelModel(loss=1.5)
+
+class TestQKDPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.pipeline = QKDPipeline(block_bits=4096, queue_size=1)
+
+    def test_blocks(self):
+        blocks = list(self.pipeline.blocks(num_blocks=5))
+        self.assertEqual([block.index for block in blocks], list(range(5)))
+        for block in blocks:
+            self.assertEqual(len(block.key), (block.key_length + 7) // 8)
+            self.assertEqual(block.qber, 0.0)
+        self.assertEqual(self.pipeline.stats.raw_bits, 5 * 4096)
+        self.assertEqual(self.pipeline.stats.key_bits, sum(block.key_length for block in blocks))
+
+    def test_unbounded_stream_can_be_closed(self):
+        stream = self.pipeline.blocks()
+        first = [next(stream) for _ in range(3)]
+        stream.close()
+        self.assertEqual([block.index for block in first], [0, 1, 2])
+
+    def test_eavesdropped_blocks_are_aborted(self):
+        pipeline = QKDPipeline(block_bits=8192, channel=ChannelModel(intercept_fraction=1.0))
+        self.assertEqual(list(pipeline.blocks(num_blocks=3)), [])
+        self.assertEqual(pipeline.stats.aborted_blocks, 3)
+        self.assertEqual(pipeline.stats.raw_bits, 3 * 8192)
+
+class TestPrivacyAmplification(unittest.TestCase):
+
+    def test_fft_matches_dense_toeplitz(self):
+        rng = np.random.default_rng(3)
+        n, m = 200, 90
+        key = rng.integers(0, 2, n, dtype=np.uint8)
+        seed = rng.integers(0, 2, m + n - 1, dtype=np.uint8)
+        dense = np.array([[seed[i - j + n - 1] for j in range(n)] for i in range(m)])
+        np.testing.assert_array_equal(toeplitz_hash(key, seed, m), dense @ key % 2)
+        np.testing.assert_array_equal(
+            toeplitz_hash_packed(np.packbits(key), n, np.packbits(seed), m, block_bits=64),
+            np.packbits(dense @ key % 2)
+        )
+
+    def test_session_keys_agree_after_amplification(self):
+        qkd = QuantumKeyDistribution(num_bits=50_000)
+        qkd.generate_sender_bits()
+        qkd.simulate_receiver()
+        qkd.sift_key()
+        qkd.estimate_qber()
+        qkd.error_correction()
+        reconciled_length, leaked = qkd.key_length, qkd.leaked_bits
+
+        final_length = qkd.privacy_amplification()
+        self.assertEqual(final_length, secure_key_length(reconciled_length, qkd.qber, leaked))
+        self.assertEqual(qkd.key_length, final_length)
+        self.assertEqual(qkd.key.tobytes(), qkd.receiver_key.tobytes())
+
+class TestMultiSessionQKD(unittest.TestCase):
+
+    def setUp(self):
+        self.configs = [SessionConfig(num_bits=8_000) for _ in range(4)]
+
+    def test_sessions_are_reproducible_and_independent(self):
+        first = MultiSessionQKD(master_seed=5).run(self.configs, keep_keys=True)
+        second = MultiSessionQKD(master_seed=5).run(self.configs, keep_keys=True)
+        self.assertEqual(first, second)
+        self.assertEqual(len({result.key for result in first}), len(first))
+
+    def test_seeded_session_matches_standalone(self):
+        engine = MultiSessionQKD(master_seed=9, bit_generator='Philox')
+        result = engine.run(self.configs, keep_keys=True)[2]
+        seed = engine.session_seeds(len(self.configs))[2]
+        qkd = QuantumKeyDistribution(8_000, seed=np.random.Generator(np.random.Philox(seed)))
+        qkd.generate_sender_bits()
+        qkd.simulate_receiver()
+        qkd.sift_key()
+        qkd.estimate_qber()
+        qkd.error_correction()
+        qkd.privacy_amplification()
+        self.assertEqual(qkd.get_key(packed=True), result.key)
+
+    def test_mixed_channels_match_standalone_and_summarize(self):
+        channels = [None, ChannelModel(depolarization=0.04), ChannelModel(intercept_fraction=1.0),
+                    ChannelModel(loss=0.3)]
+        configs = [SessionConfig(num_bits=20_000, channel=channel) for channel in channels]
+        engine = MultiSessionQKD(master_seed=2)
+        results = engine.run(configs, keep_keys=True)
+        for result, channel, seed in zip(results, channels, engine.session_seeds(len(configs))):
+            qkd = QuantumKeyDistribution(20_000, seed=np.random.Generator(np.random.PCG64(seed)),
+                                         channel=channel)
+            qkd.generate_sender_bits()
+            qkd.simulate_receiver()
+            qkd.sift_key()
+            qkd.estimate_qber()
+            qkd.error_correction()
+            qkd.privacy_amplification()
+            self.assertEqual(qkd.get_key(packed=True), result.key)
+            self.assertEqual(qkd.aborted, result.aborted)
+
+        summary = summarize_sessions(results)
+        self.assertEqual((summary.accepted, summary.aborted), (3, 1))
+        self.assertEqual(summary.abort_rate, 0.25)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,297 @@
+# tests/test_training.py
+
+import json
+import os
+import pickle
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import tensorflow as tf
+from ai.feature_cache import FeatureCache
+from ai.profiling import TrainingProfiler
+from ai.neural_networks import (ConvolutionalNN, CustomDenseLayer, FeedforwardNN, TransferLearningModel,
+                                bfloat16_supported)
+from ai.training import DataLoader, ModelTrainer, TFDataLoader
+
+def write_class_images(root, counts, size=(20, 16), seed=0):
+    rng = np.random.default_rng(seed)
+    for class_name, count in counts.items():
+        class_dir = os.path.join(root, class_name)
+        os.makedirs(class_dir, exist_ok=True)
+        for i in range(count):
+            pixels = rng.integers(0, 256, size=size + (3,), dtype=np.uint8)
+            tf.keras.utils.save_img(os.path.join(class_dir, f'{class_name}_{i}.png'), pixels)
+
+class TestTFDataLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.train_dir = os.path.join(self.tmp.name, 'train')
+        self.val_dir = os.path.join(self.tmp.name, 'val')
+        write_class_images(self.train_dir, {'cats': 5, 'dogs': 4, 'owls': 3})
+        write_class_images(self.val_dir, {'cats': 2, 'dogs': 2, 'owls': 2}, seed=1)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_augmentation_layers_have_distinct_seeds(self):
+        seeded = TFDataLoader(self.train_dir, self.val_dir, seed=5)
+        self.assertEqual([layer.seed for layer in seeded.augmentation.layers], [5, 6, 7, 8])
+        unseeded = TFDataLoader(self.train_dir, self.val_dir)
+        self.assertEqual([layer.seed for layer in unseeded.augmentation.layers], [None] * 4)
+
+    def test_matches_image_data_generator(self):
+        # Images are saved at the target size: nearest-neighbour rounding differs between PIL and TF
+        loader = TFDataLoader(self.train_dir, self.val_dir, img_size=(20, 16), batch_size=4, seed=0)
+        train_dataset, val_dataset = loader.load_data()
+        train_generator, val_generator = DataLoader(self.train_dir, self.val_dir, img_size=(20, 16),
+                                                    batch_size=4).load_data()
+        self.assertEqual(loader.class_indices, train_generator.class_indices)
+
+        images = np.concatenate([images for images, _ in val_dataset])
+        labels = np.concatenate([labels for _, labels in val_dataset])
+        expected = np.concatenate([val_generator[i][0] for i in range(len(val_generator))])
+        np.testing.assert_allclose(images, expected, atol=1e-6)
+        np.testing.assert_array_equal(labels, val_generator.classes)
+
+        batches = list(train_dataset)
+        self.assertEqual([len(labels) for _, labels in batches], [4, 4, 4])
+        self.assertEqual(batches[0][0].shape[1:], (20, 16, 3))
+        self.assertEqual(sorted(np.concatenate([labels for _, labels in batches])), [0] * 5 + [1] * 4 + [2] * 3)
+
+    def test_cached_training_batches_mix_classes(self):
+        train_dir = os.path.join(self.tmp.name, 'many')
+        write_class_images(train_dir, {'cats': 32, 'dogs': 32})
+        loader = TFDataLoader(train_dir, self.val_dir, img_size=(8, 8), batch_size=16, cache=True,
+                              shuffle_buffer=2, augment=False, seed=0)
+        loader.class_indices = {'cats': 0, 'dogs': 1}
+        batches = [labels.numpy() for _, labels in loader.build_dataset(train_dir, training=True)]
+        self.assertTrue(all(len(set(labels)) == 2 for labels in batches))
+
+    def test_file_cache_is_keyed_by_contents(self):
+        cache_dir = os.path.join(self.tmp.name, 'cache')
+        loader = TFDataLoader(self.train_dir, self.val_dir, img_size=(12, 12), batch_size=4, cache=cache_dir)
+        train_dataset, val_dataset = loader.load_data()
+        first = np.concatenate([images for images, _ in val_dataset])
+        list(train_dataset)
+        cache_files = {name.split('.')[0] for name in os.listdir(cache_dir)}
+        self.assertEqual(len(cache_files), 2)
+
+        np.testing.assert_array_equal(np.concatenate([images for images, _ in val_dataset]), first)
+        write_class_images(self.val_dir, {'cats': 3}, seed=2)
+        _, val_dataset = loader.load_data()
+        self.assertEqual(sum(len(labels) for _, labels in val_dataset), 7)
+
+    def test_trains_model(self):
+        train_dataset, val_dataset = TFDataLoader(self.train_dir, self.val_dir, img_size=(12, 12),
+                                                  batch_size=4).load_data()
+        network = ConvolutionalNN(input_shape=(12, 12, 3), num_classes=3)
+        network.compile_model()
+        history = network.model.fit(train_dataset, validation_data=val_dataset, epochs=2, verbose=0)
+        self.assertEqual(len(history.history['loss']), 2)
+
+class TestCompileOptions(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.data = rng.random((64, 16), dtype=np.float32)
+        self.labels = rng.integers(0, 3, size=64)
+
+    def test_custom_dense_layer_round_trip(self):
+        network = FeedforwardNN(input_shape=(16,), num_classes=3)
+        layer = network.model.layers[0]
+        self.assertTrue(callable(layer.activation))
+        self.assertEqual(CustomDenseLayer.from_config(layer.get_config()).units, 128)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'feedforward.keras')
+            network.model.save(path)
+            restored = tf.keras.models.load_model(path)
+        np.testing.assert_allclose(restored.predict(self.data, verbose=0),
+                                   network.model.predict(self.data, verbose=0), rtol=1e-5)
+
+    def test_jit_compile_and_steps_per_execution(self):
+        network = FeedforwardNN(input_shape=(16,), num_classes=3)
+        network.compile_model(jit_compile=True, steps_per_execution=4)
+        history = network.model.fit(self.data, self.labels, batch_size=8, epochs=2, verbose=0)
+        self.assertTrue(np.isfinite(history.history['loss']).all())
+
+    def test_bfloat16_needs_an_ampere_gpu(self):
+        gpus = ['GPU:0']
+        with mock.patch('tensorflow.config.list_physical_devices', return_value=gpus):
+            for capability, expected in (((7, 5), False), ((8, 0), True), (None, False)):
+                details = {} if capability is None else {'compute_capability': capability}
+                with mock.patch('tensorflow.config.experimental.get_device_details', return_value=details):
+                    self.assertEqual(bfloat16_supported(), expected)
+
+    def test_mixed_precision(self):
+        network = FeedforwardNN(input_shape=(16,), num_classes=3, mixed_precision=True)
+        self.assertEqual(network.mixed_precision, bfloat16_supported())
+        self.assertEqual(tf.keras.mixed_precision.global_policy().name, 'float32')
+        network.compile_model()
+        network.model.fit(self.data, self.labels, batch_size=8, epochs=1, verbose=0)
+        self.assertEqual(network.model.predict(self.data, verbose=0).dtype, np.float32)
+        if network.mixed_precision:
+            self.assertEqual(network.model.layers[0].compute_dtype, 'bfloat16')
+            self.assertEqual(network.model.layers[0].variable_dtype, 'float32')
+
+class TestFeatureCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, 'features')
+        tf.keras.utils.set_random_seed(0)
+        self.network = TransferLearningModel('VGG16', num_classes=3, input_shape=(32, 32, 3), weights=None)
+        rng = np.random.default_rng(0)
+        self.images = rng.random((20, 32, 32, 3), dtype=np.float32)
+        self.labels = rng.integers(0, 3, size=20)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_head_training_updates_full_model(self):
+        head_before = self.network.model.layers[-1].get_weights()[0].copy()
+        history = self.network.train_head((self.images, self.labels), (self.images[:6], self.labels[:6]),
+                                          cache_dir=self.cache_dir, epochs=2, batch_size=8)
+        self.assertEqual(len(history.history['val_loss']), 2)
+        self.assertFalse(np.allclose(self.network.model.layers[-1].get_weights()[0], head_before))
+
+        features, _ = FeatureCache(self.cache_dir).load_or_extract(self.network.model.layers[0],
+                                                                   (self.images, self.labels), 'train')
+        self.assertIsInstance(features, np.memmap)
+        np.testing.assert_allclose(self.network.build_head().predict(np.asarray(features), verbose=0),
+                                   self.network.model.predict(self.images, verbose=0), rtol=1e-4, atol=1e-6)
+
+    def test_invalidation(self):
+        base_model = self.network.model.layers[0]
+        cache = FeatureCache(self.cache_dir)
+        data = (self.images, self.labels)
+        cache.load_or_extract(base_model, data, 'train')
+        cache.load_or_extract(base_model, data, 'train')
+        self.assertEqual(cache.extractions, 1)
+
+        cache.load_or_extract(base_model, (self.images[:10], self.labels[:10]), 'train')
+        self.assertEqual(cache.extractions, 2)
+        self.assertEqual(len([f for f in os.listdir(self.cache_dir) if f.endswith('.json')]), 1)
+
+        weights = base_model.get_weights()
+        base_model.set_weights([w + 0.01 for w in weights])
+        features, labels = cache.load_or_extract(base_model, (self.images[:10], self.labels[:10]), 'train')
+        self.assertEqual(cache.extractions, 3)
+        self.assertEqual((len(features), len(labels)), (10, 10))
+
+        with self.assertRaises(ValueError):
+            cache.load_or_extract(base_model, tf.data.Dataset.from_tensor_slices(data).batch(4), 'train')
+
+class TestDataParallelTraining(unittest.TestCase):
+
+    def test_two_workers(self):
+        rng = np.random.default_rng(0)
+        data = rng.random((256, 16), dtype=np.float32)
+        labels = (data[:, 0] * 3).astype(int)
+        network = FeedforwardNN(input_shape=(16,), num_classes=3)
+        network.compile_model(learning_rate=0.005)
+        before = network.model.get_weights()
+        trainer = ModelTrainer(network.model, (data, labels), (data[:64], labels[:64]))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'best_model.keras')
+            history = trainer.train_data_parallel(num_workers=2, epochs=3, batch_size=16,
+                                                  checkpoint_path=path, timeout=300)
+            self.assertTrue(os.path.exists(path))
+        self.assertEqual(len(history.history['val_loss']), 3)
+        self.assertAlmostEqual(history.history['learning_rate'][0], 0.01, places=6)
+        self.assertLess(history.history['loss'][-1], history.history['loss'][0])
+        self.assertEqual(trainer.parallel_stats['global_batch_size'], 32)
+        self.assertFalse(np.allclose(network.model.get_weights()[0], before[0]))
+
+    def test_requires_sparse_categorical_loss(self):
+        data = np.zeros((8, 16), dtype=np.float32)
+        network = FeedforwardNN(input_shape=(16,), num_classes=3)
+        network.model.compile(optimizer='adam', loss='mse')
+        trainer = ModelTrainer(network.model, (data, np.zeros((8, 3))), None)
+        with self.assertRaises(ValueError):
+            trainer.train_data_parallel(num_workers=2, epochs=1)
+
+    def test_directory_sources_shard_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            train_dir, val_dir = os.path.join(tmp, 'train'), os.path.join(tmp, 'val')
+            write_class_images(train_dir, {'cats': 5, 'dogs': 4})
+            write_class_images(val_dir, {'cats': 1, 'dogs': 1})
+            loader = TFDataLoader(train_dir, val_dir, img_size=(8, 8), augment=False)
+            train_source, val_source = pickle.loads(pickle.dumps(loader.load_sources()))
+            self.assertEqual((train_source.num_examples, val_source.num_examples), (9, 2))
+            shards = [np.concatenate([labels for _, labels in train_source.dataset(4, 2, i)]) for i in range(2)]
+        self.assertEqual([len(shard) for shard in shards], [5, 4])
+        self.assertEqual(sorted(np.concatenate(shards)), [0] * 5 + [1] * 4)
+
+class TestTrainingProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        cwd = os.getcwd()
+        # train() checkpoints to the working directory
+        os.chdir(self.tmp.name)
+        self.addCleanup(os.chdir, cwd)
+        rng = np.random.default_rng(0)
+        self.data = rng.random((40, 8), dtype=np.float32)
+        self.labels = (self.data[:, 0] * 2).astype(int)
+
+    def read_records(self, path):
+        with open(path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_trainer_writes_step_and_epoch_records(self):
+        network = FeedforwardNN(input_shape=(8,), num_classes=2)
+        network.compile_model()
+        trainer = ModelTrainer(network.model, (self.data, self.labels), (self.data[:8], self.labels[:8]))
+        log_path = os.path.join(self.tmp.name, 'profile.jsonl')
+        trainer.train(epochs=2, batch_size=16, profiler=TrainingProfiler(log_path))
+
+        records = self.read_records(log_path)
+        self.assertEqual([r['event'] for r in (records[0], records[-1])], ['train_begin', 'train_end'])
+        steps = [r for r in records if r['event'] == 'step']
+        epochs = [r for r in records if r['event'] == 'epoch']
+        self.assertEqual(len(steps), 6)
+        self.assertEqual([r['samples'] for r in steps[:3]], [16, 16, 8])
+        self.assertEqual([r['global_step'] for r in steps], list(range(6)))
+        for record in steps:
+            self.assertGreaterEqual(record['input_wait_seconds'], 0.0)
+            self.assertGreater(record['samples_per_second'], 0.0)
+            self.assertIn('loss', record)
+        self.assertEqual(len(epochs), 2)
+        for record in epochs:
+            self.assertEqual((record['steps'], record['samples']), (3, 40))
+            self.assertGreater(record['checkpoint_seconds'], 0.0)
+            self.assertGreater(record['peak_rss_mb'], 0.0)
+            self.assertIn('val_loss', record)
+        self.assertTrue(os.path.exists('best_model.h5'))
+
+    def test_trace_window(self):
+        network = FeedforwardNN(input_shape=(8,), num_classes=2)
+        network.compile_model()
+        trace_dir = os.path.join(self.tmp.name, 'trace')
+        profiler = TrainingProfiler(os.path.join(self.tmp.name, 'profile.jsonl'), trace_dir=trace_dir,
+                                    trace_steps=(1, 2), batch_size=8)
+        network.model.fit(self.data, self.labels, batch_size=8, epochs=1, verbose=0, callbacks=[profiler])
+        self.assertTrue(any(files for _, _, files in os.walk(trace_dir)))
+        steps = [r for r in self.read_records(profiler.log_path) if r['event'] == 'step']
+        self.assertEqual([r['samples'] for r in steps], [8] * 5)
+        self.assertIsNone(steps[0]['input_wait_seconds'])
+
+        with self.assertRaises(ValueError):
+            TrainingProfiler('profile.jsonl', trace_steps=(0, 1))
+
+    def test_trace_starts_when_steps_per_execution_skips_the_first_step(self):
+        network = FeedforwardNN(input_shape=(8,), num_classes=2)
+        network.compile_model(steps_per_execution=2)
+        trace_dir = os.path.join(self.tmp.name, 'trace')
+        profiler = TrainingProfiler(os.path.join(self.tmp.name, 'profile.jsonl'), trace_dir=trace_dir,
+                                    trace_steps=(1, 2), batch_size=8)
+        network.model.fit(self.data, self.labels, batch_size=8, epochs=1, verbose=0, callbacks=[profiler])
+        steps = [r for r in self.read_records(profiler.log_path) if r['event'] == 'step']
+        self.assertNotIn(1, [r['global_step'] for r in steps])
+        self.assertTrue(any(files for _, _, files in os.walk(trace_dir)))
+
+if __name__ == '__main__':
+    unittest.main()